@@ -0,0 +1,366 @@
+"""
+검색·서빙 성능 측정 스크립트
+
+  python bench.py search       # ChromaDB HNSW ↔ InMemoryIndex 지연시간 · recall 비교
+  python bench.py recall       # Matryoshka 축소(256/512) · int8 양자화의 recall@k ↔ 전체 1024차원
+  python bench.py rss          # 워커별 메모리: 워커마다 모델 로드 ↔ fork 전 preload 공유
+  python bench.py rss --pid N  # 실행 중인 gunicorn 마스터 N과 워커들의 메모리
+  python bench.py prompt       # generate_quotes 프롬프트·응답 토큰: 전체 제품명 ↔ 후보 ID
+
+search: search_parts와 같은 형태(카테고리 필터 + 가격대 필터, n_results=15)의 질의를
+실제 검색 키워드로 반복 실행해 질의당 지연시간 분포를 비교한다.
+임베딩 시간은 제외하고 벡터 검색 단계만 측정한다.
+
+recall: 전체 차원 컬렉션의 벡터를 잘라 만든 인덱스(vectordb.py --dim과 같은 벡터)로
+search_parts 형태의 질의를 실행하고, 전체 차원 float32 정확 검색 top-k와의 겹침을 잰다.
+빌드를 다시 하지 않고 차원·dtype별 크기/품질 트레이드오프를 고를 수 있다.
+
+rss: /proc/<pid>/smaps_rollup의 RSS와 PSS(공유 페이지를 공유 프로세스 수로 나눈 값)를 읽는다.
+공유 메모리는 RSS에 중복 집계되므로 프로세스 합계는 PSS로 비교한다. (Linux 전용)
+
+prompt: 컬렉션에서 search_parts와 같은 가격대의 후보(카테고리별 10개)를 골라 generate_quotes
+프롬프트를 두 방식(QUOTE_PROMPT_IDS=0/1)으로 만들고, 같은 견적 3개를 담은 응답 JSON도 두 방식으로
+직렬화해 토큰 수를 센다 (tiktoken, OPENAI_MODEL 인코딩). 출력 토큰이 곧 생성 지연시간이다.
+실제 호출의 토큰 수는 API 응답의 token_usage로 확인한다.
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR / "pc_assembly" / "main"))
+from config import (  # noqa: E402
+    CHROMA_COLLECTION,
+    CHROMA_DIR,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    ONNX_MODEL_DIR,
+)
+from embed_onnx import DEFAULT_QUERIES  # noqa: E402
+from embedding import QUERY_PROMPT, load_embedder, truncate_embeddings  # noqa: E402
+from vector_index import InMemoryIndex  # noqa: E402
+
+CATEGORIES = ["CPU", "GPU", "RAM", "SSD", "HDD", "메인보드", "파워", "케이스", "쿨러"]
+
+
+def _percentiles(samples_ms):
+    a = np.asarray(samples_ms)
+    return f"평균 {a.mean():7.2f}ms | p50 {np.percentile(a, 50):7.2f}ms | p95 {np.percentile(a, 95):7.2f}ms"
+
+
+def _open_collection():
+    import chromadb
+    client = chromadb.PersistentClient(
+        path=CHROMA_DIR, settings=chromadb.Settings(anonymized_telemetry=False),
+    )
+    return client.get_collection(CHROMA_COLLECTION)
+
+
+def _encode_queries(queries):
+    model = load_embedder(EMBEDDING_BACKEND, EMBEDDING_MODEL, onnx_dir=ONNX_MODEL_DIR)
+    return model.encode([QUERY_PROMPT + q for q in queries], normalize_embeddings=True)
+
+
+def _workload(embs, with_price: bool):
+    """(쿼리 벡터, where) 목록 — 쿼리마다 9개 카테고리를 모두 검색 (search_parts 1회분)"""
+    jobs = []
+    for emb in embs:
+        for cat in CATEGORIES:
+            where = {"category": cat}
+            if with_price:
+                where = {"$and": [{"category": cat},
+                                  {"price_krw": {"$gte": 50_000}},
+                                  {"price_krw": {"$lte": 800_000}}]}
+            jobs.append((emb, where))
+    return jobs
+
+
+def cmd_search(args):
+    coll = _open_collection()
+    print("=" * 60)
+    print("검색 백엔드 지연시간 비교")
+    print(f"  컬렉션: {CHROMA_COLLECTION} ({coll.count():,}개)")
+    print("=" * 60)
+
+    t0 = time.time()
+    index = InMemoryIndex.from_collection(coll, dtype=args.dtype)
+    load_s = time.time() - t0
+    print(f"  InMemoryIndex 로드: {load_s:.2f}초 | 행렬 {index.nbytes / 1e6:.1f}MB ({args.dtype})")
+
+    embs = _encode_queries(DEFAULT_QUERIES)
+    jobs = _workload(embs, with_price=args.price)
+    print(f"  질의 {len(jobs):,}건 × {args.repeat}회 (n_results={args.k}, "
+          f"가격 필터 {'on' if args.price else 'off'})\n")
+
+    def run(backend):
+        lat, results = [], []
+        for _ in range(args.repeat):
+            results = []
+            for emb, where in jobs:
+                t = time.perf_counter()
+                try:
+                    res = backend.query(query_embeddings=[emb.tolist()], n_results=args.k,
+                                        where=where, include=["metadatas", "distances"])
+                    ids = res["ids"][0]
+                except Exception:
+                    ids = []
+                lat.append((time.perf_counter() - t) * 1000)
+                results.append(ids)
+        return lat, results
+
+    chroma_lat, chroma_ids = run(coll)
+    memory_lat, memory_ids = run(index)
+    print(f"  [chroma] {_percentiles(chroma_lat)}")
+    print(f"  [memory] {_percentiles(memory_lat)}")
+
+    # 요청 단위 배치 질의: 카테고리별로 모든 키워드를 한 번의 행렬곱으로 처리
+    batch_lat = []
+    for _ in range(args.repeat):
+        for cat in CATEGORIES:
+            t = time.perf_counter()
+            index.query(query_embeddings=embs, n_results=args.k, where={"category": cat})
+            batch_lat.append((time.perf_counter() - t) * 1000 / len(embs))
+    print(f"  [memory, 키워드 배치] 질의당 {_percentiles(batch_lat)}")
+
+    # HNSW 근사 검색의 recall — 정확 검색(memory) 결과 대비
+    recall = [len(set(c) & set(m)) / len(m) for c, m in zip(chroma_ids, memory_ids) if m]
+    speedup = np.mean(chroma_lat) / max(np.mean(memory_lat), 1e-9)
+    print(f"\n  chroma recall@{args.k} (정확 검색 대비): {np.mean(recall):.1%}")
+    print(f"  memory 속도 향상: x{speedup:.1f}")
+
+
+def cmd_recall(args):
+    coll = _open_collection()
+    if (coll.metadata or {}).get("embed_dim"):
+        print("전체 차원 컬렉션이 필요합니다 (vectordb.py --dim 0으로 빌드)")
+        return
+    res = coll.get(include=["embeddings", "metadatas"])
+    ids, metas = res["ids"], res["metadatas"]
+    full = np.asarray(res["embeddings"], dtype=np.float32)
+    queries = _encode_queries(DEFAULT_QUERIES)
+    jobs = _workload(queries, with_price=False)
+
+    print("=" * 60)
+    print(f"Matryoshka 차원 · dtype별 recall@{args.k} (기준: {full.shape[1]}차원 float32 정확 검색)")
+    print(f"  컬렉션: {CHROMA_COLLECTION} ({len(ids):,}개) | 질의 {len(jobs):,}건")
+    print("=" * 60)
+
+    reference = InMemoryIndex(ids, full, metas)
+    ref_ids = [reference.query(q, n_results=args.k, where=w)["ids"][0] for q, w in jobs]
+
+    print(f"  {'차원':>6} {'dtype':>8} {'행렬':>9} {'recall':>8} {'질의당':>9}")
+    for dim in args.dims:
+        for dtype in args.dtypes:
+            index = InMemoryIndex(ids, truncate_embeddings(full, dim), metas, dtype=dtype)
+            recall, lat = [], []
+            for (q, w), ref in zip(jobs, ref_ids):
+                t = time.perf_counter()
+                got = index.query(truncate_embeddings(q, dim), n_results=args.k, where=w)["ids"][0]
+                lat.append((time.perf_counter() - t) * 1000)
+                if ref:
+                    recall.append(len(set(got) & set(ref)) / len(ref))
+            print(f"  {index.dim:>6} {dtype:>8} {index.nbytes / 1e6:>7.1f}MB "
+                  f"{np.mean(recall):>7.1%} {np.mean(lat):>7.2f}ms")
+
+
+def _smaps(pid: int) -> dict:
+    """smaps_rollup → {Rss, Pss, Shared_Clean, ...} (MB)"""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return out
+
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(c) for c in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def _print_rss(label: str, pids):
+    print(f"\n  [{label}]")
+    print(f"  {'PID':>8} {'RSS':>9} {'PSS':>9} {'공유':>9} {'전용':>9}")
+    total_pss = 0.0
+    for role, pid in pids:
+        m = _smaps(pid)
+        shared  = m.get("Shared_Clean", 0) + m.get("Shared_Dirty", 0)
+        private = m.get("Private_Clean", 0) + m.get("Private_Dirty", 0)
+        total_pss += m.get("Pss", 0)
+        print(f"  {pid:>8} {m.get('Rss', 0):>7.0f}MB {m.get('Pss', 0):>7.0f}MB "
+              f"{shared:>7.0f}MB {private:>7.0f}MB  {role}")
+    print(f"  PSS 합계: {total_pss:,.0f}MB")
+    return total_pss
+
+
+def _rss_worker(model, ready, done):
+    """워커 흉내: (없으면) 모델 로드 → 쿼리 1건 임베딩 → 측정이 끝날 때까지 대기"""
+    if model is None:
+        model = load_embedder(EMBEDDING_BACKEND, EMBEDDING_MODEL, onnx_dir=ONNX_MODEL_DIR)
+    model.encode([QUERY_PROMPT + DEFAULT_QUERIES[0]], normalize_embeddings=True)
+    ready.release()
+    done.wait()
+
+
+def _rss_run(workers: int, preload: bool, out=None):
+    ctx = mp.get_context("fork")
+    model = None
+    if preload:
+        # graph.preload_for_fork()와 같은 순서: 가중치 로드 → gc.freeze → fork (마스터에서 추론 없음)
+        model = load_embedder(EMBEDDING_BACKEND, EMBEDDING_MODEL, onnx_dir=ONNX_MODEL_DIR)
+        gc.collect()
+        gc.freeze()
+    ready, done = ctx.Semaphore(0), ctx.Event()
+    procs = [ctx.Process(target=_rss_worker, args=(model, ready, done)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.acquire()
+    label = "preload (fork 전 로드, copy-on-write 공유)" if preload else "워커별 로드"
+    pids = [("마스터", os.getpid())] + [(f"워커{i + 1}", p.pid) for i, p in enumerate(procs)]
+    total = _print_rss(label, pids)
+    done.set()
+    for p in procs:
+        p.join()
+    if out is not None:
+        out.put(total)
+    return total
+
+
+def cmd_rss(args):
+    if args.pid:
+        pids = [("마스터", args.pid)] + [(f"워커{i + 1}", c) for i, c in enumerate(_children(args.pid))]
+        _print_rss(f"PID {args.pid}", pids)
+        return
+
+    if EMBEDDING_BACKEND != "torch":
+        print("preload 공유는 torch 백엔드 전용입니다 (onnxruntime 세션은 fork에 안전하지 않음)")
+        return
+    print("=" * 60)
+    print(f"워커별 메모리 비교 — 워커 {args.workers}개, 모델 {EMBEDDING_MODEL}")
+    print("=" * 60)
+    # 두 측정이 서로 영향을 주지 않도록 각각 새 프로세스에서 실행
+    ctx = mp.get_context("spawn")
+    totals = []
+    for preload in (False, True):
+        out = ctx.Queue()
+        proc = ctx.Process(target=_rss_run, args=(args.workers, preload, out))
+        proc.start()
+        totals.append(out.get())
+        proc.join()
+    print(f"\n  PSS 합계: {totals[0]:,.0f}MB → {totals[1]:,.0f}MB "
+          f"({totals[0] - totals[1]:,.0f}MB 절감)")
+
+
+def _token_counter():
+    """(이름, 텍스트 → 토큰 수) — tiktoken 인코딩을 못 받으면(오프라인) 문자 수로 대신 센다"""
+    try:
+        import tiktoken
+        from config import OPENAI_MODEL
+        try:
+            enc = tiktoken.encoding_for_model(OPENAI_MODEL)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+        return "토큰", lambda text: len(enc.encode(text))
+    except Exception as e:
+        print(f"  (tiktoken 인코딩 로드 실패 → 문자 수로 비교: {type(e).__name__})")
+        return "문자", len
+
+
+def cmd_prompt(args):
+    sys.path.insert(0, str(BASE_DIR / "pc_assembly"))
+    from main import graph as g
+
+    coll  = _open_collection()
+    alloc = g._DEFAULT_ALLOC.get(args.purpose, g._DEFAULT_ALLOC["general"])
+    candidates = {}
+    for cat in CATEGORIES:
+        cat_budget = args.budget * alloc.get(cat, 0.10)
+        where = {"$and": [{"category": cat},
+                          {"price_krw": {"$gte": int(cat_budget * 0.4)}},
+                          {"price_krw": {"$lte": int(cat_budget * 1.8)}}]}
+        metas = coll.get(where=where, limit=10, include=["metadatas"])["metadatas"]
+        if len(metas) < 5:
+            metas = coll.get(where={"category": cat}, limit=10, include=["metadatas"])["metadatas"]
+        candidates[cat] = [dict(m, category=cat) for m in metas]
+    state = {"budget": args.budget, "purpose": args.purpose, "notes": args.notes,
+             "candidates": candidates, "retry_count": 0, "compat_failure_hints": []}
+
+    # 같은 부품 선택(견적 i → 카테고리별 i번째 후보)을 두 형식으로 직렬화한 응답
+    by_id = {id(item): cid for cid, item in g._candidate_ids(candidates).items()}
+    reason = ["핵심 부품 선정 근거를 설명하는 문장입니다.", "사용자 요청 반영 내용을 설명하는 문장입니다.",
+              "이 견적 유형의 포지셔닝을 설명하는 문장입니다."]
+
+    def answer(ids: bool) -> str:
+        quotes = []
+        for qid, qtype in g._QUOTE_TYPES.items():
+            quote = {"id": qid, "type": qtype}
+            for cat in g._PART_CATS:
+                items = candidates.get(cat) or []
+                if not items:
+                    continue
+                item = items[min(qid - 1, len(items) - 1)]
+                quote[cat] = by_id[id(item)] if ids else {"name": item["product_name"], "price": item["price"]}
+            quote.update(description="견적 요약 설명", reason=reason)
+            quotes.append(quote)
+        return json.dumps({"quotes": quotes}, ensure_ascii=False)
+
+    unit, count = _token_counter()
+    print("=" * 60)
+    print(f"generate_quotes {unit} 수 — 예산 {args.budget:,}원 / {args.purpose}")
+    print("=" * 60)
+    rows = [(ids, count(g._quotes_prompt(state, ids=ids)), count(answer(ids))) for ids in (False, True)]
+    for ids, n_in, n_out in rows:
+        label = "후보 ID (QUOTE_PROMPT_IDS=1)" if ids else "전체 제품명 (QUOTE_PROMPT_IDS=0)"
+        print(f"  {label:<32} 입력 {n_in:>6,} | 출력 {n_out:>6,}")
+    (_, in0, out0), (_, in1, out1) = rows
+    print(f"\n  후보 ID 방식 변화: 입력 {in1 / in0 - 1:+.0%} | 출력 {out1 / out0 - 1:+.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색·서빙 성능 측정")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("search", help="ChromaDB ↔ InMemoryIndex 지연시간 비교")
+    p.add_argument("-k", type=int, default=15, help="n_results (search_parts 기본 15)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    p.add_argument("--price", action="store_true", help="가격대($gte/$lte) 필터 포함")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("recall", help="Matryoshka 축소 · int8 양자화 recall@k 리포트")
+    p.add_argument("-k", type=int, default=15)
+    p.add_argument("--dims", type=int, nargs="+", default=[1024, 512, 256])
+    p.add_argument("--dtypes", nargs="+", default=["float32", "int8"],
+                   choices=["float32", "float16", "int8"])
+    p.set_defaults(func=cmd_recall)
+
+    p = sub.add_parser("rss", help="워커별 메모리(RSS/PSS): 워커별 로드 ↔ fork 전 preload")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--pid", type=int, default=0, help="실행 중인 gunicorn 마스터 PID (지정 시 해당 프로세스 트리만 측정)")
+    p.set_defaults(func=cmd_rss)
+
+    p = sub.add_parser("prompt", help="generate_quotes 토큰 수: 전체 제품명 ↔ 후보 ID")
+    p.add_argument("--budget", type=int, default=1_500_000)
+    p.add_argument("--purpose", default="gaming")
+    p.add_argument("--notes", default="화이트 케이스, RGB")
+    p.set_defaults(func=cmd_prompt)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
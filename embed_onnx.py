@@ -0,0 +1,123 @@
+"""
+임베딩 ONNX 변환 + 정확도 검증 스크립트
+
+  python embed_onnx.py export            # arctic-embed-ko → ONNX + int8 동적 양자화 (onnx_model/)
+  python embed_onnx.py check             # PyTorch 벡터 ↔ ONNX int8 벡터 일치도 리포트
+
+check는 ChromaDB 컬렉션의 실제 부품 문서와 실제 검색 키워드로
+① 문서/쿼리별 코사인 일치도 ② 쿼리별 top-k 검색 결과 겹침 비율을 측정한다.
+기준을 통과하면 .env에 EMBEDDING_BACKEND=onnx 로 전환하고
+vectordb.py --backend onnx 로 컬렉션을 다시 빌드한다.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR / "pc_assembly" / "main"))
+from config import CHROMA_COLLECTION, CHROMA_DIR, EMBEDDING_MODEL, ONNX_MODEL_DIR  # noqa: E402
+from embedding import QUERY_PROMPT, compare_backends, export_onnx, load_embedder  # noqa: E402
+
+# 실제 analyze_request가 생성하는 형태의 검색 키워드 + README의 자유형식 참고사항
+DEFAULT_QUERIES = [
+    "RTX 4060", "RTX 4070 SUPER", "RTX 5080", "라데온 RX 7800 XT",
+    "라이젠 7 7800X3D", "라이젠 5 7600", "인텔 코어 i5-14400F", "인텔 코어 i7-14700K",
+    "DDR5 32GB", "DDR5 16GB RGB", "DDR4 16GB",
+    "NVMe SSD 1TB", "2TB 대용량 SSD", "HDD 4TB",
+    "B650 메인보드", "B760 메인보드 WIFI", "Z790 메인보드",
+    "850W 80PLUS GOLD 파워", "650W 파워",
+    "화이트 케이스", "RGB 강화유리 케이스", "미들타워 블랙 케이스",
+    "저소음 공랭 쿨러", "360mm 수랭 쿨러", "ARGB 쿨러",
+    "최신 게이밍용 AM5 소켓 CPU", "가성비 위주의 그래픽카드", "저소음 환경의 3열 수랭 쿨러",
+    "케이스는 하얀색으로 해줘", "그래픽카드는 50시리즈로 부탁해",
+]
+
+# 채택 기준 — 이 값 이상이면 검색 결과가 사실상 동일
+MIN_COS_MEAN     = 0.99
+MIN_TOPK_OVERLAP = 0.90
+
+
+def load_documents(limit: int):
+    import chromadb
+    client = chromadb.PersistentClient(path=CHROMA_DIR)
+    coll   = client.get_collection(CHROMA_COLLECTION)
+    total  = coll.count()
+    docs   = coll.get(include=["documents"])["documents"]
+    # 카테고리가 고르게 섞이도록 균등 간격 샘플링
+    step = max(1, total // limit)
+    return docs[::step][:limit]
+
+
+def cmd_export(args):
+    print("=" * 60)
+    print("ONNX 변환")
+    print(f"  모델  : {EMBEDDING_MODEL}")
+    print(f"  출력  : {args.out}")
+    print(f"  양자화: {'int8 동적' if not args.no_quantize else '없음 (fp32)'}")
+    print("=" * 60)
+    t0 = time.time()
+    root = export_onnx(EMBEDDING_MODEL, args.out, quantize=not args.no_quantize)
+    size_mb = sum(p.stat().st_size for p in root.iterdir() if p.is_file()) / 1e6
+    print(f"  완료: {time.time() - t0:.1f}초 | 폴더 크기 {size_mb:,.0f}MB")
+
+
+def cmd_check(args):
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [q.strip() for q in Path(args.queries).read_text(encoding="utf-8").splitlines()
+                   if q.strip()]
+    docs = load_documents(args.docs)
+
+    print("=" * 60)
+    print("ONNX 정확도 검증")
+    print(f"  문서 {len(docs):,}개 | 쿼리 {len(queries)}개 | top-{args.k}")
+    print("=" * 60)
+
+    torch_model = load_embedder("torch", EMBEDDING_MODEL)
+    onnx_model  = load_embedder("onnx", EMBEDDING_MODEL, onnx_dir=args.onnx_dir)
+
+    # 쿼리 1건 지연시간 (search_parts의 키워드당 비용)
+    for name, m in (("torch", torch_model), ("onnx", onnx_model)):
+        m.encode([QUERY_PROMPT + queries[0]], normalize_embeddings=True)   # 워밍업
+        t0 = time.time()
+        for q in queries:
+            m.encode([QUERY_PROMPT + q], normalize_embeddings=True)
+        print(f"  [{name:5}] 쿼리 1건 평균 {(time.time() - t0) / len(queries) * 1000:.1f}ms")
+
+    r = compare_backends(torch_model, onnx_model, docs, queries,
+                         query_prompt=QUERY_PROMPT, k=args.k)
+    print(f"\n  문서 코사인 : 평균 {r['doc_cos_mean']:.4f} | 최소 {r['doc_cos_min']:.4f}")
+    print(f"  쿼리 코사인 : 평균 {r['query_cos_mean']:.4f} | 최소 {r['query_cos_min']:.4f}")
+    print(f"  top-{r['k']} 겹침: {r['topk_overlap']:.1%} | top-1 일치: {r['top1_agree']:.1%}")
+
+    ok = (r["doc_cos_mean"] >= MIN_COS_MEAN and r["query_cos_mean"] >= MIN_COS_MEAN
+          and r["topk_overlap"] >= MIN_TOPK_OVERLAP)
+    print(f"\n  판정: {'✅ 채택 가능' if ok else '❌ 기준 미달'} "
+          f"(코사인 ≥ {MIN_COS_MEAN}, top-k 겹침 ≥ {MIN_TOPK_OVERLAP:.0%})")
+    sys.exit(0 if ok else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 ONNX 변환 / 정확도 검증")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("export", help="ONNX 변환 + int8 양자화")
+    p.add_argument("--out", default=ONNX_MODEL_DIR)
+    p.add_argument("--no-quantize", action="store_true", help="fp32 ONNX만 생성")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("check", help="PyTorch ↔ ONNX 정확도 비교")
+    p.add_argument("--onnx-dir", default=ONNX_MODEL_DIR)
+    p.add_argument("--docs", type=int, default=2000, help="비교할 문서 수 (기본 2000)")
+    p.add_argument("--queries", help="한 줄에 하나씩 쿼리가 적힌 파일 (기본: 내장 키워드)")
+    p.add_argument("-k", type=int, default=10)
+    p.set_defaults(func=cmd_check)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
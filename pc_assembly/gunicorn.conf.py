@@ -0,0 +1,56 @@
+"""
+gunicorn 설정 — pc_assembly/ (manage.py 위치)에서 실행
+
+    gunicorn -c gunicorn.conf.py
+
+EMBED_PRELOAD=1이면 preload_app으로 마스터가 wsgi.py를 먼저 import하고
+(main.graph.preload_for_fork → 임베딩 모델 로드) 그 다음 워커를 fork한다.
+워커들은 모델 가중치를 copy-on-write로 공유하므로 워커 수를 늘려도 모델 메모리는 1벌이다.
+워커별 메모리는 `python bench.py rss --pid <마스터 PID>`로 확인한다.
+preload는 torch 백엔드 전용 — EMBEDDING_BACKEND=onnx면 모델은 워커마다 따로 로드되고 시작 시 경고를 남긴다.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from main.config import EMBED_PRELOAD, EMBEDDING_BACKEND, WARMUP_ON_START  # noqa: E402
+
+wsgi_app = "pc_assembly.wsgi:application"
+bind     = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers  = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads  = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout  = 120   # 파이프라인(LLM 여러 번 호출)이 30초를 넘을 수 있음
+
+preload_app = EMBED_PRELOAD == "1"
+
+
+def when_ready(server):
+    """preload를 켰는데 백엔드가 torch가 아니어서 실제로는 공유되지 않으면 알린다"""
+    if not preload_app:
+        return
+    from main.graph import embed_preloaded
+    if not embed_preloaded():
+        server.log.warning(
+            "EMBED_PRELOAD=1은 torch 백엔드 전용입니다 (EMBEDDING_BACKEND=%s) — "
+            "임베딩 모델은 워커마다 따로 로드됩니다.", EMBEDDING_BACKEND,
+        )
+
+
+def post_fork(server, worker):
+    """
+    preload 모드에서 워커별 초기화.
+    - 마스터가 torch 모델을 실제로 올렸을 때만 연산 스레드를 코어/워커 수로 나눠
+      워커끼리 CPU를 과점유하지 않게 함 (onnx 백엔드는 torch 없이도 동작해야 함)
+    - 워밍업(WARMUP_ON_START)은 fork 후 여기서 실행 (마스터에서 추론하면 fork 후 멈출 수 있음)
+    """
+    if not preload_app:
+        return
+    from main.graph import embed_preloaded
+    if embed_preloaded():
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    if WARMUP_ON_START == "1":
+        from main.apps import schedule_warmup
+        schedule_warmup()
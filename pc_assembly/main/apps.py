@@ -1,6 +1,50 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
 
+# 이 프로세스에서 워밍업을 시작했는지 — /healthz/가 "워밍업 대기(503)"와 "lazy 초기화(200)"를 구분
+_warmup_scheduled = threading.Event()
+
+
+def schedule_warmup() -> None:
+    """백그라운드 스레드에서 graph.warmup() 실행 (graph import도 스레드에서 — 서버 시작을 막지 않음)"""
+    def _run():
+        from .graph import warmup
+        warmup()
+
+    _warmup_scheduled.set()
+    threading.Thread(target=_run, name="warmup", daemon=True).start()
+
+
+def warmup_scheduled() -> bool:
+    return _warmup_scheduled.is_set()
+
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        """
+        WARMUP_ON_START=1이면 서버 시작 직후 백그라운드 스레드에서 graph.warmup() 실행.
+        요청 처리와 동시에 진행되며, 완료 여부는 /healthz/로 확인한다.
+        """
+        from .config import EMBED_PRELOAD, WARMUP_ON_START
+        if WARMUP_ON_START != "1":
+            return
+        # gunicorn preload 모드에서는 ready()가 fork 전 마스터에서 실행된다
+        # → 워밍업은 fork 후 각 워커에서 (gunicorn.conf.py post_fork)
+        if EMBED_PRELOAD == "1" and "gunicorn" in sys.modules:
+            return
+        # manage.py migrate 등 서버가 아닌 명령에서는 건너뜀
+        if len(sys.argv) > 1 and sys.argv[0].endswith("manage.py"):
+            if sys.argv[1] != "runserver":
+                return
+            # 자동 리로더의 감시(부모) 프로세스는 요청을 받지 않으므로 건너뜀
+            # (--noreload면 RUN_MAIN 없이 이 프로세스가 바로 서버)
+            if "--noreload" not in sys.argv and os.environ.get("RUN_MAIN") != "true":
+                return
+
+        schedule_warmup()
@@ -0,0 +1,76 @@
+"""
+candidate_pool.py — search_parts가 한 번 만들어 모든 노드가 공유하는 후보 부품 풀
+
+CandidatePool은 {카테고리: [후보, ...]} dict 그 자체(dict 하위 클래스)라 GraphState에는 기존 candidates와
+똑같이 직렬화되고, 기존 코드의 candidates.items() / candidates.get(cat) 순회도 그대로 동작한다.
+여기에 생성 시 한 번 만든 색인을 붙인다.
+
+    by_name   : 제품명 → 후보          (compatibility._find_meta, _validate_parts)
+    by_id     : Chroma 문서 id → 후보  (호환성 인덱스 조회)
+    image_map : 제품명 → image_url     (filter_and_format, SSE 중간 견적)
+    price_krw : 모든 후보에 정수 가격을 미리 채움 (가격 문자열 재파싱 없음)
+
+이전에는 견적 부품 하나 조회마다 전체 후보를 선형 탐색하고(견적당 5회), 견적마다 제품명 집합과
+image_url 맵을 새로 만들었다 → 재검색으로 후보가 늘수록 비용도 늘었다. 이제 조회는 전부 O(1).
+
+후보 목록은 만든 뒤 수정하지 않는다고 가정한다 (바꿔야 하면 새 CandidatePool을 만든다).
+색인은 직렬화 대상이 아니므로 상태가 일반 dict로 복원된 경우 CandidatePool.of()가 다시 감싼다.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _parse_price(price_val) -> int:
+    """가격 문자열/숫자를 정수로 변환. "850,000원" → 850000"""
+    if isinstance(price_val, (int, float)):
+        return int(price_val)
+    digits = "".join(c for c in str(price_val) if c.isdigit())
+    return int(digits) if digits else 0
+
+
+class CandidatePool(dict):
+    """{카테고리: [후보, ...]} + 제품명·문서 id 색인"""
+
+    def __init__(self, candidates: Optional[Dict[str, List[dict]]] = None):
+        super().__init__(candidates or {})
+        self.by_name: Dict[str, dict] = {}
+        self.by_id: Dict[str, dict] = {}
+        self.image_map: Dict[str, str] = {}
+        self._memo: Dict[str, Any] = {}
+        for items in self.values():
+            for item in items:
+                if not isinstance(item.get("price_krw"), int):
+                    item["price_krw"] = _parse_price(item.get("price", 0))
+                name = item.get("product_name", "")
+                # 같은 제품명이 여러 카테고리에 있으면 먼저 나온 후보 (기존 _find_meta 선형 탐색과 같은 결과)
+                self.by_name.setdefault(name, item)
+                self.image_map.setdefault(name, item.get("image_url", ""))
+                if item.get("doc_id"):
+                    self.by_id.setdefault(item["doc_id"], item)
+
+    @classmethod
+    def of(cls, candidates: Optional[Dict[str, List[dict]]]) -> "CandidatePool":
+        """이미 CandidatePool이면 그대로, 일반 dict면 감싼다 (빈 값이면 빈 풀)"""
+        return candidates if isinstance(candidates, cls) else cls(candidates)
+
+    def meta(self, name: str) -> dict:
+        """제품명 → 후보 메타데이터 (없으면 빈 dict)"""
+        return self.by_name.get(name, {})
+
+    def price(self, name: str) -> int:
+        return self.by_name.get(name, {}).get("price_krw", 0)
+
+    def category(self, cat: str, top: Optional[int] = None) -> List[dict]:
+        """카테고리 후보 (검색 점수순). top이면 상위 top개"""
+        items = self.get(cat, [])
+        return items[:top] if top else items
+
+    def memo(self, key: str, build: Callable[[], Any]) -> Any:
+        """풀에서 파생되는 값(예: 프롬프트 후보 ID 표)을 한 번만 계산해 재사용"""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def __reduce__(self):
+        # pickle/deepcopy는 후보 dict만 — 색인은 복원 시 다시 만든다
+        return (type(self), (dict(self),))
@@ -0,0 +1,141 @@
+"""
+compat_index.py — 빌드 시 만든 호환성 인덱스로 후보 풀을 서로 호환되는 부품만 남게 가지치기
+
+vectordb.py가 컬렉션과 함께 남기는 <컬렉션>_compat_index.json을 읽는다.
+
+    mainboard_by_socket : 소켓 → 메인보드 문서 id        (CPU ↔ 메인보드)
+    ram_by_ddr          : DDR 규격 → RAM 문서 id          (CPU/메인보드 ↔ RAM)
+    cooler_by_socket    : 소켓 → 지원 쿨러 문서 id        (CPU ↔ 쿨러)
+    gpu_psu             : GPU 문서 id → {tdp_w, required_psu_w} (GPU ↔ 파워)
+
+search_parts는 카테고리마다 따로 검색하므로 CPU는 AM5뿐인데 메인보드는 LGA1700뿐인 식의 풀이 나올 수 있고,
+그러면 generate_quotes가 어떤 조합을 골라도 check_compatibility에서 떨어져 재시도가 반복된다.
+prune()은 "상대 카테고리에 호환되는 부품이 하나도 없는 부품"을 반복 제거(arc consistency)해
+남은 후보끼리는 항상 호환되는 짝이 존재하게 만든다.
+
+정보가 없는 부품(인덱스에 없는 id, 소켓/DDR 미추출)은 check_compat_meta와 마찬가지로 판정 불가 → 유지.
+가지치기로 카테고리가 비게 되면 그 카테고리는 원래 후보를 그대로 둔다 (빈 견적보다 재시도가 낫다).
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .compatibility import _meta_int, min_psu_w
+
+
+class CompatIndex:
+    """호환성 인덱스 (id 집합) + 후보 풀 가지치기"""
+
+    def __init__(self, index: dict):
+        self.mainboard_by_socket: Dict[str, Set[str]] = {
+            k: set(v) for k, v in index.get("mainboard_by_socket", {}).items()}
+        self.ram_by_ddr: Dict[str, Set[str]] = {
+            k: set(v) for k, v in index.get("ram_by_ddr", {}).items()}
+        self.cooler_by_socket: Dict[str, Set[str]] = {
+            k: set(v) for k, v in index.get("cooler_by_socket", {}).items()}
+        self.gpu_psu: Dict[str, dict] = index.get("gpu_psu", {})
+        # 인덱스에 올라 있는(= 호환 정보가 있는) id — 여기 없으면 판정 불가로 유지
+        self._known = {
+            "메인보드": set().union(*self.mainboard_by_socket.values()),
+            "RAM":      set().union(*self.ram_by_ddr.values()),
+            "쿨러":     set().union(*self.cooler_by_socket.values()),
+        }
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CompatIndex"]:
+        """인덱스 파일이 없거나 깨졌으면 None (호출부는 가지치기 없이 진행)"""
+        p = Path(path)
+        if not p.exists():
+            return None
+        try:
+            index = json.loads(p.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            return None
+        return cls(index) if isinstance(index, dict) else None
+
+    # ── 부품 쌍 판정 (정보가 없으면 True) ─────────────────────────
+
+    def _member(self, cat: str, item: dict, group: Dict[str, Set[str]], key: str) -> bool:
+        doc_id = item.get("doc_id", "")
+        if not key or doc_id not in self._known[cat]:
+            return True
+        return doc_id in group.get(key, ())
+
+    def min_psu_w(self, gpu: dict, cpu_tdp: int) -> int:
+        """
+        GPU + CPU TDP 조합이 요구하는 최소 파워 — compatibility.min_psu_w(check_compat_meta와 같은 규칙).
+        GPU 전력 정보는 인덱스 항목이 있으면 그것을, 없으면 후보 메타데이터를 쓴다.
+        """
+        gpu_meta = dict(gpu)
+        entry = self.gpu_psu.get(gpu.get("doc_id", ""))
+        if entry:
+            # v1 인덱스는 {min_psu_w, tdp_w}만 있음 — min_psu_w(≥ 권장 파워)를 권장 파워 자리에 쓴다
+            gpu_meta["tdp_w"] = entry.get("tdp_w", 0)
+            gpu_meta["required_psu_w"] = entry.get("required_psu_w", entry.get("min_psu_w", 0))
+        return min_psu_w({"tdp_w": cpu_tdp}, gpu_meta)
+
+    def _cpu_mb(self, cpu: dict, mb: dict) -> bool:
+        return self._member("메인보드", mb, self.mainboard_by_socket, cpu.get("socket", ""))
+
+    def _ram_with(self, part: dict, ram: dict) -> bool:
+        return self._member("RAM", ram, self.ram_by_ddr, part.get("ddr_type", ""))
+
+    def _cpu_cooler(self, cpu: dict, cooler: dict) -> bool:
+        return self._member("쿨러", cooler, self.cooler_by_socket, cpu.get("socket", ""))
+
+    # ── 가지치기 ──────────────────────────────────────────────────
+
+    def prune(self, candidates: Dict[str, List[dict]]) -> Tuple[Dict[str, List[dict]], Dict[str, int]]:
+        """
+        → (가지치기한 candidates, {카테고리: 제거 수}). 후보 순서(검색 점수순)는 유지한다.
+        제약 쌍: CPU↔메인보드(소켓), CPU↔RAM·메인보드↔RAM(DDR), CPU↔쿨러(소켓), GPU↔파워(전력)
+        """
+        pools = {cat: list(items) for cat, items in candidates.items()}
+
+        def pool(cat: str) -> List[dict]:
+            return pools.get(cat, [])
+
+        def cpu_tdp_min() -> int:
+            return min((_meta_int(c, "tdp") for c in pool("CPU")), default=0)
+
+        rules = {
+            "CPU": lambda x: (
+                (not pool("메인보드") or any(self._cpu_mb(x, mb) for mb in pool("메인보드")))
+                and (not pool("RAM") or any(self._ram_with(x, r) for r in pool("RAM")))
+            ),
+            "메인보드": lambda x: (
+                (not pool("CPU") or any(self._cpu_mb(c, x) for c in pool("CPU")))
+                and (not pool("RAM") or any(self._ram_with(x, r) for r in pool("RAM")))
+            ),
+            "RAM": lambda x: (
+                (not pool("CPU") or any(self._ram_with(c, x) for c in pool("CPU")))
+                and (not pool("메인보드") or any(self._ram_with(mb, x) for mb in pool("메인보드")))
+            ),
+            "쿨러": lambda x: not pool("CPU") or any(self._cpu_cooler(c, x) for c in pool("CPU")),
+            "GPU": lambda x: (
+                not pool("파워")
+                or any(not _meta_int(p, "wattage") or _meta_int(p, "wattage") >= self.min_psu_w(x, cpu_tdp_min())
+                       for p in pool("파워"))
+            ),
+            "파워": lambda x: (
+                not _meta_int(x, "wattage") or not pool("GPU")
+                or any(_meta_int(x, "wattage") >= self.min_psu_w(g, cpu_tdp_min()) for g in pool("GPU"))
+            ),
+        }
+
+        changed = True
+        while changed:
+            changed = False
+            for cat, ok in rules.items():
+                if cat not in pools:
+                    continue
+                kept = [item for item in pools[cat] if ok(item)]
+                # 비게 되면 가지치기하지 않음 (풀 전체가 어긋난 경우는 재검색이 처리)
+                if kept and len(kept) < len(pools[cat]):
+                    pools[cat] = kept
+                    changed = True
+
+        removed = {cat: len(candidates[cat]) - len(pools[cat])
+                   for cat in candidates if len(pools[cat]) < len(candidates[cat])}
+        return pools, removed
@@ -2,15 +2,16 @@
 #
 # 소켓·DDR·전력 정보는 vectordb.py 빌드 시 ChromaDB 메타데이터로 저장되며,
 # check_compat_meta()가 candidates 딕셔너리에서 직접 읽어 검증한다.
+#
+# socket_conflict / ddr_conflict / psu_conflict는 check_compat_meta의 🚨(호환 불가) 판정과 같은 규칙을
+# 부품 메타데이터 쌍 단위로 노출한다 → quote_solver.py가 조합 탐색 중 하드 제약으로 그대로 쓴다.
+
+from .candidate_pool import CandidatePool
 
 
 def _find_meta(name: str, candidates: dict) -> dict:
-    """candidates 딕셔너리에서 제품명으로 ChromaDB 메타데이터 검색"""
-    for items in candidates.values():
-        for item in items:
-            if item.get("product_name") == name:
-                return item
-    return {}
+    """candidates에서 제품명으로 ChromaDB 메타데이터 조회 (CandidatePool 제품명 색인)"""
+    return CandidatePool.of(candidates).meta(name)
 
 
 def _safe_int(val) -> int:
@@ -20,6 +21,56 @@ def _safe_int(val) -> int:
         return 0
 
 
+def _meta_int(meta: dict, key: str) -> int:
+    """
+    전력 수치 조회. vectordb.py가 빌드 시 저장한 정수 필드(<key>_w)를 그대로 쓰고,
+    정수 필드가 없는 구버전 컬렉션이면 문자열 필드를 파싱한다.
+    """
+    val = meta.get(f"{key}_w")
+    if isinstance(val, int):
+        return val
+    return _safe_int(meta.get(key))
+
+
+# 예상 소비 전력에 더하는 기본 부하 (메인보드·RAM·저장장치·팬 등)
+BASE_LOAD_W = 80
+
+
+def power_load(cpu_meta: dict, gpu_meta: dict) -> int:
+    """예상 소비 전력 = CPU TDP + GPU TDP + BASE_LOAD_W (둘 다 전력 정보가 없으면 0 → 판정 불가)"""
+    gpu_tdp = _meta_int(gpu_meta, "tdp")
+    cpu_tdp = _meta_int(cpu_meta, "tdp")
+    return gpu_tdp + cpu_tdp + BASE_LOAD_W if gpu_tdp or cpu_tdp else 0
+
+
+def min_psu_w(cpu_meta: dict, gpu_meta: dict) -> int:
+    """
+    이 CPU·GPU 조합이 🚨(파워 부족) 없이 쓸 수 있는 최소 파워 정격 = max(예상 소비 전력, GPU 권장 파워).
+    정보가 없으면 0. compat_index.py의 가지치기도 이 함수로 하한을 계산한다.
+    """
+    return max(power_load(cpu_meta, gpu_meta), _meta_int(gpu_meta, "required_psu"))
+
+
+def socket_conflict(cpu_meta: dict, mb_meta: dict) -> bool:
+    """CPU ↔ 메인보드 소켓이 양쪽 다 알려져 있고 다르면 True"""
+    cpu_sock, mb_sock = cpu_meta.get("socket", ""), mb_meta.get("socket", "")
+    return bool(cpu_sock and mb_sock and cpu_sock != mb_sock)
+
+
+def ddr_conflict(meta: dict, ram_meta: dict) -> bool:
+    """CPU(또는 메인보드) 지원 DDR ↔ RAM DDR이 양쪽 다 알려져 있고 다르면 True"""
+    ddr, ram_ddr = meta.get("ddr_type", ""), ram_meta.get("ddr_type", "")
+    return bool(ddr and ram_ddr and ddr != ram_ddr)
+
+
+def psu_conflict(cpu_meta: dict, gpu_meta: dict, psu_meta: dict) -> bool:
+    """파워 정격이 예상 소비 전력 또는 GPU 권장 파워보다 작으면 True (20% 마진 부족은 경고일 뿐)"""
+    psu_w = _meta_int(psu_meta, "wattage")
+    if not psu_w:
+        return False
+    return psu_w < min_psu_w(cpu_meta, gpu_meta)
+
+
 def _calc_confidence(cpu_meta: dict, mb_meta: dict, ram_meta: dict,
                      gpu_meta: dict, psu_meta: dict) -> float:
     """
@@ -57,23 +108,23 @@ def check_compat_meta(quote: dict, candidates: dict) -> dict:
     """
     result: dict = {"호환됨": True, "문제점": [], "경고사항": []}
 
-    cpu_meta = _find_meta(quote.get("CPU",    {}).get("name", ""), candidates)
-    mb_meta  = _find_meta(quote.get("메인보드", {}).get("name", ""), candidates)
-    ram_meta = _find_meta(quote.get("RAM",    {}).get("name", ""), candidates)
-    gpu_meta = _find_meta(quote.get("GPU",    {}).get("name", ""), candidates)
-    psu_meta = _find_meta(quote.get("파워",   {}).get("name", ""), candidates)
+    pool = CandidatePool.of(candidates)   # 일반 dict면 한 번만 색인
+    cpu_meta = _find_meta(quote.get("CPU",    {}).get("name", ""), pool)
+    mb_meta  = _find_meta(quote.get("메인보드", {}).get("name", ""), pool)
+    ram_meta = _find_meta(quote.get("RAM",    {}).get("name", ""), pool)
+    gpu_meta = _find_meta(quote.get("GPU",    {}).get("name", ""), pool)
+    psu_meta = _find_meta(quote.get("파워",   {}).get("name", ""), pool)
 
     result["confidence"] = _calc_confidence(cpu_meta, mb_meta, ram_meta, gpu_meta, psu_meta)
 
     # ── 1. CPU ↔ 메인보드 소켓 ──────────────────────────────────
     cpu_sock = cpu_meta.get("socket", "")
     mb_sock  = mb_meta.get("socket",  "")
-    if cpu_sock and mb_sock:
-        if cpu_sock != mb_sock:
-            result["호환됨"] = False
-            result["문제점"].append(
-                f"🚨 소켓 불일치: CPU {cpu_sock} ↔ 메인보드 {mb_sock}"
-            )
+    if socket_conflict(cpu_meta, mb_meta):
+        result["호환됨"] = False
+        result["문제점"].append(
+            f"🚨 소켓 불일치: CPU {cpu_sock} ↔ 메인보드 {mb_sock}"
+        )
     elif cpu_sock and not mb_sock:
         result["경고사항"].append(
             f"⚠️ 메인보드 소켓 정보 없음 (CPU: {cpu_sock}) — 수동 확인 필요"
@@ -82,7 +133,7 @@ def check_compat_meta(quote: dict, candidates: dict) -> dict:
     # ── 2. CPU ↔ RAM DDR ────────────────────────────────────────
     cpu_ddr = cpu_meta.get("ddr_type", "")
     ram_ddr = ram_meta.get("ddr_type", "")
-    if cpu_ddr and ram_ddr and cpu_ddr != ram_ddr:
+    if ddr_conflict(cpu_meta, ram_meta):
         result["호환됨"] = False
         result["문제점"].append(
             f"🚨 DDR 불일치: CPU 지원 {cpu_ddr} ↔ RAM {ram_ddr}"
@@ -90,19 +141,17 @@ def check_compat_meta(quote: dict, candidates: dict) -> dict:
 
     # ── 3. 메인보드 ↔ RAM DDR (이중 확인) ───────────────────────
     mb_ddr = mb_meta.get("ddr_type", "")
-    if mb_ddr and ram_ddr and mb_ddr != ram_ddr:
+    if ddr_conflict(mb_meta, ram_meta):
         result["호환됨"] = False
         result["문제점"].append(
             f"🚨 DDR 불일치: 메인보드 {mb_ddr} ↔ RAM {ram_ddr}"
         )
 
-    # ── 4. 전력 체크 (CPU TDP + GPU TDP + 기본 80W, 20% 마진) ──
-    gpu_tdp = _safe_int(gpu_meta.get("tdp"))
-    cpu_tdp = _safe_int(cpu_meta.get("tdp"))
-    psu_w   = _safe_int(psu_meta.get("wattage"))
-    if gpu_tdp or cpu_tdp:
-        total_load = gpu_tdp + cpu_tdp + 80
-        required   = int(total_load * 1.2)
+    # ── 4. 전력 체크 (CPU TDP + GPU TDP + 기본 부하, 20% 마진) ──
+    total_load = power_load(cpu_meta, gpu_meta)
+    psu_w      = _meta_int(psu_meta, "wattage")
+    if total_load:
+        required = int(total_load * 1.2)
         if psu_w:
             if psu_w < total_load:
                 result["호환됨"] = False
@@ -115,7 +164,7 @@ def check_compat_meta(quote: dict, candidates: dict) -> dict:
                 )
 
     # ── 5. GPU 권장 파워 체크 ────────────────────────────────────
-    gpu_req = _safe_int(gpu_meta.get("required_psu"))
+    gpu_req = _meta_int(gpu_meta, "required_psu")
     if gpu_req and psu_w and psu_w < gpu_req:
         result["호환됨"] = False
         result["문제점"].append(
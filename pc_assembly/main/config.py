@@ -33,11 +33,76 @@ EMBEDDING_MODEL = os.getenv(
 )
 # HF 오프라인 모드: "1"=캐시만 사용(집 PC), "0"=첫 실행 시 자동 다운로드(새 PC)
 HF_OFFLINE = os.getenv("HF_OFFLINE", "0")
+# 임베딩 백엔드: "torch"=SentenceTransformer 원본, "onnx"=int8 양자화 ONNX (onnxruntime)
+# onnx 사용 전 `python embed_onnx.py export`로 ONNX_MODEL_DIR 생성 + `check`로 정확도 확인
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR    = os.getenv("ONNX_MODEL_DIR") or str(GIT_ROOT / "onnx_model")
+
+# 쿼리 임베딩 LRU 캐시 (키워드 → 벡터, 프로세스 공용)
+QUERY_CACHE_SIZE        = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+# 디스크 스필 폴더 (비우면 사용 안 함) — mmap 파일이라 여러 워커·재시작 간에도 공유
+QUERY_CACHE_SPILL_DIR   = os.getenv("QUERY_CACHE_SPILL_DIR", "")
+QUERY_CACHE_SPILL_SLOTS = int(os.getenv("QUERY_CACHE_SPILL_SLOTS", "65536"))
+
+# search_parts 카테고리 병렬 검색 스레드 수 (1이면 순차 실행)
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "9"))
+
+# 1이면 Django 시작 시(MainConfig.ready) 백그라운드로 모델·인덱스·LLM 클라이언트를 미리 로드
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0")
+# 1이면 gunicorn 마스터가 fork 전에 임베딩 모델을 로드 → 워커들이 가중치를 copy-on-write 공유
+# (pc_assembly/gunicorn.conf.py가 preload_app으로 연동, torch 백엔드 전용)
+EMBED_PRELOAD   = os.getenv("EMBED_PRELOAD", "0")
 
 # ── ChromaDB ────────────────────────────────────────────────────
 # chroma_db 폴더는 git root에 있으므로 절대 경로로 지정
 CHROMA_DIR        = os.getenv("CHROMA_DIR") or str(GIT_ROOT / "chroma_db")
 CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "snowflake_arctic_ko")
+# vectordb.py가 컬렉션과 함께 만드는 키워드 플랜 (참고사항 없는 요청은 LLM 대신 이 표로 키워드 생성)
+KEYWORD_PLANNER   = os.getenv("KEYWORD_PLANNER", "1")
+KEYWORD_PLAN_PATH = os.getenv("KEYWORD_PLAN_PATH") or str(
+    Path(CHROMA_DIR) / f"{CHROMA_COLLECTION}_keyword_plan.json"
+)
+# vectordb.py가 만드는 호환성 인덱스 (소켓/DDR/파워) — search_parts가 후보 풀을 서로 호환되는 부품만 남게 가지치기
+COMPAT_INDEX      = os.getenv("COMPAT_INDEX", "1")
+COMPAT_INDEX_PATH = os.getenv("COMPAT_INDEX_PATH") or str(
+    Path(CHROMA_DIR) / f"{CHROMA_COLLECTION}_compat_index.json"
+)
+
+# ── 검색 백엔드 ─────────────────────────────────────────────────
+# "chroma" = ChromaDB HNSW 질의, "memory" = 시작 시 전체 벡터를 NumPy 행렬로 올려 정확 검색
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# memory 백엔드 행렬 dtype: "float32" | "float16" (메모리 절반, 정확도 손실 미미)
+#                          | "int8" (행별 스케일 양자화, 메모리 1/4)
+VECTOR_DTYPE   = os.getenv("VECTOR_DTYPE", "float32")
+# 쿼리 벡터 차원 (Matryoshka). 0이면 컬렉션 메타데이터 embed_dim(vectordb.py --dim)을 따름
+EMBED_DIM      = int(os.getenv("EMBED_DIM", "0"))
+
+# ── 견적 생성 방식 ───────────────────────────────────────────────
+# "batch"    = LLM 1회로 3종 견적 생성, 전부 실패하면 3종 모두 재생성
+# "per_type" = 유형(가성비/밸런스/최고스펙)별 LLM 호출을 동시에 실행, 호환성 실패한 유형만 재생성
+# "solver"   = quote_solver.py가 예산 상한·소켓/DDR/파워 제약 안에서 부품을 결정적으로 고르고
+#              LLM은 description/reason만 작성 (호환성 때문에 재생성하는 일이 없음)
+QUOTE_GEN_MODE = os.getenv("QUOTE_GEN_MODE", "batch")
+# 1이면 generate_quotes 프롬프트에 후보를 짧은 ID(G3, M7) + 핵심 스펙으로 넣고 LLM은 ID만 답함
+# (서버가 ID → 제품명·가격 복원). 0이면 기존처럼 전체 제품명·가격을 주고받음
+QUOTE_PROMPT_IDS = os.getenv("QUOTE_PROMPT_IDS", "1")
+
+# ── LLM 응답 캐시 (analyze_request / tune_allocation) ───────────
+# 같은 프롬프트(정규화) + 모델 + temperature면 OpenAI 호출 없이 SQLite에 저장된 응답 재사용
+LLM_CACHE             = os.getenv("LLM_CACHE", "1")
+LLM_CACHE_PATH        = os.getenv("LLM_CACHE_PATH") or str(GIT_ROOT / "cache" / "llm_cache.sqlite3")
+LLM_CACHE_TTL_HOURS   = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# 시맨틱 캐시 — 표현만 다른 참고사항도 (같은 용도·예산 구간 안에서) 코사인 유사도로 tune_allocation 결과 재사용
+SEMANTIC_CACHE           = os.getenv("SEMANTIC_CACHE", "1")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# 적중 중 이 비율만큼 백그라운드로 LLM을 다시 호출해 결과 일치 여부(오재사용률)를 기록
+SEMANTIC_CACHE_AUDIT     = float(os.getenv("SEMANTIC_CACHE_AUDIT", "0.05"))
+# 호환성 LLM 폴백 판정 캐시 — (CPU, 메인보드, RAM, 파워, GPU) 조합별 판정을 같은 SQLite 파일에 저장
+# 판정은 LLM 응답이라 오판이 영구히 재사용되지 않게 TTL로 만료 (판정 프롬프트가 바뀌면 키도 바뀜)
+COMPAT_VERDICT_CACHE       = os.getenv("COMPAT_VERDICT_CACHE", "1")
+COMPAT_VERDICT_TTL_HOURS   = float(os.getenv("COMPAT_VERDICT_TTL_HOURS", "720"))
+COMPAT_VERDICT_MAX_ENTRIES = int(os.getenv("COMPAT_VERDICT_MAX_ENTRIES", "20000"))
 
 # ── Django 민감 정보 (settings.py가 여기서 읽어 감) ─────────────
 DJANGO_SECRET_KEY = os.getenv(
@@ -0,0 +1,452 @@
+"""
+embedding.py — 임베딩 백엔드 선택 (PyTorch / ONNX int8)
+
+graph.py(쿼리 임베딩)와 루트의 vectordb.py(문서 임베딩)가 같은 모듈을 쓴다.
+vectordb.py는 Django 밖에서 sys.path로 이 파일을 불러오므로 config.py 등
+패키지 상대 import 없이 독립적으로 동작해야 한다.
+
+백엔드:
+    torch : SentenceTransformer 원본 (full precision)
+    onnx  : export_onnx()로 만든 int8 동적 양자화 ONNX 모델 + onnxruntime
+
+두 백엔드 모두 SentenceTransformer와 같은 encode() 시그니처를 제공하므로
+호출부는 백엔드를 몰라도 된다.
+
+truncate_embeddings()는 Matryoshka 차원 축소 — 빌더(문서)와 쿼리가 같은 함수로 자른다.
+
+QueryEmbeddingCache는 쿼리 쪽(graph.py)에서 키워드 → 벡터를 재사용하는 LRU 캐시다.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Snowflake arctic-embed는 쿼리 쪽에만 아래 프롬프트를 붙인다 (문서는 그대로)
+QUERY_PROMPT = "Represent this sentence for searching relevant passages: "
+
+ONNX_CONFIG_NAME = "embed_config.json"
+ONNX_FP32_NAME   = "model.onnx"
+ONNX_INT8_NAME   = "model.int8.onnx"
+
+
+# ══════════════════════════════════════════════════════════════════
+# ONNX 런타임 임베더
+# ══════════════════════════════════════════════════════════════════
+
+class OnnxEmbedder:
+    """
+    export_onnx() 결과 폴더를 로드해 SentenceTransformer처럼 encode()를 제공한다.
+    풀링(cls/mean)과 정규화는 내보낼 때 기록한 embed_config.json을 따른다.
+    """
+
+    def __init__(self, onnx_dir: str, n_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        root = Path(onnx_dir)
+        cfg_path = root / ONNX_CONFIG_NAME
+        if not cfg_path.exists():
+            raise FileNotFoundError(
+                f"{cfg_path} 없음 — python embed_onnx.py export 를 먼저 실행하세요."
+            )
+        self.config         = json.loads(cfg_path.read_text(encoding="utf-8"))
+        self.model_id       = self.config["model_id"]
+        self.pooling        = self.config.get("pooling", "cls")
+        self.max_seq_length = int(self.config.get("max_seq_length", 512))
+        self._dim           = int(self.config["dim"])
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(root))
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if n_threads > 0:
+            opts.intra_op_num_threads = n_threads
+        model_file = ONNX_INT8_NAME if self.config.get("quantized") else ONNX_FP32_NAME
+        self.session = ort.InferenceSession(
+            str(root / model_file), sess_options=opts, providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dim
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(
+            texts, padding=True, truncation=True,
+            max_length=self.max_seq_length, return_tensors="np",
+        )
+        feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._input_names}
+        hidden = self.session.run(None, feeds)[0]            # (batch, seq, dim)
+        if self.pooling == "mean":
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return hidden[:, 0]                                   # cls
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False, **_) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, self._dim), dtype=np.float32)
+
+        # 길이 내림차순으로 배치를 만들어 패딩 낭비를 줄이고, 끝에서 원래 순서로 되돌린다
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        out   = np.empty((len(sentences), self._dim), dtype=np.float32)
+        for i in range(0, len(order), batch_size):
+            idx = order[i:i + batch_size]
+            out[idx] = self._encode_batch([sentences[j] for j in idx])
+
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out
+
+
+def load_embedder(backend: str, model_id: str, onnx_dir: Optional[str] = None,
+                  device: str = "cpu", n_threads: int = 0):
+    """
+    백엔드 이름으로 임베더를 만든다.
+
+        "torch" → SentenceTransformer(model_id, device)
+        "onnx"  → OnnxEmbedder(onnx_dir)  (CPU 전용)
+    """
+    if backend == "onnx":
+        if not onnx_dir:
+            raise ValueError("onnx 백엔드에는 onnx_dir이 필요합니다.")
+        return OnnxEmbedder(onnx_dir, n_threads=n_threads)
+    if backend != "torch":
+        raise ValueError(f"알 수 없는 임베딩 백엔드: {backend!r} (torch | onnx)")
+
+    from sentence_transformers import SentenceTransformer
+    if n_threads > 0:
+        import torch
+        torch.set_num_threads(n_threads)
+    return SentenceTransformer(model_id, device=device)
+
+
+# ══════════════════════════════════════════════════════════════════
+# Matryoshka 차원 축소
+# ══════════════════════════════════════════════════════════════════
+
+def truncate_embeddings(vecs: np.ndarray, dim: int) -> np.ndarray:
+    """
+    앞쪽 dim개 차원만 남기고 다시 L2 정규화한다 (dim <= 0 또는 원래 차원 이상이면 그대로).
+    arctic-embed v2는 Matryoshka 학습이라 앞부분 256/512차원만으로도 검색 품질이 대부분 유지된다.
+    """
+    vecs = np.asarray(vecs, dtype=np.float32)
+    if dim <= 0 or dim >= vecs.shape[-1]:
+        return vecs
+    out = np.ascontiguousarray(vecs[..., :dim])
+    return out / np.clip(np.linalg.norm(out, axis=-1, keepdims=True), 1e-12, None)
+
+
+# ══════════════════════════════════════════════════════════════════
+# ONNX 내보내기 + int8 동적 양자화
+# ══════════════════════════════════════════════════════════════════
+
+def _pooling_mode(st_model) -> str:
+    """SentenceTransformer 모듈 구성에서 풀링 방식을 읽는다 (arctic-embed는 cls)"""
+    for module in st_model:
+        if module.__class__.__name__ == "Pooling":
+            if getattr(module, "pooling_mode_cls_token", False):
+                return "cls"
+            if getattr(module, "pooling_mode_mean_tokens", False):
+                return "mean"
+    return "cls"
+
+
+def export_onnx(model_id: str, out_dir: str, quantize: bool = True,
+                opset: int = 17) -> Path:
+    """
+    SentenceTransformer 모델의 트랜스포머 본체를 ONNX로 내보내고,
+    quantize=True면 onnxruntime 동적 양자화(가중치 int8)를 적용한다.
+
+    결과 폴더: model.onnx (+ 외부 가중치), model.int8.onnx, 토크나이저 파일, embed_config.json
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    root = Path(out_dir)
+    root.mkdir(parents=True, exist_ok=True)
+
+    st        = SentenceTransformer(model_id, device="cpu")
+    hf_model  = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+
+    class _Body(torch.nn.Module):
+        def __init__(self, m):
+            super().__init__()
+            self.m = m
+
+        def forward(self, input_ids, attention_mask):
+            return self.m(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample = tokenizer(["PC 부품 예시 문장"], return_tensors="pt")
+    fp32_path = root / ONNX_FP32_NAME
+    with torch.no_grad():
+        torch.onnx.export(
+            _Body(hf_model),
+            (sample["input_ids"], sample["attention_mask"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids":         {0: "batch", 1: "seq"},
+                "attention_mask":    {0: "batch", 1: "seq"},
+                "last_hidden_state": {0: "batch", 1: "seq"},
+            },
+            opset_version=opset,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            str(fp32_path), str(root / ONNX_INT8_NAME),
+            weight_type=QuantType.QInt8,
+            use_external_data_format=True,   # 2GB protobuf 한도 회피 (가중치를 별도 파일로 저장)
+        )
+
+    tokenizer.save_pretrained(str(root))
+    config = {
+        "model_id":       model_id,
+        "pooling":        _pooling_mode(st),
+        "dim":            st.get_sentence_embedding_dimension(),
+        "max_seq_length": st.max_seq_length,
+        "quantized":      quantize,
+    }
+    (root / ONNX_CONFIG_NAME).write_text(
+        json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8",
+    )
+    return root
+
+
+# ══════════════════════════════════════════════════════════════════
+# 정확도 검증: PyTorch 벡터 ↔ 후보 백엔드 벡터
+# ══════════════════════════════════════════════════════════════════
+
+def compare_backends(reference, candidate, documents: List[str], queries: List[str],
+                     query_prompt: str = "", k: int = 10, batch_size: int = 32) -> Dict[str, float]:
+    """
+    두 임베더가 같은 입력에 대해 얼마나 같은 결과를 내는지 측정한다.
+
+    반환:
+        doc_cos_mean / doc_cos_min   : 문서별 (기준 벡터 · 후보 벡터) 코사인 평균/최솟값
+        query_cos_mean / query_cos_min: 쿼리별 코사인 평균/최솟값
+        topk_overlap                 : 쿼리마다 각 백엔드가 documents에서 뽑은 top-k의 교집합 비율 평균
+        top1_agree                   : top-1 문서가 같은 쿼리 비율
+    """
+    q_texts = [query_prompt + q for q in queries]
+    kw = dict(batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True)
+
+    ref_docs, cand_docs = reference.encode(documents, **kw), candidate.encode(documents, **kw)
+    ref_q,    cand_q    = reference.encode(q_texts, **kw),   candidate.encode(q_texts, **kw)
+
+    doc_cos = np.sum(ref_docs * cand_docs, axis=1)
+    q_cos   = np.sum(ref_q * cand_q, axis=1)
+
+    k = min(k, len(documents))
+    ref_top  = np.argsort(-(ref_q @ ref_docs.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_q @ cand_docs.T), axis=1)[:, :k]
+    overlap  = [len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]
+
+    return {
+        "doc_cos_mean":   float(doc_cos.mean()),
+        "doc_cos_min":    float(doc_cos.min()),
+        "query_cos_mean": float(q_cos.mean()),
+        "query_cos_min":  float(q_cos.min()),
+        "topk_overlap":   float(np.mean(overlap)),
+        "top1_agree":     float(np.mean(ref_top[:, 0] == cand_top[:, 0])),
+        "k":              k,
+    }
+
+
+# ══════════════════════════════════════════════════════════════════
+# 쿼리 임베딩 캐시 (프로세스 공용 LRU + 선택적 mmap 디스크 스필)
+# ══════════════════════════════════════════════════════════════════
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 정규화 — NFKC + 연속 공백 정리 ("RTX  4060 " → "RTX 4060")"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def _key_hash(key: str) -> int:
+    """0은 빈 슬롯 표시로 예약"""
+    h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return h or 1
+
+
+def _spill_tag(model_key: str) -> str:
+    return hashlib.sha1(model_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _spill_base(spill_dir: str, model_key: str, dim: int, slots: int) -> Path:
+    return Path(spill_dir) / f"query_emb_{_spill_tag(model_key)}_{dim}x{slots}"
+
+
+def _create_zeroed(path: Path, nbytes: int) -> None:
+    """
+    0으로 채운 nbytes 파일을 path에 원자적으로 만든다. 이미 있으면 건드리지 않는다.
+    임시 파일을 다 만든 뒤 os.link로 게시하므로 동시에 시작한 워커끼리 서로의 파일을 자르거나
+    크기가 덜 잡힌 파일을 여는 일이 없다.
+    """
+    if path.exists():
+        return
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.truncate(nbytes)
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class _MmapSpill:
+    """
+    direct-mapped 디스크 캐시. 슬롯 = hash(key) % slots 이고, 슬롯마다 키 해시를 함께 저장해
+    읽을 때 검증한다 → 별도 인덱스 파일이 없어 여러 워커 프로세스가 같은 파일을 공유해도
+    깨진 값을 돌려주지 않는다 (충돌 시 덮어쓰기 = 캐시 미스일 뿐).
+    """
+
+    def __init__(self, spill_dir: str, model_key: str, dim: int, slots: int):
+        Path(spill_dir).mkdir(parents=True, exist_ok=True)
+        base = _spill_base(spill_dir, model_key, dim, slots)
+        vec_path, key_path = base.with_suffix(".f32"), base.with_suffix(".keys")
+        _create_zeroed(vec_path, slots * dim * 4)
+        _create_zeroed(key_path, slots * 8)
+        self.slots = slots
+        self._vecs = np.memmap(vec_path, dtype=np.float32, mode="r+", shape=(slots, dim))
+        self._keys = np.memmap(key_path, dtype=np.uint64, mode="r+", shape=(slots,))
+
+    @staticmethod
+    def existing_dim(spill_dir: str, model_key: str, slots: int) -> int:
+        """이전 프로세스가 만든 스필 파일의 차원 (없거나 여러 개면 0)"""
+        pattern = f"query_emb_{_spill_tag(model_key)}_*x{slots}.keys"
+        dims = {int(p.stem.rsplit("_", 1)[1].split("x")[0])
+                for p in Path(spill_dir).glob(pattern) if p.with_suffix(".f32").exists()}
+        return dims.pop() if len(dims) == 1 else 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        h = _key_hash(key)
+        slot = h % self.slots
+        if int(self._keys[slot]) != h:
+            return None
+        vec = np.array(self._vecs[slot])
+        return vec if int(self._keys[slot]) == h else None   # 읽는 도중 덮어쓰기 감지
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        h = _key_hash(key)
+        slot = h % self.slots
+        self._keys[slot] = 0          # 쓰는 동안 무효화 → 벡터 기록 → 키 기록
+        self._vecs[slot] = vec
+        self._keys[slot] = h
+
+
+class QueryEmbeddingCache:
+    """
+    정규화된 쿼리 문자열 → 임베딩 벡터 LRU 캐시 (스레드 안전).
+
+    - 키에 model_key(백엔드·모델 ID·쿼리 프롬프트)를 포함 → 모델이 바뀌면 자동으로 무효화
+    - max_entries 초과 시 가장 오래 안 쓴 항목부터 제거
+    - spill_dir를 주면 새로 계산한 벡터를 mmap 파일에도 기록(write-through)해
+      메모리에서 밀려난 키나 다른 워커/재시작 후의 요청도 디스크에서 찾는다
+    - dim(쿼리 벡터 차원)을 알면 생성 시 스필을 바로 연다. 모르면(0) 같은 모델의 기존 스필 파일을
+      찾아 열고, 그것도 없으면 첫 인코딩 결과의 차원으로 만든다 → 첫 요청부터 디스크 조회
+    """
+
+    def __init__(self, model_key: str, max_entries: int = 4096,
+                 spill_dir: str = "", spill_slots: int = 65536, dim: int = 0):
+        self.model_key   = model_key
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock        = threading.Lock()
+        self._spill_dir   = spill_dir
+        self._spill_slots = spill_slots
+        self._spill: Optional[_MmapSpill] = None
+        self.hits = self.spill_hits = self.misses = 0
+        if spill_dir and dim:
+            self._spill = _MmapSpill(spill_dir, model_key, dim, spill_slots)
+        else:
+            self._open_existing()
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_key}\x00{text}"
+
+    def _open_existing(self) -> Optional[_MmapSpill]:
+        """차원을 모를 때 — 다른 워커/이전 프로세스가 만든 스필 파일이 있으면 연다"""
+        if self._spill is None and self._spill_dir:
+            dim = _MmapSpill.existing_dim(self._spill_dir, self.model_key, self._spill_slots)
+            if dim:
+                self._spill = _MmapSpill(self._spill_dir, self.model_key, dim, self._spill_slots)
+        return self._spill
+
+    def _spill_for(self, dim: int) -> Optional[_MmapSpill]:
+        if self._spill is None and self._spill_dir:
+            self._spill = _MmapSpill(self._spill_dir, self.model_key, dim, self._spill_slots)
+        return self._spill
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def encode(self, texts: List[str],
+               encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        texts의 벡터를 (len(texts), dim)으로 반환한다.
+        캐시에 없는 텍스트만 모아 encode_fn을 한 번 호출한다.
+        """
+        norm = [normalize_query(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for t in dict.fromkeys(norm):
+                key = self._key(t)
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    found[t] = vec
+                    continue
+                spill = self._spill if self._spill is not None else self._open_existing()
+                vec = spill.get(key) if spill is not None else None
+                if vec is not None:
+                    self.spill_hits += 1
+                    self._remember(key, vec)
+                    found[t] = vec
+                else:
+                    self.misses += 1
+                    missing.append(t)
+
+        if missing:
+            vecs = np.asarray(encode_fn(missing), dtype=np.float32)
+            with self._lock:
+                spill = self._spill_for(vecs.shape[1])
+                for t, vec in zip(missing, vecs):
+                    key = self._key(t)
+                    self._remember(key, vec)
+                    if spill is not None:
+                        spill.put(key, vec)
+                    found[t] = vec
+
+        return np.stack([found[t] for t in norm]) if norm else np.zeros((0, 0), np.float32)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.spill_hits + self.misses
+            return {
+                "entries":    len(self._lru),
+                "hits":       self.hits,
+                "spill_hits": self.spill_hits,
+                "misses":     self.misses,
+                "hit_rate":   round((self.hits + self.spill_hits) / total, 4) if total else 0.0,
+            }
@@ -3,12 +3,13 @@ graph.py — PC 견적 추천 LangGraph 파이프라인
 
 실행 흐름:
   START
-    ↓
-  analyze_request   # OpenAI: 사용자 입력 → 검색 키워드 JSON
-    ↓
+    ↓                         ↓   (동시 실행)
+  analyze_request          tune_allocation   # 키워드 JSON | 예산 배분·RGB·색상
+    ↓                         ↓   (둘 다 끝나면 합류)
   search_parts      # ChromaDB: 카테고리 필터 검색 → 후보 부품 수집
     ↓
   generate_quotes   # OpenAI: 후보 부품 → 견적 5세트 JSON
+                    # (QUOTE_GEN_MODE=solver: 로컬 조합 탐색으로 부품 확정 → LLM은 설명만)
     ↓
   check_compatibility  # JSON 룰 기반 소켓/DDR/전력 검증
     ↓
@@ -19,31 +20,73 @@ graph.py — PC 견적 추천 LangGraph 파이프라인
   END
 """
 
+import asyncio
+import bisect
+import gc
+import hashlib
 import json
 import os
+import random
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Annotated, Any, Dict, List, Optional, TypedDict
 
 import certifi
 import chromadb
+import numpy as np
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
-from sentence_transformers import SentenceTransformer
 
+from .candidate_pool import CandidatePool, _parse_price
+from .compat_index import CompatIndex
 from .compatibility import check_compat_meta
+from .keyword_planner import KeywordPlanner
+from .llm_cache import CompatVerdictCache, LLMCache, SemanticCache, cache_key
+from .quote_solver import QuoteSolver
+from .embedding import QUERY_PROMPT, QueryEmbeddingCache, load_embedder, truncate_embeddings
+from .vector_index import InMemoryIndex
 os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
 os.environ["SSL_CERT_FILE"]      = certifi.where()
 
 from .config import (
     CHROMA_COLLECTION,
     CHROMA_DIR,
+    COMPAT_INDEX,
+    COMPAT_INDEX_PATH,
+    COMPAT_VERDICT_CACHE,
+    COMPAT_VERDICT_MAX_ENTRIES,
+    COMPAT_VERDICT_TTL_HOURS,
+    EMBED_DIM,
+    EMBEDDING_BACKEND,
     EMBEDDING_MODEL,
     HF_OFFLINE,
+    KEYWORD_PLAN_PATH,
+    KEYWORD_PLANNER,
+    LLM_CACHE,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_HOURS,
+    ONNX_MODEL_DIR,
     OPENAI_API_KEY,
     OPENAI_MODEL,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_SPILL_DIR,
+    QUERY_CACHE_SPILL_SLOTS,
+    QUOTE_GEN_MODE,
+    QUOTE_PROMPT_IDS,
+    SEMANTIC_CACHE,
+    SEMANTIC_CACHE_AUDIT,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEARCH_WORKERS,
+    VECTOR_BACKEND,
+    VECTOR_DTYPE,
 )
 
 # HF_OFFLINE=1 이면 캐시만 사용 (집 PC / 이미 다운로드된 환경)
@@ -55,6 +98,19 @@ if HF_OFFLINE == "1":
 # ══════════════════════════════════════════════════════════════════
 # GraphState 정의
 # ══════════════════════════════════════════════════════════════════
+def _merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """timings reducer — 노드가 반환한 구간별 시간(ms)을 기존 dict에 병합 (같은 키는 최신 값)"""
+    return {**(left or {}), **(right or {})}
+
+
+def _sum_counts(left: Dict[str, int], right: Dict[str, int]) -> Dict[str, int]:
+    """token_usage reducer — 같은 키는 더한다 (재시도·유형별 호출의 토큰 합계)"""
+    merged = dict(left or {})
+    for k, v in (right or {}).items():
+        merged[k] = merged.get(k, 0) + v
+    return merged
+
+
 class GraphState(TypedDict):
     """
     LangGraph가 노드 간에 공유하는 전체 상태(State) 정의.
@@ -67,6 +123,12 @@ class GraphState(TypedDict):
     나머지 필드:
         노드가 반환한 dict의 키가 state의 키와 같으면 해당 값이 교체(replace)된다.
         (add_messages 같은 reducer 없이는 항상 마지막 값으로 덮어씀)
+
+    timings:
+        _merge_timings reducer로 노드별·구간별 소요 시간(ms)을 누적한다.
+        예) {"search_parts": 412.3, "search_parts.GPU": 388.0, ...}
+        "<노드>.start"는 파이프라인 시작(started_at) 기준 노드 시작 시각(ms)
+        → analyze_request와 tune_allocation의 구간이 겹치는 것을 확인할 수 있다.
     """
 
     # ── 진행 로그 (누적) ─────────────────────────────────────────
@@ -79,7 +141,7 @@ class GraphState(TypedDict):
 
     # ── 파이프라인 중간 상태 ──────────────────────────────────────
     keywords:   Dict[str, List[str]]          # {카테고리: [검색어, ...]}
-    candidates: Dict[str, List[Dict[str, Any]]] # {카테고리: [{제품 정보 + 메타데이터}, ...]}
+    candidates: CandidatePool                 # {카테고리: [{제품 정보 + 메타데이터}, ...]} + 제품명/id 색인
     raw_quotes: List[Dict[str, Any]]          # OpenAI가 생성한 견적 후보 (최대 5)
     valid_quotes: List[Dict[str, Any]]        # 호환성 통과 견적
 
@@ -97,6 +159,11 @@ class GraphState(TypedDict):
                                     # → generate_quotes 재시도 시 프롬프트에 포함해 같은 실수 방지
     error: Optional[str]            # 노드 내 오류 메시지
 
+    # ── 계측 (누적) ──────────────────────────────────────────────
+    started_at: float                                     # 파이프라인 시작 시각 (perf_counter)
+    timings: Annotated[Dict[str, float], _merge_timings]  # 구간별 소요 시간 (ms)
+    token_usage: Annotated[Dict[str, int], _sum_counts]   # LLM 토큰 수 {"<노드>.input"/".output": n}
+
 
 # ══════════════════════════════════════════════════════════════════
 # 공유 리소스 — Lazy 초기화 (첫 요청 시 1회만 실행)
@@ -107,10 +174,24 @@ class GraphState(TypedDict):
 
 _chroma_client = None
 _collection    = None
+_memory_index  = None
 _embed_model   = None
+_query_cache   = None
+_query_dim     = None
+_search_pool   = None
 _llm           = None
+_async_llms: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()   # 이벤트 루프 → ChatOpenAI
+_llm_cache     = None
+_semantic_cache = None
+_keyword_planner = None
+_verdict_cache   = None
+_compat_index    = None
 
-_QUERY_PROMPT = "Represent this sentence for searching relevant passages: "
+# 위 리소스 초기화 잠금 — 동시에 들어온 첫 요청들(스레드 풀의 search_parts, async 뷰)이
+# Chroma 클라이언트·모델을 중복 생성하지 않도록. 초기화가 서로 호출하므로 RLock.
+_init_lock = threading.RLock()
+
+_QUERY_PROMPT = QUERY_PROMPT
 
 # ── 용도별 기본 예산 배분 비율 ─────────────────────────────────────
 # 새 하드웨어 세대가 나와도 비율은 바뀌지 않으므로 하드코딩이 적절함
@@ -135,51 +216,256 @@ def _get_collection():
     """ChromaDB 컬렉션 — 최초 호출 시 초기화"""
     global _chroma_client, _collection
     if _collection is None:
-        _chroma_client = chromadb.PersistentClient(
-            path=CHROMA_DIR,
-            settings=chromadb.Settings(anonymized_telemetry=False),
-        )
-        _collection = _chroma_client.get_collection(CHROMA_COLLECTION)
+        with _init_lock:
+            if _collection is None:
+                _chroma_client = chromadb.PersistentClient(
+                    path=CHROMA_DIR,
+                    settings=chromadb.Settings(anonymized_telemetry=False),
+                )
+                _collection = _chroma_client.get_collection(CHROMA_COLLECTION)
     return _collection
 
 
+def _get_search_index():
+    """
+    search_parts가 쓰는 검색 백엔드 (VECTOR_BACKEND).
+        chroma : ChromaDB 컬렉션 (HNSW + SQLite 메타데이터)
+        memory : 컬렉션 전체를 한 번 읽어 만든 InMemoryIndex (정확 검색, 최초 호출 시 로드)
+    둘 다 같은 query() 인터페이스를 제공한다.
+    """
+    global _memory_index
+    if VECTOR_BACKEND != "memory":
+        return _get_collection()
+    if _memory_index is None:
+        with _init_lock:
+            if _memory_index is None:
+                _memory_index = InMemoryIndex.from_collection(_get_collection(), dtype=VECTOR_DTYPE)
+    return _memory_index
+
+
 def _get_embed_model():
-    """임베딩 모델 — 최초 호출 시 로드 (캐시 없으면 자동 다운로드)"""
+    """임베딩 모델 — 최초 호출 시 로드 (EMBEDDING_BACKEND: torch | onnx)"""
     global _embed_model
     if _embed_model is None:
-        _embed_model = SentenceTransformer(
-            EMBEDDING_MODEL, device="cpu"
-        )
+        with _init_lock:
+            if _embed_model is None:
+                _embed_model = load_embedder(
+                    EMBEDDING_BACKEND, EMBEDDING_MODEL, onnx_dir=ONNX_MODEL_DIR, device="cpu"
+                )
     return _embed_model
 
 
+def _get_query_dim() -> int:
+    """
+    쿼리 벡터 차원 (Matryoshka). EMBED_DIM이 0이면 vectordb.py --dim이 컬렉션 메타데이터에
+    남긴 embed_dim을 따른다 → 문서 벡터와 쿼리 벡터 차원이 항상 일치. 0 = 축소 안 함.
+    """
+    global _query_dim
+    if _query_dim is None:
+        _query_dim = EMBED_DIM or int((_get_collection().metadata or {}).get("embed_dim", 0))
+    return _query_dim
+
+
+def _get_query_cache() -> QueryEmbeddingCache:
+    """쿼리 임베딩 캐시 — 키에 백엔드·모델 ID·쿼리 프롬프트·차원을 포함 (모델 변경 시 자동 무효화)"""
+    global _query_cache
+    if _query_cache is None:
+        with _init_lock:
+            if _query_cache is None:
+                _query_cache = QueryEmbeddingCache(
+                    model_key=f"{EMBEDDING_BACKEND}:{EMBEDDING_MODEL}:{_get_query_dim()}:{_QUERY_PROMPT}",
+                    max_entries=QUERY_CACHE_SIZE,
+                    spill_dir=QUERY_CACHE_SPILL_DIR,
+                    spill_slots=QUERY_CACHE_SPILL_SLOTS,
+                    dim=_get_query_dim(),
+                )
+    return _query_cache
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    """카테고리 병렬 검색용 스레드 풀 — 프로세스 공용, SEARCH_WORKERS개로 제한"""
+    global _search_pool
+    if _search_pool is None:
+        with _init_lock:
+            if _search_pool is None:
+                _search_pool = ThreadPoolExecutor(
+                    max_workers=max(1, SEARCH_WORKERS), thread_name_prefix="search"
+                )
+    return _search_pool
+
+
+def _new_llm() -> ChatOpenAI:
+    return ChatOpenAI(
+        api_key=OPENAI_API_KEY,
+        model=OPENAI_MODEL,
+        temperature=0.3,
+        model_kwargs={"response_format": {"type": "json_object"}},
+    )
+
+
 def _get_llm():
     """OpenAI LLM 클라이언트 — 최초 호출 시 생성"""
     global _llm
     if _llm is None:
-        _llm = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model=OPENAI_MODEL,
-            temperature=0.3,
-            model_kwargs={"response_format": {"type": "json_object"}},
-        )
+        with _init_lock:
+            if _llm is None:
+                _llm = _new_llm()
     return _llm
 
 
+def _get_async_llm():
+    """
+    비동기 경로(ainvoke)용 LLM 클라이언트 — 이벤트 루프마다 하나.
+    비동기 HTTP 커넥션 풀은 만들어진 루프에 묶이므로, WSGI에서 async 뷰가 요청마다 새 루프로
+    실행될 때 이전 루프의 클라이언트를 재사용하면 'Event loop is closed'가 난다.
+    루프가 사라지면 WeakKeyDictionary에서 함께 빠진다.
+    """
+    loop = asyncio.get_running_loop()
+    llm = _async_llms.get(loop)
+    if llm is None:
+        llm = _async_llms[loop] = _new_llm()
+    return llm
+
+
+def _get_llm_cache() -> Optional[LLMCache]:
+    """LLM 응답 캐시 — LLM_CACHE=0이면 None"""
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE == "1":
+        with _init_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMCache(
+                    LLM_CACHE_PATH,
+                    ttl_s=LLM_CACHE_TTL_HOURS * 3600,
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                )
+    return _llm_cache
+
+
+def _get_semantic_cache() -> Optional[SemanticCache]:
+    """tune_allocation 시맨틱 캐시 — SEMANTIC_CACHE=0이면 None (LLM 캐시와 같은 SQLite 파일)"""
+    global _semantic_cache
+    if _semantic_cache is None and SEMANTIC_CACHE == "1":
+        with _init_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(LLM_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD)
+    return _semantic_cache
+
+
+def _get_verdict_cache() -> Optional[CompatVerdictCache]:
+    """호환성 LLM 폴백 판정 캐시 — COMPAT_VERDICT_CACHE=0이면 None (LLM 캐시와 같은 SQLite 파일)"""
+    global _verdict_cache
+    if _verdict_cache is None and COMPAT_VERDICT_CACHE == "1":
+        with _init_lock:
+            if _verdict_cache is None:
+                _verdict_cache = CompatVerdictCache(
+                    LLM_CACHE_PATH, model=OPENAI_MODEL, version=_COMPAT_PROMPT_VERSION,
+                    ttl_s=COMPAT_VERDICT_TTL_HOURS * 3600, max_entries=COMPAT_VERDICT_MAX_ENTRIES,
+                )
+    return _verdict_cache
+
+
+def _get_keyword_planner() -> Optional[KeywordPlanner]:
+    """키워드 플랜 — 파일이 없거나 KEYWORD_PLANNER=0이면 None (다음 호출 때 다시 확인)"""
+    global _keyword_planner
+    if _keyword_planner is None and KEYWORD_PLANNER == "1":
+        with _init_lock:
+            if _keyword_planner is None:
+                _keyword_planner = KeywordPlanner.load(KEYWORD_PLAN_PATH)
+    return _keyword_planner
+
+
+def _get_compat_index() -> Optional[CompatIndex]:
+    """호환성 인덱스 — 파일이 없거나 COMPAT_INDEX=0이면 None (다음 호출 때 다시 확인)"""
+    global _compat_index
+    if _compat_index is None and COMPAT_INDEX == "1":
+        with _init_lock:
+            if _compat_index is None:
+                _compat_index = CompatIndex.load(COMPAT_INDEX_PATH)
+    return _compat_index
+
+
 # ══════════════════════════════════════════════════════════════════
 # 유틸 함수
 # ══════════════════════════════════════════════════════════════════
 
-def _encode_query(text: str) -> list:
+def _cached_llm_response(llm, prompt: str) -> tuple:
+    """(캐시 키, 적중한 응답 또는 None) — 캐시가 꺼져 있으면 ("", None)"""
+    cache = _get_llm_cache()
+    if not cache:
+        return "", None
+    key = cache_key(prompt, llm.model_name, llm.temperature)
+    return key, cache.get(key)
+
+
+def _store_llm_response(llm, key: str, content: str, latency_ms: float) -> None:
+    """JSON으로 파싱되는 응답만 저장 → 깨진 응답이 캐시에 남아 계속 재사용되는 일이 없다."""
+    cache = _get_llm_cache()
+    if not cache:
+        return
+    try:
+        json.loads(content)
+        cache.put(key, llm.model_name, content, latency_ms)
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+
+def _invoke_llm(prompt: str) -> tuple:
+    """캐시를 거쳐 LLM을 호출하고 (응답 텍스트, 캐시 적중 여부)를 반환한다."""
+    llm = _get_llm()
+    key, hit = _cached_llm_response(llm, prompt)
+    if hit is not None:
+        return hit, True
+
+    t0 = time.perf_counter()
+    content = llm.invoke([HumanMessage(content=prompt)]).content
+    _store_llm_response(llm, key, content, (time.perf_counter() - t0) * 1000)
+    return content, False
+
+
+async def _ainvoke_llm(prompt: str) -> tuple:
+    """_invoke_llm의 비동기 버전 — 응답을 기다리는 동안 이벤트 루프가 다른 요청을 처리한다."""
+    llm = _get_async_llm()
+    key, hit = _cached_llm_response(llm, prompt)   # SQLite 조회는 1ms 미만 → 루프에서 바로 실행
+    if hit is not None:
+        return hit, True
+
+    t0 = time.perf_counter()
+    content = (await llm.ainvoke([HumanMessage(content=prompt)])).content
+    _store_llm_response(llm, key, content, (time.perf_counter() - t0) * 1000)
+    return content, False
+
+
+def _encode_queries(texts: List[str]) -> np.ndarray:
     """
-    검색 쿼리를 ChromaDB용 임베딩 벡터로 변환.
+    검색 쿼리 여러 개를 임베딩 벡터 (len(texts), dim)로 변환.
+    캐시에 있는 키워드는 조회만 하고, 없는 키워드만 모아 한 번의 encode 호출로 계산한다.
     Snowflake 모델은 '문서용 임베딩'과 '쿼리용 임베딩'을 구분하므로
     쿼리 앞에 _QUERY_PROMPT를 붙여야 정확도가 올라간다.
+    컬렉션이 Matryoshka 축소(vectordb.py --dim)로 빌드됐으면 같은 차원으로 잘라 재정규화한다.
     """
-    return _get_embed_model().encode(
-        [_QUERY_PROMPT + text],
-        normalize_embeddings=True,
-    ).tolist()
+    dim = _get_query_dim()
+    return _get_query_cache().encode(
+        texts,
+        lambda missing: truncate_embeddings(
+            _get_embed_model().encode(
+                [_QUERY_PROMPT + t for t in missing],
+                normalize_embeddings=True,
+            ),
+            dim,
+        ),
+    )
+
+
+def _request_keywords(keywords: Dict[str, Any]) -> Dict[str, List[str]]:
+    """카테고리별 키워드 정리 — 문자열 하나로 온 값은 리스트로, 공백·중복 제거"""
+    out: Dict[str, List[str]] = {}
+    for cat in _SEARCH_CATS:
+        raw = keywords.get(cat, [cat])
+        if isinstance(raw, str):
+            raw = [raw]
+        kws = list(dict.fromkeys(str(k).strip() for k in raw if str(k).strip()))
+        out[cat] = kws or [cat]
+    return out
 
 
 
@@ -231,18 +517,58 @@ def analyze_request(state: GraphState) -> dict:
       → 'gaming'만 넘기는 것보다 구체적인 하드웨어 우선순위를 함께 전달하면
          LLM이 더 적합한 키워드를 생성한다.
     - notes(추가 요구사항)도 함께 반영
+    - notes가 비어 있으면 입력은 (용도, 예산)뿐 → 빌드 시 만든 키워드 플랜(가격대별 제품군)으로
+      LLM 없이 키워드 생성 (플랜 파일이 없으면 LLM)
     - JSON 파싱 실패 시 폴백: 기본 키워드로 대체
     - 출력: keywords dict + messages 누적
     """
+    planned = _analyze_with_plan(state)
+    if planned is not None:
+        return planned
+    content, cached = _invoke_llm(_analyze_prompt(state))
+    return _analyze_result(state, content, cached)
+
+
+async def aanalyze_request(state: GraphState) -> dict:
+    """[Node 1 · 비동기] analyze_request와 같고 LLM 호출만 await"""
+    planned = _analyze_with_plan(state)
+    if planned is not None:
+        return planned
+    content, cached = await _ainvoke_llm(_analyze_prompt(state))
+    return _analyze_result(state, content, cached)
+
+
+def _purpose_label(purpose: str) -> str:
+    return _PURPOSE_GUIDE.get(purpose, _PURPOSE_GUIDE["general"])["label"]
+
+
+def _analyze_with_plan(state: GraphState) -> Optional[dict]:
+    """notes가 비어 있고 키워드 플랜이 있으면 노드 출력, 아니면 None (LLM 경로)"""
+    if state["notes"].strip():
+        return None
+    planner = _get_keyword_planner()
+    if planner is None:
+        return None
     budget  = state["budget"]
     purpose = state["purpose"]
+    alloc   = _DEFAULT_ALLOC.get(purpose, _DEFAULT_ALLOC["general"])
+    return {
+        "keywords": planner.plan(budget, alloc, _SEARCH_CATS),
+        "messages": [AIMessage(
+            content=f"[1/5] 요구사항 분석 완료 (키워드 플랜) | 예산: {budget:,}원 | {_purpose_label(purpose)}"
+        )],
+    }
+
+
+def _analyze_prompt(state: GraphState) -> str:
+    budget  = state["budget"]
     notes   = state["notes"]
 
-    guide_info = _PURPOSE_GUIDE.get(purpose, _PURPOSE_GUIDE["general"])
+    guide_info = _PURPOSE_GUIDE.get(state["purpose"], _PURPOSE_GUIDE["general"])
     purpose_ko = guide_info["label"]
     hw_guide   = guide_info["guide"]
 
-    prompt = f"""
+    return f"""
     사용자의 PC 견적 요청을 분석하여 각 카테고리별 검색 키워드를 JSON으로 생성하세요.
 
     예산: {budget:,}원
@@ -269,18 +595,22 @@ def analyze_request(state: GraphState) -> dict:
     }}
     """
 
-    response = _get_llm().invoke([HumanMessage(content=prompt)])
+
+def _analyze_result(state: GraphState, content: str, cached: bool) -> dict:
+    budget     = state["budget"]
+    purpose_ko = _purpose_label(state["purpose"])
 
     try:
-        keywords = json.loads(response.content)
-    except (json.JSONDecodeError, AttributeError):
+        keywords = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
         keywords = {cat: [purpose_ko] for cat in
                     ["CPU", "GPU", "RAM", "SSD", "HDD", "메인보드", "파워", "케이스", "쿨러"]}
 
+    cache_label = " (캐시)" if cached else ""
     return {
         "keywords": keywords,
         "messages": [AIMessage(
-            content=f"[1/5] 요구사항 분석 완료 | 예산: {budget:,}원 | {purpose_ko}"
+            content=f"[1/5] 요구사항 분석 완료{cache_label} | 예산: {budget:,}원 | {purpose_ko}"
         )],
     }
 
@@ -295,17 +625,61 @@ def tune_allocation(state: GraphState) -> dict:
 
     처리 흐름:
         notes 없음 → 기본값 반환 (LLM 없음)
-        notes 있음 → LLM 1회 호출로 아래 3가지를 한번에 추출:
+        notes 있음 → 시맨틱 캐시(같은 용도·예산 구간의 비슷한 참고사항) 적중 시 재사용,
+                     아니면 LLM 1회 호출로 아래 3가지를 한번에 추출:
             require_rgb      : 빛나는/반짝이는/예쁜/삐까 등 맥락 포함 LED 요구
             require_color    : 케이스 색상 요구 ("white" | "black" | "")
             budget_allocation: 하드웨어 선호에 맞게 비율 조정 (불필요하면 기본값 유지)
 
     하드코딩 트리거 리스트 없이 LLM이 자유 텍스트에서 의도를 직접 판단한다.
     """
-    notes   = state.get("notes", "").strip()
+    ctx = _tune_context(state)
+    if ctx["notes"]:
+        ctx = _tune_lookup(ctx, state)
+        if not ctx["hit"]:
+            ctx["fresh"] = _llm_tune(ctx["notes"], ctx["purpose"], ctx["default_alloc"])
+    return _tune_result(ctx)
+
+
+async def atune_allocation(state: GraphState) -> dict:
+    """[Node 1.5 · 비동기] tune_allocation과 같고, 임베딩·캐시 조회는 스레드로, LLM 호출은 await"""
+    ctx = _tune_context(state)
+    if ctx["notes"]:
+        ctx = await asyncio.to_thread(_tune_lookup, ctx, state)
+        if not ctx["hit"]:
+            ctx["fresh"] = await _allm_tune(ctx["notes"], ctx["purpose"], ctx["default_alloc"])
+    return await asyncio.to_thread(_tune_result, ctx)
+
+
+def _tune_context(state: GraphState) -> Dict[str, Any]:
     purpose = state.get("purpose", "general")
+    return {
+        "notes":         state.get("notes", "").strip(),
+        "purpose":       purpose,
+        "default_alloc": _DEFAULT_ALLOC.get(purpose, _DEFAULT_ALLOC["general"]).copy(),
+        "hit":           None,
+        "fresh":         None,
+    }
+
 
-    default_alloc = _DEFAULT_ALLOC.get(purpose, _DEFAULT_ALLOC["general"]).copy()
+def _tune_lookup(ctx: Dict[str, Any], state: GraphState) -> Dict[str, Any]:
+    """참고사항을 임베딩해 시맨틱 캐시(같은 용도·예산 구간의 비슷한 참고사항)를 조회"""
+    sem = _get_semantic_cache()
+    if sem:
+        ctx["scope"] = _semantic_scope(ctx["purpose"], state.get("budget", 0))
+        ctx["vec"]   = _encode_queries([ctx["notes"]])[0]
+        ctx["hit"]   = sem.lookup(ctx["scope"], ctx["vec"])
+    return ctx
+
+
+def _tune_result(ctx: Dict[str, Any]) -> dict:
+    """
+    노드 출력 조립.
+        notes 없음        → 기본값
+        시맨틱 캐시 적중 → 재사용 (일부는 백그라운드 감사)
+        그 외             → LLM 결과 (정상 파싱이면 시맨틱 캐시에 저장)
+    """
+    notes, purpose, default_alloc = ctx["notes"], ctx["purpose"], ctx["default_alloc"]
 
     # notes가 없으면 LLM 호출 없이 즉시 반환
     if not notes:
@@ -316,11 +690,38 @@ def tune_allocation(state: GraphState) -> dict:
             "messages": [AIMessage(content="[1.5/5] 예산 배분 확정 (기본값)")],
         }
 
-    # ── notes가 있으면 LLM이 3가지를 한번에 판단 ─────────────
-    prompt = f"""사용자의 PC 견적 참고사항을 분석해 아래 JSON을 반환하세요.
+    hit = ctx["hit"]
+    if hit:
+        result = hit["result"]
+        source = f" (유사 요청 재사용, 유사도 {hit['similarity']:.2f})"
+        if random.random() < SEMANTIC_CACHE_AUDIT:
+            threading.Thread(
+                target=_audit_semantic_hit, args=(notes, purpose, default_alloc, hit),
+                name="semantic-audit", daemon=True,
+            ).start()
+    else:
+        result, cached, ok = ctx["fresh"]
+        source = " (캐시)" if cached else ""
+        sem = _get_semantic_cache()
+        if sem and ok:
+            sem.store(ctx["scope"], notes, ctx["vec"], result)
+
+    require_rgb   = result["require_rgb"]
+    require_color = result["require_color"]
+    label = f"RGB: {require_rgb} | 색상: {require_color or '무관'}"
+    return {
+        "budget_allocation": result["budget_allocation"],
+        "require_rgb":       require_rgb,
+        "require_color":     require_color,
+        "messages": [AIMessage(content=f"[1.5/5] 예산 배분 조정 완료{source} | {label}")],
+    }
+
+
+def _tune_prompt(notes: str, purpose: str, default_alloc: Dict[str, float]) -> str:
+    return f"""사용자의 PC 견적 참고사항을 분석해 아래 JSON을 반환하세요.
 
 참고사항: {notes}
-용도: {state['purpose']}
+용도: {purpose}
 기본 예산 배분: {json.dumps(default_alloc, ensure_ascii=False)}
 
 판단 기준:
@@ -337,9 +738,11 @@ def tune_allocation(state: GraphState) -> dict:
     "SSD": 0.10, "메인보드": 0.10, "파워": 0.05, "케이스": 0.07, "쿨러": 0.05}}
 }}"""
 
+
+def _parse_tune(content: Optional[str], default_alloc: Dict[str, float]) -> tuple:
+    """LLM 응답 → (결과 dict, 정상 파싱 여부). 결과 dict = {require_rgb, require_color, budget_allocation}"""
     try:
-        resp = _get_llm().invoke([HumanMessage(content=prompt)])
-        data = json.loads(resp.content)
+        data = json.loads(content)
 
         require_rgb   = bool(data.get("require_rgb", False))
         require_color = str(data.get("require_color", ""))
@@ -350,36 +753,183 @@ def tune_allocation(state: GraphState) -> dict:
             raw_alloc = {k: round(v / total, 3) for k, v in raw_alloc.items()}
         final_alloc = default_alloc.copy()
         final_alloc.update({k: v for k, v in raw_alloc.items() if k in default_alloc})
+        ok = True
 
     except Exception:
         require_rgb   = False
         require_color = ""
         final_alloc   = default_alloc
+        ok            = False
 
-    label = f"RGB: {require_rgb} | 색상: {require_color or '무관'}"
-    return {
-        "budget_allocation": final_alloc,
-        "require_rgb":       require_rgb,
-        "require_color":     require_color,
-        "messages": [AIMessage(content=f"[1.5/5] 예산 배분 조정 완료 | {label}")],
-    }
+    result = {"require_rgb": require_rgb, "require_color": require_color,
+              "budget_allocation": final_alloc}
+    return result, ok
+
+
+def _llm_tune(notes: str, purpose: str, default_alloc: Dict[str, float]) -> tuple:
+    """
+    tune_allocation의 LLM 판단. 반환: (결과 dict, LLM 캐시 적중 여부, 정상 파싱 여부)
+    호출 자체가 실패해도 기본 배분으로 폴백한다.
+    """
+    try:
+        content, cached = _invoke_llm(_tune_prompt(notes, purpose, default_alloc))
+    except Exception:
+        content, cached = None, False
+    result, ok = _parse_tune(content, default_alloc)
+    return result, cached, ok
+
+
+async def _allm_tune(notes: str, purpose: str, default_alloc: Dict[str, float]) -> tuple:
+    """_llm_tune의 비동기 버전"""
+    try:
+        content, cached = await _ainvoke_llm(_tune_prompt(notes, purpose, default_alloc))
+    except Exception:
+        content, cached = None, False
+    result, ok = _parse_tune(content, default_alloc)
+    return result, cached, ok
+
+
+# 시맨틱 캐시 scope의 예산 구간 경계 (원)
+_BUDGET_BUCKETS = [1_000_000, 1_500_000, 2_000_000, 3_000_000]
+
+
+def _semantic_scope(purpose: str, budget: int) -> str:
+    """같은 용도 · 같은 예산 구간 · 같은 임베딩 공간의 참고사항끼리만 재사용"""
+    bucket = bisect.bisect_right(_BUDGET_BUCKETS, budget)
+    return f"{purpose}:{bucket}:{EMBEDDING_BACKEND}:{EMBEDDING_MODEL}:{_get_query_dim()}"
+
+
+def _same_tuning(a: Dict[str, Any], b: Dict[str, Any], alloc_tol: float = 0.10) -> bool:
+    """RGB·색상이 같고 배분 비율 차이(L1 합)가 alloc_tol 이하면 같은 판단으로 본다"""
+    if a["require_rgb"] != b["require_rgb"] or a["require_color"] != b["require_color"]:
+        return False
+    keys = set(a["budget_allocation"]) | set(b["budget_allocation"])
+    diff = sum(abs(a["budget_allocation"].get(k, 0) - b["budget_allocation"].get(k, 0)) for k in keys)
+    return diff <= alloc_tol
+
+
+def _audit_semantic_hit(notes: str, purpose: str, default_alloc: Dict[str, float],
+                        hit: Dict[str, Any]) -> None:
+    """재사용한 결과를 실제 LLM 판단과 비교해 오재사용 여부를 기록 (백그라운드)"""
+    fresh, _, ok = _llm_tune(notes, purpose, default_alloc)
+    if ok:
+        _get_semantic_cache().record_audit(
+            notes, hit["notes"], hit["similarity"], _same_tuning(fresh, hit["result"])
+        )
 
 
 # ══════════════════════════════════════════════════════════════════
 # Node 2: search_parts
 # ══════════════════════════════════════════════════════════════════
 
+_SEARCH_CATS = ["CPU", "GPU", "RAM", "SSD", "HDD", "메인보드", "파워", "케이스", "쿨러"]
+
+
+# RGB/색상 필터가 적용될 카테고리
+_RGB_CATS   = {"RAM", "케이스", "쿨러"}
+_COLOR_CATS = {"케이스"}
+
+
+def _search_category(
+    cat_key: str,
+    query_embs: List[List[float]],
+    cat_budget: float,
+    require_rgb: bool,
+    require_color: str,
+    failed_parts: set,
+    n_results: int,
+    keep_top: int,
+) -> List[Dict]:
+    """
+    카테고리 하나의 후보 검색 — 다른 카테고리와 상태를 공유하지 않으므로
+    search_parts가 스레드 풀에서 카테고리별로 동시에 실행한다.
+    """
+    chroma_cat = cat_key
+    seen: set = set()
+    results: List[Dict] = []
+
+    # ChromaDB where 필터 구성
+    base_where = {"category": chroma_cat}
+    if require_rgb and cat_key in _RGB_CATS:
+        filters = [{"category": chroma_cat}, {"has_rgb": "true"}]
+    elif require_color and cat_key in _COLOR_CATS:
+        filters = [{"category": chroma_cat}, {"color": require_color}]
+    else:
+        filters = [{"category": chroma_cat}]
+    chroma_where = {"$and": filters} if len(filters) > 1 else base_where
+
+    # ── 가격 구간 (budget_allocation 기반) → where 절로 push-down ──
+    price_where = {"$and": filters + [
+        {"price_krw": {"$gte": int(cat_budget * 0.4)}},
+        {"price_krw": {"$lte": int(cat_budget * 1.8)}},
+    ]}
+
+    # 카테고리의 키워드 전체를 한 번의 query 호출로 검색 (키워드 순서대로 결과 병합)
+    def collect(where: dict, fallback_where: dict) -> None:
+        try:
+            res = _get_search_index().query(
+                query_embeddings=query_embs,
+                n_results=n_results,
+                where=where,
+                include=["metadatas", "distances"],
+            )
+        except Exception:
+            # 필터 조건에 맞는 제품이 없으면 완화된 조건으로 폴백
+            res = _get_search_index().query(
+                query_embeddings=query_embs,
+                n_results=n_results,
+                where=fallback_where,
+                include=["metadatas", "distances"],
+            )
+
+        for ids, metas, dists in zip(res["ids"], res["metadatas"], res["distances"]):
+            for doc_id, meta, dist in zip(ids, metas, dists):
+                name = meta.get("product_name", "")
+                if not name or name in seen or name in failed_parts:
+                    continue
+                seen.add(name)
+                # 기본 필드 + ChromaDB에 저장된 모든 메타데이터를 함께 보존
+                item = {
+                    "product_name": name,
+                    "price":        meta.get("price", ""),
+                    "image_url":    meta.get("image_url", ""),
+                    "category":     chroma_cat,
+                    "score":        round(1.0 - dist, 4),
+                    "doc_id":       doc_id,   # 호환성 인덱스 조회용
+                }
+                item.update({k: v for k, v in meta.items()
+                              if k not in ("product_name", "price", "image_url", "category")})
+                results.append(item)
+
+    collect(price_where, chroma_where)
+    # 5개 미만이면 가격 조건 없이 재검색 (가격 분포가 기대와 다르거나
+    # price_krw가 없는 구버전 컬렉션일 때)
+    if len(results) < 5:
+        collect(chroma_where, base_where)
+    return sorted(results, key=lambda x: x["score"], reverse=True)[:keep_top]
+
+
 def search_parts(state: GraphState) -> dict:
     """
     [Node 2] ChromaDB에서 카테고리별로 부품을 검색해 후보 목록을 만든다.
 
     개선 사항 (tune_allocation 연동):
     - budget_allocation 비율로 카테고리별 예산을 계산하고,
-      그 ±범위(0.4~1.8배) 안에 드는 제품만 남긴다 → 고예산이면 고사양 제품이 후보에 들어옴
+      그 ±범위(0.4~1.8배)를 정수 메타데이터 price_krw의 $gte/$lte 조건으로 ChromaDB where 절에
+      직접 넣는다 → 반환되는 n_results개가 모두 가격대 안의 제품 (Python 후처리 필터로 버려지는 결과 없음)
     - require_rgb=True면 RAM/케이스/쿨러를 has_rgb=true 제품으로 필터
     - require_color가 있으면 케이스를 해당 색상으로 필터
-    - 필터 결과가 5개 미만이면 필터 없이 원본으로 폴백 (너무 엄격해서 후보 없는 상황 방지)
+    - 가격대 검색 결과가 5개 미만이면 가격 조건 없이 재검색 (너무 엄격해서 후보 없는 상황 방지)
+    - 호환성 인덱스(compat_index.py)가 있으면 상대 카테고리에 호환되는 짝이 없는 후보를 제거
+      → generate_quotes가 서로 호환되는 부품끼리만 고르게 되어 호환성 실패·재시도가 준다
+    - 결과는 CandidatePool(제품명·문서 id 색인, 정수 가격)로 한 번 만들어 이후 모든 노드가 공유
+
+    카테고리끼리는 서로 독립이므로 _search_category를 스레드 풀(SEARCH_WORKERS)에서
+    동시에 실행한다 → 노드 지연시간 ≈ 가장 느린 카테고리 (9개 합이 아님).
+    결과는 완료 순서와 무관하게 _SEARCH_CATS 순서로 병합하고,
+    카테고리별 소요 시간은 timings["search_parts.<카테고리>"]에 기록한다.
     """
+    t_node = time.perf_counter()
     search_retry  = state.get("search_retry_count", 0)
     failed_parts  = set(state.get("failed_parts", []))
     budget        = state["budget"]
@@ -390,88 +940,75 @@ def search_parts(state: GraphState) -> dict:
     n_results = 25 if search_retry > 0 else 15
     keep_top  = 30 if search_retry > 0 else 20
 
-    CAT_MAP = {
-        "CPU": "CPU", "GPU": "GPU", "RAM": "RAM",
-        "SSD": "SSD", "HDD": "HDD", "메인보드": "메인보드",
-        "파워": "파워", "케이스": "케이스", "쿨러": "쿨러",
-    }
+    # ── 요청의 모든 (카테고리, 키워드)를 모아 중복 제거 후 한 번에 임베딩 ──
+    # 카테고리마다 encode를 따로 부르면 토크나이저·forward 오버헤드가 키워드 수만큼 반복된다.
+    t0 = time.perf_counter()
+    cat_keywords = _request_keywords(state["keywords"])
+    unique_kws   = list(dict.fromkeys(kw for kws in cat_keywords.values() for kw in kws))
+    kw_matrix    = _encode_queries(unique_kws)
+    kw_row       = {kw: i for i, kw in enumerate(unique_kws)}
+    timings: Dict[str, float] = {"search_parts.encode": (time.perf_counter() - t0) * 1000}
+
+    # 검색 인덱스는 lazy 초기화 → 워커 스레드들이 동시에 만들지 않도록 먼저 한 번 연다
+    _get_search_index()
+
+    def run(cat_key: str):
+        t = time.perf_counter()
+        items = _search_category(
+            cat_key,
+            kw_matrix[[kw_row[kw] for kw in cat_keywords[cat_key]]].tolist(),
+            budget * alloc.get(cat_key, 0.10),
+            require_rgb, require_color, failed_parts, n_results, keep_top,
+        )
+        return items, (time.perf_counter() - t) * 1000
 
-    # RGB/색상 필터가 적용될 카테고리
-    _RGB_CATS   = {"RAM", "케이스", "쿨러"}
-    _COLOR_CATS = {"케이스"}
+    if SEARCH_WORKERS > 1:
+        futures = {cat: _get_search_pool().submit(run, cat) for cat in _SEARCH_CATS}
+        outcomes = {cat: futures[cat].result() for cat in _SEARCH_CATS}
+    else:
+        outcomes = {cat: run(cat) for cat in _SEARCH_CATS}
 
     candidates: Dict[str, List[Dict]] = {}
-
-    for cat_key, chroma_cat in CAT_MAP.items():
-        keywords = state["keywords"].get(cat_key, [cat_key])
-        seen: set = set()
-        results: List[Dict] = []
-
-        # ChromaDB where 필터 구성
-        base_where = {"category": chroma_cat}
-        if require_rgb and cat_key in _RGB_CATS:
-            chroma_where = {"$and": [{"category": chroma_cat}, {"has_rgb": "true"}]}
-        elif require_color and cat_key in _COLOR_CATS:
-            chroma_where = {"$and": [{"category": chroma_cat}, {"color": require_color}]}
-        else:
-            chroma_where = base_where
-
-        for kw in keywords:
-            emb = _encode_query(kw)
-            try:
-                res = _get_collection().query(
-                    query_embeddings=emb,
-                    n_results=n_results,
-                    where=chroma_where,
-                    include=["metadatas", "distances"],
-                )
-            except Exception:
-                # 필터 조건에 맞는 제품이 없으면 기본 검색으로 폴백
-                res = _get_collection().query(
-                    query_embeddings=emb,
-                    n_results=n_results,
-                    where=base_where,
-                    include=["metadatas", "distances"],
-                )
-
-            for meta, dist in zip(res["metadatas"][0], res["distances"][0]):
-                name = meta.get("product_name", "")
-                if not name or name in seen or name in failed_parts:
-                    continue
-                seen.add(name)
-                # 기본 필드 + ChromaDB에 저장된 모든 메타데이터를 함께 보존
-                item = {
-                    "product_name": name,
-                    "price":        meta.get("price", ""),
-                    "image_url":    meta.get("image_url", ""),
-                    "category":     chroma_cat,
-                    "score":        round(1.0 - dist, 4),
-                }
-                item.update({k: v for k, v in meta.items()
-                              if k not in ("product_name", "price", "image_url", "category")})
-                results.append(item)
-
-        # ── 가격 구간 필터 (budget_allocation 기반) ──────────────
-        cat_budget    = budget * alloc.get(cat_key, 0.10)
-        price_min     = cat_budget * 0.4
-        price_max     = cat_budget * 1.8
-        price_filtered = [
-            r for r in results
-            if price_min <= _parse_price_int(r["price"]) <= price_max
-        ]
-        # 5개 미만이면 폴백 (가격 분포가 기대와 다를 때)
-        final = price_filtered if len(price_filtered) >= 5 else results
-        candidates[cat_key] = sorted(final, key=lambda x: x["score"], reverse=True)[:keep_top]
+    for cat_key in _SEARCH_CATS:
+        candidates[cat_key], elapsed_ms = outcomes[cat_key]
+        timings[f"search_parts.{cat_key}"] = round(elapsed_ms, 1)
+
+    prune_label = ""
+    compat_index = _get_compat_index()
+    if compat_index is not None:
+        t0 = time.perf_counter()
+        candidates, removed = compat_index.prune(candidates)
+        timings["search_parts.prune"] = round((time.perf_counter() - t0) * 1000, 1)
+        if removed:
+            prune_label = f" | 호환 안 되는 후보 {sum(removed.values())}개 제외"
+    # 이후 노드(생성·호환성·포맷)는 이 풀의 색인으로 후보를 조회한다 → 후보를 다시 훑지 않음
+    candidates = CandidatePool(candidates)
+    timings["search_parts.encode"] = round(timings["search_parts.encode"], 1)
+    timings["search_parts"] = round((time.perf_counter() - t_node) * 1000, 1)
 
     total = sum(len(v) for v in candidates.values())
     retry_label = f" (재검색 {search_retry}회차, 실패부품 {len(failed_parts)}개 제외)" if search_retry > 0 else ""
+    cache = _get_query_cache().stats()
+    cache_label = f" | 임베딩 캐시 적중률 {cache['hit_rate']:.0%}"
+    slowest = max(_SEARCH_CATS, key=lambda c: timings[f"search_parts.{c}"])
+    time_label = (f" | {timings['search_parts']:.0f}ms "
+                  f"(최장 {slowest} {timings[f'search_parts.{slowest}']:.0f}ms)")
     return {
         "candidates":         candidates,
         "search_retry_count": search_retry + 1,
-        "messages": [AIMessage(content=f"[2/5] 부품 후보 {total}개 수집{retry_label}")],
+        "timings":            timings,
+        "messages": [AIMessage(content=f"[2/5] 부품 후보 {total}개 수집{retry_label}{prune_label}{cache_label}{time_label}")],
     }
 
 
+async def asearch_parts(state: GraphState) -> dict:
+    """
+    [Node 2 · 비동기] search_parts를 기본 스레드 풀에서 실행 — 임베딩·벡터 검색은 CPU 작업이라
+    이벤트 루프에서 돌리면 그동안 다른 요청의 LLM 응답 처리가 멈춘다.
+    """
+    return await asyncio.to_thread(search_parts, state)
+
+
 # ══════════════════════════════════════════════════════════════════
 # Node 3: generate_quotes
 # ══════════════════════════════════════════════════════════════════
@@ -491,7 +1028,49 @@ def generate_quotes(state: GraphState) -> dict:
     - 재시도(retry) 시 "이전 호환성 실패" 힌트 추가 → 다른 조합 유도
     - JSON 파싱 실패 시 raw_quotes=[] 반환
     - 출력: raw_quotes + messages 누적
+
+    QUOTE_GEN_MODE=per_type이면 유형별로 작은 LLM 호출을 동시에 실행하고,
+    이미 호환성을 통과한 유형(valid_quotes)은 다시 만들지 않는다 → 재시도 비용 = 실패한 유형만.
+    QUOTE_GEN_MODE=solver면 부품 조합은 quote_solver.py가 정하고 LLM은 설명만 작성한다.
     """
+    if QUOTE_GEN_MODE == "solver":
+        quotes, info = _solve_quotes(state)
+        content, cached = _explain_quotes(state, quotes)
+        return _solver_result(state, quotes, info, content, cached)
+
+    if QUOTE_GEN_MODE == "per_type":
+        qids = _missing_quote_ids(state)
+        # 유형 수(최대 3)만큼만 동시 호출 — 요청마다 풀을 만들어 요청 간 호출이 서로 기다리지 않게 한다
+        with ThreadPoolExecutor(max_workers=len(qids), thread_name_prefix="quote") as pool:
+            outcomes = list(pool.map(lambda qid: _generate_one(state, qid), qids))
+        return _per_type_result(state, qids, outcomes)
+
+    response = _get_llm().invoke([HumanMessage(content=_quotes_prompt(state))])
+    return _quotes_result(state, response.content, _token_usage(response))
+
+
+async def agenerate_quotes(state: GraphState) -> dict:
+    """[Node 3 · 비동기] generate_quotes와 같고 LLM 호출만 await (유형별 모드는 asyncio.gather)"""
+    if QUOTE_GEN_MODE == "solver":
+        quotes, info = _solve_quotes(state)   # 수십 ms CPU 작업 → 루프에서 바로 실행
+        content, cached = await _aexplain_quotes(state, quotes)
+        return _solver_result(state, quotes, info, content, cached)
+
+    if QUOTE_GEN_MODE == "per_type":
+        qids = _missing_quote_ids(state)
+        outcomes = await asyncio.gather(*(_agenerate_one(state, qid) for qid in qids))
+        return _per_type_result(state, qids, outcomes)
+
+    response = await _get_async_llm().ainvoke([HumanMessage(content=_quotes_prompt(state))])
+    return _quotes_result(state, response.content, _token_usage(response))
+
+
+# 견적 id → 유형 (예산 상한 비율은 _BUDGET_LIMITS)
+_QUOTE_TYPES = {1: "가성비형", 2: "밸런스형", 3: "최고스펙형"}
+
+
+def _retry_hint(state: GraphState) -> str:
+    """재시도면 이전 호환성 실패 원인을 프롬프트에 덧붙인다 → 같은 조합 반복 방지"""
     retry = state.get("retry_count", 0)
     hints = state.get("compat_failure_hints", [])
 
@@ -504,7 +1083,129 @@ def generate_quotes(state: GraphState) -> dict:
             + "\n".join(f"- {h}" for h in hints)
             + "\n위 문제를 일으킨 부품 조합을 피하고 호환되는 다른 부품을 선택하세요."
         )
+    return retry_hint
+
+
+# ── 후보 ID 인코딩 (QUOTE_PROMPT_IDS=1) ──────────────────────────
+# 후보를 긴 한글 제품명 대신 "G3 RTX 4060 Ti | VRAM 8GB TDP 160W | 529000" 형태로 넘기고
+# LLM은 부품마다 ID만 답한다 → 입력 토큰 감소 + 출력 토큰(8부품 × 3견적의 제품명·가격 반복)이 크게 준다.
+# ID → 후보 레코드 복원은 서버에서 하므로 제품명을 잘못 옮겨 적는 환각도 구조적으로 줄어든다.
+
+_CAT_ID_PREFIX = {"CPU": "C", "GPU": "G", "RAM": "R", "SSD": "S", "HDD": "H",
+                  "메인보드": "M", "파워": "P", "케이스": "K", "쿨러": "F"}
+_PROMPT_TOP = 10   # 카테고리별로 프롬프트에 넣는 후보 수
+
+
+def _candidate_ids(candidates: Dict[str, List[Dict]]) -> Dict[str, dict]:
+    """{ID: 후보} — 카테고리 내 순위 기반이라 같은 candidates면 항상 같은 ID (풀마다 한 번만 계산)"""
+    pool = CandidatePool.of(candidates)
+    return pool.memo("prompt_ids", lambda: {
+        f"{_CAT_ID_PREFIX.get(cat, cat[:1])}{i}": item
+        for cat, items in pool.items()
+        for i, item in enumerate(items[:_PROMPT_TOP], 1)
+    })
+
+
+def _short_name(name: str) -> str:
+    """괄호 속 부가 정보(코드명·패키지 구성 등)를 뺀 제품명 — 중첩 괄호는 안쪽부터 제거"""
+    short = name
+    while True:
+        stripped = re.sub(r"\s*\([^()]*\)", "", short)
+        if stripped == short:
+            break
+        short = stripped
+    return short.strip() or name
+
+
+def _spec_summary(item: dict) -> str:
+    """조합 판단에 필요한 메타데이터만 짧게 (소켓/DDR/용량/전력/지원 소켓/색상/RGB)"""
+    parts = [item.get("socket", ""), item.get("ddr_type", "")]
+    if item.get("capacity_gb"):
+        parts.append(f"{item['capacity_gb']}GB")
+    if item.get("vram_gb"):
+        parts.append(f"VRAM {item['vram_gb']}GB")
+    for key, label in (("tdp_w", "TDP "), ("required_psu_w", "권장파워 "),
+                       ("wattage_w", ""), ("cooling_tdp_w", "냉각 ")):
+        if item.get(key):
+            parts.append(f"{label}{item[key]}W")
+    if item.get("supported_sockets"):
+        parts.append(item["supported_sockets"].replace(",", "/"))
+    if item.get("color"):
+        parts.append(item["color"])
+    if item.get("has_rgb") == "true":
+        parts.append("RGB")
+    return " ".join(p for p in parts if p)
+
+
+def _candidates_text(state: GraphState, ids: bool = False) -> str:
+    """후보 목록 텍스트 직렬화 (카테고리별 상위 10개). ids=True면 "ID 짧은이름 | 스펙 | 가격" """
+    candidates_text = ""
+    for cat, items in state["candidates"].items():
+        candidates_text += f"\n[{cat}]\n"
+        for i, item in enumerate(items[:_PROMPT_TOP], 1):
+            if not ids:
+                candidates_text += f"  - {item['product_name']} ({item['price']})\n"
+                continue
+            spec  = _spec_summary(item)
+            price = item.get("price_krw") or _parse_price(item.get("price", 0))   # 풀이면 이미 정수
+            candidates_text += (f"  {_CAT_ID_PREFIX.get(cat, cat[:1])}{i} {_short_name(item['product_name'])}"
+                                f"{' | ' + spec if spec else ''} | {price}\n")
+    return candidates_text
+
+
+def _part_rules(ids: bool) -> str:
+    if ids:
+        return ("- 부품은 아래 후보 목록의 ID(예: G3, M7)로만 지정 (목록에 없는 ID 절대 사용 금지)\n"
+                "- 가격은 서버가 후보 목록 기준으로 합산하므로 쓰지 않음")
+    return ("- 부품 이름은 반드시 아래 후보 목록에 있는 제품명 그대로 사용 (목록에 없는 제품명 절대 사용 금지)\n"
+            "- price 필드는 후보 목록에 표시된 가격 그대로 사용")
+
+
+def _parts_schema(ids: bool) -> str:
+    """견적 JSON 예시의 부품 부분"""
+    if ids:
+        return ", ".join(f'"{cat}": "{_CAT_ID_PREFIX[cat]}?"' for cat in _PART_CATS)
+    return ", ".join(f'"{cat}": {{"name": "...", "price": "..."}}' for cat in _PART_CATS)
+
+
+def _expand_part_ids(quote: dict, candidates: Dict[str, List[Dict]]) -> dict:
+    """
+    LLM이 답한 후보 ID → {"name", "price"} (제자리 수정).
+    목록에 없거나 다른 카테고리의 ID는 그대로 name에 남겨 _validate_parts가 환각으로 걸러낸다.
+    """
+    by_id = _candidate_ids(candidates)
+    for cat in _PART_CATS:
+        ref = quote.get(cat)
+        if not isinstance(ref, str):
+            continue
+        key  = "".join(ref.split()).upper()          # " g 3 " → "G3"
+        item = by_id.get(key)
+        # ID 접두사로 카테고리를 확인 — 메타데이터에 category가 없는 후보도 다른 칸에 들어가지 않게
+        prefix = _CAT_ID_PREFIX[cat]
+        if (item is not None and key.startswith(prefix) and key[len(prefix):].isdigit()
+                and item.get("category", cat) == cat):
+            quote[cat] = {"name": item["product_name"], "price": item["price"]}
+        else:
+            quote[cat] = {"name": ref, "price": ""}
+    return quote
+
+
+def _token_usage(response, node: str = "generate_quotes") -> Dict[str, int]:
+    """응답의 usage_metadata → {"<node>.input": n, "<node>.output": m} (없으면 빈 dict)"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        return {}
+    return {f"{node}.input": usage.get("input_tokens", 0), f"{node}.output": usage.get("output_tokens", 0)}
 
+
+def _usage_label(usage: Dict[str, int], node: str = "generate_quotes") -> str:
+    if not usage:
+        return ""
+    return f" | 토큰 입력 {usage.get(f'{node}.input', 0):,} / 출력 {usage.get(f'{node}.output', 0):,}"
+
+
+def _quotes_prompt(state: GraphState, ids: Optional[bool] = None) -> str:
+    ids = QUOTE_PROMPT_IDS == "1" if ids is None else ids
     budget = state["budget"]
 
     # 각 유형별 예산 상한선 계산
@@ -512,15 +1213,12 @@ def generate_quotes(state: GraphState) -> dict:
     budget_balance = int(budget * 0.85)   # 밸런스: 예산의 85%
     budget_max     = budget               # 최고스펙: 예산 100%
 
-    # 후보 목록 텍스트 직렬화 (카테고리별 상위 10개)
-    candidates_text = ""
-    for cat, items in state["candidates"].items():
-        candidates_text += f"\n[{cat}]\n"
-        for item in items[:10]:
-            candidates_text += f"  - {item['product_name']} ({item['price']})\n"
+    retry_hint      = _retry_hint(state)
+    candidates_text = _candidates_text(state, ids)
+    schema          = _parts_schema(ids)
 
     notes_text = state.get("notes", "")
-    prompt = f"""
+    return f"""
 아래 부품 후보 목록에서 PC 견적 3가지를 JSON으로 생성하세요.
 총 예산: {budget:,}원 | 목적: {state['purpose']}
 사용자 요구사항: {notes_text}{retry_hint}
@@ -532,8 +1230,7 @@ def generate_quotes(state: GraphState) -> dict:
 
 공통 규칙:
 - CPU, GPU, RAM, SSD, 메인보드, 파워, 케이스, 쿨러 8개 카테고리 모두 포함
-- 부품 이름은 반드시 아래 후보 목록에 있는 제품명 그대로 사용 (목록에 없는 제품명 절대 사용 금지)
-- price 필드는 후보 목록에 표시된 가격 그대로 사용
+{_part_rules(ids)}
 
 reason 작성 규칙 (3문장, 각 문장 구체적으로):
   1문장: 핵심 부품(CPU/GPU) 선정 근거 — 이 제품이 "{notes_text}" 조건에 맞는 이유
@@ -541,7 +1238,7 @@ reason 작성 규칙 (3문장, 각 문장 구체적으로):
   3문장: 이 견적 유형의 성능·가격 포지셔닝 — 다른 견적 대비 장점
 
 각 견적 JSON (id는 반드시 1, 2, 3):
-{{"id": 1, "type": "가성비형",  "CPU": {{"name": "...", "price": "..."}}, "GPU": {{"name": "...", "price": "..."}}, "RAM": {{"name": "...", "price": "..."}}, "SSD": {{"name": "...", "price": "..."}}, "메인보드": {{"name": "...", "price": "..."}}, "파워": {{"name": "...", "price": "..."}}, "케이스": {{"name": "...", "price": "..."}}, "쿨러": {{"name": "...", "price": "..."}}, "description": "...", "reason": ["...", "...", "..."]}}
+{{"id": 1, "type": "가성비형",  {schema}, "description": "...", "reason": ["...", "...", "..."]}}
 {{"id": 2, "type": "밸런스형",  ...동일 구조...}}
 {{"id": 3, "type": "최고스펙형", ...동일 구조...}}
 
@@ -552,19 +1249,242 @@ reason 작성 규칙 (3문장, 각 문장 구체적으로):
 {{"quotes": [견적1, 견적2, 견적3]}}
 """
 
-    response = _get_llm().invoke([HumanMessage(content=prompt)])
 
+def _quote_type_prompt(state: GraphState, qid: int, ids: Optional[bool] = None) -> str:
+    """유형 하나(qid)만 생성하는 프롬프트 — 해당 유형의 예산 상한만 제시"""
+    ids = QUOTE_PROMPT_IDS == "1" if ids is None else ids
+    budget = state["budget"]
+    qtype  = _QUOTE_TYPES[qid]
+    if qid == 3:
+        limit_text = f"합계: {int(budget * 0.85):,}원 ~ {budget:,}원"
+    else:
+        limit_text = f"합계 ≤ {int(budget * _BUDGET_LIMITS[qid]):,}원   ← 초과 시 더 저렴한 부품으로 교체"
+
+    notes_text = state.get("notes", "")
+    return f"""
+아래 부품 후보 목록에서 {qtype} PC 견적 1개를 JSON으로 생성하세요.
+총 예산: {budget:,}원 | 목적: {state['purpose']}
+사용자 요구사항: {notes_text}{_retry_hint(state)}
+
+⚠️ 예산 상한 — 부품 가격 {limit_text}
+
+공통 규칙:
+- CPU, GPU, RAM, SSD, 메인보드, 파워, 케이스, 쿨러 8개 카테고리 모두 포함
+{_part_rules(ids)}
+
+reason 작성 규칙 (3문장, 각 문장 구체적으로):
+  1문장: 핵심 부품(CPU/GPU) 선정 근거 — 이 제품이 "{notes_text}" 조건에 맞는 이유
+  2문장: 사용자 특별 요청 반영 내용 — RGB/색상/다중실행 등 요청 사항이 어떤 부품으로 충족됐는지
+  3문장: {qtype}의 성능·가격 포지셔닝
+
+부품 후보:
+{_candidates_text(state, ids)}
+
+반드시 아래 형식으로만 답변하세요:
+{{"quote": {{"id": {qid}, "type": "{qtype}", {_parts_schema(ids)}, "description": "...", "reason": ["...", "...", "..."]}}}}
+"""
+
+
+def _missing_quote_ids(state: GraphState) -> List[int]:
+    """아직 호환성을 통과한 견적이 없는 유형 id"""
+    have = {q.get("id") for q in state.get("valid_quotes", [])}
+    return [qid for qid in _QUOTE_TYPES if qid not in have]
+
+
+def _parse_one_quote(content: str, qid: int, candidates: Dict[str, List[Dict]]) -> Optional[dict]:
     try:
-        data = json.loads(response.content)
-        raw_quotes = data.get("quotes", [])
-    except (json.JSONDecodeError, AttributeError):
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    quote = data.get("quote", data) if isinstance(data, dict) else None
+    if not isinstance(quote, dict):
+        return None
+    # id·type은 요청한 유형으로 고정 (LLM이 다른 값을 써도 재시도 대상 추적이 어긋나지 않게)
+    quote.update(id=qid, type=_QUOTE_TYPES[qid])
+    return _expand_part_ids(quote, candidates)
+
+
+def _generate_one(state: GraphState, qid: int) -> tuple:
+    """유형 하나 생성 → (견적 또는 None, 소요 ms, 토큰 수)"""
+    t = time.perf_counter()
+    response = _get_llm().invoke([HumanMessage(content=_quote_type_prompt(state, qid))])
+    quote = _parse_one_quote(response.content, qid, state["candidates"])
+    return quote, (time.perf_counter() - t) * 1000, _token_usage(response)
+
+
+async def _agenerate_one(state: GraphState, qid: int) -> tuple:
+    t = time.perf_counter()
+    response = await _get_async_llm().ainvoke([HumanMessage(content=_quote_type_prompt(state, qid))])
+    quote = _parse_one_quote(response.content, qid, state["candidates"])
+    return quote, (time.perf_counter() - t) * 1000, _token_usage(response)
+
+
+def _per_type_result(state: GraphState, qids: List[int], outcomes: List[tuple]) -> dict:
+    retry = state.get("retry_count", 0)
+    raw_quotes = [quote for quote, _, _ in outcomes if quote]
+    timings = {
+        f"generate_quotes.{_QUOTE_TYPES[qid]}": round(elapsed_ms, 1)
+        for qid, (_, elapsed_ms, _) in zip(qids, outcomes)
+    }
+    usage: Dict[str, int] = {}
+    for _, _, call_usage in outcomes:
+        usage = _sum_counts(usage, call_usage)
+    types = "/".join(_QUOTE_TYPES[qid] for qid in qids)
+    return {
+        "raw_quotes":   raw_quotes,
+        "retry_count":  retry + 1,
+        "timings":      timings,
+        "token_usage":  usage,
+        "messages": [AIMessage(
+            content=f"[3/5] 견적 {len(raw_quotes)}종 생성 (유형별 동시 호출: {types}) "
+                    f"| 시도 {retry + 1}회{_usage_label(usage)}"
+        )],
+    }
+
+
+def _quotes_result(state: GraphState, content: str, usage: Optional[Dict[str, int]] = None) -> dict:
+    retry = state.get("retry_count", 0)
+    try:
+        data = json.loads(content)
+        raw_quotes = [_expand_part_ids(q, state["candidates"])
+                      for q in data.get("quotes", []) if isinstance(q, dict)]
+    except (json.JSONDecodeError, AttributeError, TypeError):
         raw_quotes = []
 
+    usage = usage or {}
     return {
         "raw_quotes":   raw_quotes,
         "retry_count":  retry + 1,
+        "token_usage":  usage,
         "messages": [AIMessage(
-            content=f"[3/5] 견적 3종 생성 (가성비/밸런스/최고스펙) | 시도 {retry + 1}회"
+            content=f"[3/5] 견적 3종 생성 (가성비/밸런스/최고스펙) | 시도 {retry + 1}회{_usage_label(usage)}"
+        )],
+    }
+
+
+# ── 조합 탐색 모드 (QUOTE_GEN_MODE=solver) ──────────────────────
+# 부품은 QuoteSolver가 유형별 예산 상한과 소켓/DDR/파워 제약 안에서 고르고, LLM에는 확정된 조합의
+# description/reason만 맡긴다. 같은 후보면 같은 조합 → 설명 프롬프트도 같아 LLM 캐시가 그대로 적중한다.
+
+def _solve_quotes(state: GraphState) -> tuple:
+    """
+    유형별 조합 탐색 → (견적 목록, {"nodes", "ms", "missing"}).
+    상한이 높은 유형부터 풀고, 아래 유형의 상한은 min(예산 × 비율, 위 유형 합계 - 1)로 둔다.
+    예산이 넉넉해 상한이 걸리지 않아도 유형마다 다른 조합이 나오고 합계는 가성비 < 밸런스 < 최고스펙.
+    """
+    t = time.perf_counter()
+    alloc  = state.get("budget_allocation") or _DEFAULT_ALLOC.get(state["purpose"], _DEFAULT_ALLOC["general"])
+    solver = QuoteSolver(state["candidates"], alloc, top=_PROMPT_TOP)
+    quotes: List[dict] = []
+    above: Optional[int] = None
+    nodes = 0
+    for qid in sorted(_QUOTE_TYPES, reverse=True):
+        cap = int(state["budget"] * _BUDGET_LIMITS[qid])
+        if above is not None:
+            cap = min(cap, above - 1)
+        picks, explored = solver.solve(cap)
+        nodes += explored
+        if not picks:
+            break   # 더 낮은 상한에서도 해가 없다
+        quote = {"id": qid, "type": _QUOTE_TYPES[qid]}
+        for cat in _PART_CATS:
+            if cat in picks:
+                quote[cat] = {"name": picks[cat]["product_name"], "price": picks[cat]["price"]}
+        above = _calc_total_price(quote)
+        quotes.append(quote)
+    quotes.reverse()
+    return quotes, {"nodes": nodes, "ms": (time.perf_counter() - t) * 1000, "missing": solver.missing}
+
+
+def _explain_prompt(state: GraphState, quotes: List[dict]) -> str:
+    notes_text  = state.get("notes", "")
+    quotes_text = ""
+    for quote in quotes:
+        quotes_text += f"\n견적{quote['id']} ({quote['type']}) 합계 {_calc_total_price(quote):,}원\n"
+        quotes_text += "".join(f"  {cat}: {quote[cat]['name']}\n" for cat in _PART_CATS if cat in quote)
+    ids = ", ".join(str(q["id"]) for q in quotes)
+    return f"""
+아래 PC 견적 {len(quotes)}개는 부품 조합이 이미 확정되었습니다 (예산 상한·호환성 검증 완료).
+부품을 바꾸거나 추가하지 말고 각 견적의 설명만 작성하세요.
+총 예산: {state['budget']:,}원 | 목적: {state['purpose']}
+사용자 요구사항: {notes_text}
+{quotes_text}
+description: 견적의 특징을 한 문장으로 요약
+
+reason 작성 규칙 (3문장, 각 문장 구체적으로):
+  1문장: 핵심 부품(CPU/GPU) 선정 근거 — 이 제품이 "{notes_text}" 조건에 맞는 이유
+  2문장: 사용자 특별 요청 반영 내용 — RGB/색상/다중실행 등 요청 사항이 어떤 부품으로 충족됐는지
+  3문장: 이 견적 유형의 성능·가격 포지셔닝 — 다른 견적 대비 장점
+
+반드시 아래 형식으로만 답변하세요 (id: {ids}):
+{{"quotes": [{{"id": 1, "description": "...", "reason": ["...", "...", "..."]}}, ...]}}
+"""
+
+
+def _explain_quotes(state: GraphState, quotes: List[dict]) -> tuple:
+    """설명 LLM 호출 → (응답 텍스트 또는 None, 캐시 적중 여부). 실패해도 견적은 기본 설명으로 나간다."""
+    if not quotes:
+        return None, False
+    try:
+        return _invoke_llm(_explain_prompt(state, quotes))
+    except Exception:
+        return None, False
+
+
+async def _aexplain_quotes(state: GraphState, quotes: List[dict]) -> tuple:
+    if not quotes:
+        return None, False
+    try:
+        return await _ainvoke_llm(_explain_prompt(state, quotes))
+    except Exception:
+        return None, False
+
+
+def _apply_explanations(quotes: List[dict], content: Optional[str]) -> int:
+    """
+    응답의 description/reason을 id로 매칭해 채운다 (응답에 부품 필드가 있어도 무시).
+    설명을 못 받은 견적은 CPU·GPU 이름으로 만든 기본 문구. 반환값 = LLM 설명을 채운 견적 수.
+    """
+    try:
+        items = json.loads(content).get("quotes", [])
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        items = []
+    by_id = {item.get("id"): item for item in items if isinstance(item, dict)}
+
+    filled = 0
+    for quote in quotes:
+        item   = by_id.get(quote["id"], {})
+        desc   = item.get("description")
+        reason = item.get("reason")
+        if isinstance(desc, str) and desc.strip():
+            quote["description"] = desc.strip()
+            filled += 1
+        else:
+            core = " + ".join(_short_name(quote[cat]["name"]) for cat in ("CPU", "GPU") if cat in quote)
+            quote["description"] = f"{quote['type']} — {core}"
+        quote["reason"] = [str(r) for r in reason] if isinstance(reason, list) else []
+    return filled
+
+
+def _solver_result(state: GraphState, quotes: List[dict], info: Dict[str, Any],
+                   content: Optional[str], cached: bool) -> dict:
+    retry  = state.get("retry_count", 0)
+    filled = _apply_explanations(quotes, content)
+    if not quotes:
+        explain_label = " — 예산 상한 안에서 호환되는 조합 없음"
+    elif filled < len(quotes):
+        explain_label = f" | 설명 {filled}/{len(quotes)}개 (나머지 기본 문구)"
+    else:
+        explain_label = " | 설명 LLM" + (" (캐시)" if cached else "")
+    if quotes and info.get("missing"):
+        explain_label += f" | ⚠️ 가격 있는 후보 없음: {', '.join(info['missing'])}"
+    return {
+        "raw_quotes":   quotes,
+        "retry_count":  retry + 1,
+        "timings":      {"generate_quotes.solve": round(info["ms"], 1)},
+        "messages": [AIMessage(
+            content=f"[3/5] 견적 {len(quotes)}종 조합 탐색 (예산 상한·소켓/DDR/파워 제약, "
+                    f"{info['nodes']:,}노드 {info['ms']:.0f}ms){explain_label}"
         )],
     }
 
@@ -573,50 +1493,192 @@ reason 작성 규칙 (3문장, 각 문장 구체적으로):
 # Node 4: check_compatibility
 # ══════════════════════════════════════════════════════════════════
 
-def _llm_compat_check(quote: dict) -> dict:
-    """
-    메타데이터 신뢰도 < 0.6일 때 LLM으로 호환성 판단 (폴백).
-    메타데이터가 불완전한 제품(새 세대, 데이터 미추출 등)에 대비한다.
-    """
-    parts_text = "\n".join(
-        f"{cat}: {quote.get(cat, {}).get('name', '미선택')}"
-        for cat in ["CPU", "GPU", "RAM", "SSD", "메인보드", "파워", "케이스", "쿨러"]
+# LLM 폴백 판정에 쓰는 부품 (소켓·DDR·전력에 관여하는 5개) — 판정 캐시 키이기도 하다
+_VERDICT_CATS = ["CPU", "메인보드", "RAM", "파워", "GPU"]
+
+
+def _verdict_parts(quote: dict) -> tuple:
+    return tuple(
+        quote.get(cat, {}).get("name", "") if isinstance(quote.get(cat), dict) else ""
+        for cat in _VERDICT_CATS
     )
-    prompt = (
-        "아래 PC 부품 조합의 하드웨어 호환성을 검증하세요.\n\n"
-        f"{parts_text}\n\n"
+
+
+def _compat_batch_prompt(combos: List[tuple]) -> str:
+    """판정이 필요한 조합 전부를 LLM 1회로 묻는 프롬프트"""
+    blocks = "\n\n".join(
+        f"[{no}]\n" + "\n".join(f"{cat}: {name or '미선택'}" for cat, name in zip(_VERDICT_CATS, combo))
+        for no, combo in enumerate(combos, 1)
+    )
+    return (
+        f"아래 PC 부품 조합 {len(combos)}개의 하드웨어 호환성을 각각 검증하세요.\n\n"
+        f"{blocks}\n\n"
         "검증 항목: ①CPU소켓↔메인보드소켓 ②CPU DDR↔RAM DDR ③파워 용량 충분 여부\n\n"
-        '반드시 아래 JSON만 출력:\n{"호환됨": true, "문제점": [], "경고사항": []}'
+        f"반드시 아래 JSON만 출력 (no는 조합 번호, {len(combos)}개 모두):\n"
+        '{"results": [{"no": 1, "호환됨": true, "문제점": [], "경고사항": []}, ...]}'
     )
+
+
+# 판정 캐시 키에 들어가는 프롬프트 버전 — 프롬프트 문구를 고치면 자동으로 바뀌어 이전 판정을 버린다
+_COMPAT_PROMPT_VERSION = hashlib.sha256(_compat_batch_prompt([]).encode("utf-8")).hexdigest()[:12]
+
+
+def _compat_verdict(data: dict) -> Optional[dict]:
+    """
+    LLM 판정 항목 하나 → 결과 dict (영문 키도 허용).
+    호환 여부 키가 없거나 true/false가 아니면 None → 검증 불가로 처리하고 캐시에 저장하지 않는다.
+    """
+    compatible = data.get("호환됨", data.get("compatible", data.get("is_compatible", None)))
+    problems   = data.get("문제점",  data.get("problems",   data.get("issues",       [])))
+    warnings   = data.get("경고사항", data.get("warnings",  []))
+    if not isinstance(compatible, bool):
+        return None
+    ok = compatible
+    return {
+        "호환됨":   ok,
+        "문제점":   problems if isinstance(problems, list) else [str(problems)],
+        "경고사항": warnings if isinstance(warnings, list) else [],
+        "결과_텍스트": "✅ 호환성 확인 (LLM폴백)" if ok else "❌ 호환성 문제 (LLM폴백)",
+    }
+
+
+_VERDICT_UNAVAILABLE = {
+    "호환됨":   False,
+    "문제점":   ["LLM 검증 실패 — 수동 확인 필요"],
+    "경고사항": [],
+    "결과_텍스트": "⚠️ 검증 불가 (파싱 오류)",
+}
+
+
+def _parse_compat_batch(content: Optional[str], n: int) -> List[Optional[dict]]:
+    """
+    일괄 판정 응답 → 조합 순서대로 판정 (응답에 없거나 깨진 항목은 None).
+    호출 실패(None)·파싱 실패면 전부 None.
+    """
     try:
-        resp = _get_llm().invoke([HumanMessage(content=prompt)])
-        raw = resp.content.strip()
+        raw = content.strip()
         # 마크다운 코드 펜스 제거
         if raw.startswith("```"):
             raw = raw.split("```")[1]
             if raw.startswith("json"):
                 raw = raw[4:]
         data = json.loads(raw)
-        # 영문 키 → 한국어 키 폴백
-        compatible = data.get("호환됨", data.get("compatible", data.get("is_compatible", None)))
-        problems   = data.get("문제점",  data.get("problems",   data.get("issues",       [])))
-        warnings   = data.get("경고사항", data.get("warnings",  []))
-        if compatible is None:
-            compatible = True
-        ok = bool(compatible)
-        return {
-            "호환됨":   ok,
-            "문제점":   problems if isinstance(problems, list) else [str(problems)],
-            "경고사항": warnings if isinstance(warnings, list) else [],
-            "결과_텍스트": "✅ 호환성 확인 (LLM폴백)" if ok else "❌ 호환성 문제 (LLM폴백)",
-        }
     except Exception:
-        return {
-            "호환됨":   False,
-            "문제점":   ["LLM 검증 실패 — 수동 확인 필요"],
-            "경고사항": [],
-            "결과_텍스트": "⚠️ 검증 불가 (파싱 오류)",
-        }
+        return [None] * n
+    items = data.get("results") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        # 조합이 1개면 단일 객체로 답하는 경우도 받아 준다
+        items = [data] if n == 1 and isinstance(data, dict) else []
+
+    verdicts: List[Optional[dict]] = [None] * n
+    for pos, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        no = item.get("no", pos + 1)
+        if isinstance(no, int) and 1 <= no <= n and verdicts[no - 1] is None:
+            verdicts[no - 1] = _compat_verdict(item)
+    return verdicts
+
+
+def _fallback_plan(state: GraphState, pending: List[int]) -> tuple:
+    """
+    폴백 대상 견적 → (판정 캐시 적중 {조합: 판정}, LLM에 물을 조합 목록, {조합: [견적 인덱스]}).
+    한 요청 안에서 같은 조합은 한 번만 묻는다.
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for i in pending:
+        groups.setdefault(_verdict_parts(state["raw_quotes"][i]), []).append(i)
+    cache  = _get_verdict_cache()
+    cached = cache.get_many(list(groups)) if cache else {}
+    todo   = [combo for combo in groups if combo not in cached]
+    return cached, todo, groups
+
+
+def _apply_fallback(checked: List[tuple], cached: Dict[tuple, dict], todo: List[tuple],
+                    groups: Dict[tuple, List[int]], content: Optional[str]) -> Dict[str, int]:
+    """
+    캐시·LLM 판정을 checked에 채우고 새 판정을 캐시에 저장한다 (검증 불가는 저장하지 않음).
+    반환: 이번 요청의 폴백 통계
+    """
+    fresh = dict(zip(todo, _parse_compat_batch(content, len(todo)))) if todo else {}
+    for combo, indexes in groups.items():
+        verdict = cached.get(combo) or fresh.get(combo) or _VERDICT_UNAVAILABLE
+        for i in indexes:
+            checked[i] = (None, dict(verdict, 문제점=list(verdict["문제점"]),
+                                     경고사항=list(verdict["경고사항"])))
+
+    verified = {combo: v for combo, v in fresh.items() if v is not None}
+    cache = _get_verdict_cache()
+    if cache and verified:
+        cache.put_many(verified)
+
+    return {
+        "quotes":      sum(1 for hallucinated, _ in checked if not hallucinated),
+        "fallback":    sum(len(v) for v in groups.values()),
+        "cache_hits":  len(cached),
+        "llm_calls":   1 if todo else 0,
+        "llm_combos":  len(todo),
+        "llm_failed":  len(todo) - len(verified),
+    }
+
+
+def _llm_compat_batch(todo: List[tuple]) -> Optional[str]:
+    """
+    메타데이터 신뢰도 < 0.6인 조합들을 LLM 1회로 판정 (폴백).
+    메타데이터가 불완전한 제품(새 세대, 데이터 미추출 등)에 대비한다.
+    """
+    if not todo:
+        return None
+    try:
+        return _get_llm().invoke([HumanMessage(content=_compat_batch_prompt(todo))]).content
+    except Exception:
+        return None
+
+
+async def _allm_compat_batch(todo: List[tuple]) -> Optional[str]:
+    """_llm_compat_batch의 비동기 버전"""
+    if not todo:
+        return None
+    try:
+        return (await _get_async_llm().ainvoke([HumanMessage(content=_compat_batch_prompt(todo))])).content
+    except Exception:
+        return None
+
+
+# ── 호환성 폴백 지표 (프로세스 누적, /api/metrics/) ─────────────
+_compat_metrics: Dict[str, int] = {
+    "requests": 0, "runs": 0, "quotes": 0, "fallback": 0, "cache_hits": 0,
+    "llm_calls": 0, "llm_combos": 0, "llm_failed": 0,
+}
+_metrics_lock = threading.Lock()
+
+
+def _record_compat_metrics(state: GraphState, stats: Dict[str, int]) -> None:
+    """
+    requests는 요청당 1번 (재시도 전 첫 검증), runs는 재시도를 포함한 노드 실행 수.
+    재시도 중에는 generate_quotes / search_parts가 카운터를 올려 두므로 둘 다 1 이하면 첫 검증이다.
+    """
+    first = state.get("retry_count", 0) <= 1 and state.get("search_retry_count", 0) <= 1
+    with _metrics_lock:
+        _compat_metrics["requests"] += int(first)
+        _compat_metrics["runs"]     += 1
+        for key, value in stats.items():
+            _compat_metrics[key] += value
+
+
+def compat_metrics() -> Dict[str, float]:
+    """
+    호환성 검증 누적 지표.
+        fallback_rate  : 메타데이터 신뢰도 부족으로 LLM 판정이 필요했던 견적 비율
+        cache_hit_rate : 폴백 조합 중 판정 캐시로 해결한 비율 (LLM 호출 없음)
+        requests / runs: 검증한 요청 수 / 재시도를 포함한 check_compatibility 실행 수
+    """
+    with _metrics_lock:
+        m = dict(_compat_metrics)
+    combos = m["cache_hits"] + m["llm_combos"]
+    m["fallback_rate"]  = round(m["fallback"] / m["quotes"], 4) if m["quotes"] else 0.0
+    m["cache_hit_rate"] = round(m["cache_hits"] / combos, 4) if combos else 0.0
+    return m
 
 
 _PART_CATS = ["CPU", "GPU", "RAM", "SSD", "메인보드", "파워", "케이스", "쿨러"]
@@ -626,16 +1688,12 @@ def _validate_parts(quote: dict, candidates: dict) -> List[str]:
     LLM이 후보 목록에 없는 제품을 환각(hallucination)했는지 검사한다.
     candidates에 없는 제품명을 사용한 카테고리 목록을 반환한다.
     """
-    all_names = {
-        item["product_name"]
-        for items in candidates.values()
-        for item in items
-    }
+    by_name = CandidatePool.of(candidates).by_name
     return [
         f"{cat}: {quote[cat]['name']}"
         for cat in _PART_CATS
         if cat in quote and isinstance(quote[cat], dict)
-        and quote[cat].get("name") and quote[cat]["name"] not in all_names
+        and quote[cat].get("name") and quote[cat]["name"] not in by_name
     ]
 
 
@@ -647,22 +1705,68 @@ def check_compatibility_node(state: GraphState) -> dict:
          → confidence (신뢰도) 계산:
            - 각 검증 항목(소켓/DDR/전력)에서 양쪽 데이터가 모두 있으면 신뢰 가능
            - 신뢰 가능한 항목 비율 = confidence (0.0 ~ 1.0)
-    2차: confidence < 0.6 이면 LLM 폴백 (_llm_compat_check)
+    2차: confidence < 0.6 이면 LLM 폴백 (_llm_compat_batch)
          → 메타데이터 불완전(새 세대 부품, 추출 실패 등) 시 대비
+         → (CPU, 메인보드, RAM, 파워, GPU) 조합 단위로 판정 캐시를 먼저 보고,
+           캐시에 없는 조합만 모아 LLM 1회로 일괄 판정 (견적 수만큼 순차 호출하지 않음)
 
     실패 시 compat_failure_hints에 이유를 누적해 generate_quotes 재시도 프롬프트에 반영.
     """
-    valid                = []
-    failed_parts         = list(state.get("failed_parts", []))
-    compat_failure_hints = list(state.get("compat_failure_hints", []))
-    candidates           = state.get("candidates", {})
-    llm_fallback_count   = 0
+    prechecked = _compat_precheck(state)
+    # ── 2. 신뢰도 0.6 미만 → LLM 폴백 (판정 캐시 → 남은 조합 일괄 호출) ──
+    cached, todo, groups = _fallback_plan(state, _compat_pending(prechecked))
+    stats = _apply_fallback(prechecked, cached, todo, groups, _llm_compat_batch(todo))
+    _record_compat_metrics(state, stats)
+    return _compat_result(state, prechecked, stats)
+
+
+async def acheck_compatibility_node(state: GraphState) -> dict:
+    """[Node 4 · 비동기] check_compatibility_node와 같고 일괄 판정 LLM 호출만 await"""
+    prechecked = _compat_precheck(state)
+    cached, todo, groups = _fallback_plan(state, _compat_pending(prechecked))
+    stats = _apply_fallback(prechecked, cached, todo, groups, await _allm_compat_batch(todo))
+    _record_compat_metrics(state, stats)
+    return _compat_result(state, prechecked, stats)
+
 
+def _compat_precheck(state: GraphState) -> List[tuple]:
+    """
+    견적마다 (환각 부품 목록 또는 None, 메타데이터 체크 결과 또는 None).
+    환각 부품이 있으면 호환성 검증을 건너뛴다.
+    """
+    candidates = CandidatePool.of(state.get("candidates"))
+    checked = []
     for quote in state["raw_quotes"]:
         # ── 0. 환각 검증 (후보 목록에 없는 제품명 사용 여부) ─────────
         hallucinated = _validate_parts(quote, candidates)
         if hallucinated:
-            hint = f"⛔ 후보 목록에 없는 제품 사용 (목록의 정확한 제품명 사용): {', '.join(hallucinated)}"
+            checked.append((hallucinated, None))
+        else:
+            # ── 1. 메타데이터 기반 Python 체크 ───────────────────────
+            checked.append((None, check_compat_meta(quote, candidates)))
+    return checked
+
+
+def _compat_pending(checked: List[tuple]) -> List[int]:
+    """메타데이터 신뢰도가 0.6 미만이라 LLM 폴백이 필요한 견적 인덱스"""
+    return [i for i, (_, result) in enumerate(checked)
+            if result is not None and result.get("confidence", 1.0) < 0.6]
+
+
+def _compat_result(state: GraphState, checked: List[tuple], fallback: Dict[str, int]) -> dict:
+    """
+    체크 결과로 통과 견적·실패 부품·재시도 힌트를 정리한 노드 출력.
+    이전 시도에서 통과한 견적(유형별 생성 모드에서 실패한 유형만 재생성한 경우)은 그대로 유지한다.
+    일괄 모드는 통과 견적이 0개일 때만 재시도하므로 유지할 견적이 없다.
+    """
+    kept                 = list(state.get("valid_quotes", []))
+    valid                = []
+    failed_parts         = list(state.get("failed_parts", []))
+    compat_failure_hints = list(state.get("compat_failure_hints", []))
+
+    for quote, (hallucinated, result) in zip(state["raw_quotes"], checked):
+        if hallucinated:
+            hint = f"⛔ 후보 목록에 없는 제품 사용 (목록의 정확한 제품명/ID 사용): {', '.join(hallucinated)}"
             if hint not in compat_failure_hints:
                 compat_failure_hints.append(hint)
             for entry in hallucinated:
@@ -671,14 +1775,6 @@ def check_compatibility_node(state: GraphState) -> dict:
                     failed_parts.append(name)
             continue  # 이 견적 스킵 (환각 부품이 있으면 호환성 검증 불필요)
 
-        # ── 1. 메타데이터 기반 Python 체크 ───────────────────────────
-        result = check_compat_meta(quote, candidates)
-
-        # ── 2. 신뢰도 0.6 미만 → LLM 폴백 ───────────────────────────
-        if result.get("confidence", 1.0) < 0.6:
-            result = _llm_compat_check(quote)
-            llm_fallback_count += 1
-
         if result.get("호환됨", False):
             quote["compat_warnings"] = result.get("경고사항", [])
             valid.append(quote)
@@ -691,14 +1787,18 @@ def check_compatibility_node(state: GraphState) -> dict:
                 if name and name not in failed_parts:
                     failed_parts.append(name)
 
-    method_label = f" (LLM폴백 {llm_fallback_count}건)" if llm_fallback_count else ""
+    method_label = ""
+    if fallback["fallback"]:
+        method_label = (f" (LLM폴백 {fallback['fallback']}건: 판정 캐시 {fallback['cache_hits']}조합"
+                        f" · 일괄 호출 {fallback['llm_combos']}조합)")
+    kept_label   = f" (이전 통과 {len(kept)}개 유지)" if kept else ""
     return {
-        "valid_quotes":         valid,
+        "valid_quotes":         kept + valid,
         "failed_parts":         failed_parts,
         "compat_failure_hints": compat_failure_hints,
         "messages": [AIMessage(content=(
             f"[4/5] 호환성 검증{method_label} | "
-            f"통과: {len(valid)}/{len(state['raw_quotes'])}개 "
+            f"통과: {len(valid)}/{len(state['raw_quotes'])}개{kept_label} "
             f"| 누적 실패 부품: {len(failed_parts)}개"
         ))],
     }
@@ -720,6 +1820,12 @@ def should_retry(state: GraphState) -> str:
         └ 부품 풀 자체가 호환 불가 → 새 후보 탐색
       모든 재시도 소진                                       → "continue"        (포기)
 
+    QUOTE_GEN_MODE=per_type이면 통과 견적이 있어도 빠진 유형이 있고 retry_count < 2면
+    "retry_generate" → generate_quotes가 빠진 유형만 다시 생성 (통과한 견적은 유지).
+    QUOTE_GEN_MODE=solver면 같은 후보에서는 항상 같은 조합이 나오므로 generate 재시도는 없다.
+    (조합 탐색이 하드 제약을 지키므로 실패는 메타데이터가 부족해 LLM 폴백이 거부한 경우뿐)
+    → 통과 견적이 0개일 때만 search_parts 재시도.
+
     재시도 우선순위:
       1. generate_quotes 재시도 (같은 후보 풀에서 다른 조합 선택, LLM 힌트 제공)
       2. search_parts 재시도   (failed_parts 제외한 완전히 새 후보 탐색)
@@ -729,7 +1835,12 @@ def should_retry(state: GraphState) -> str:
     retry_count  = state.get("retry_count", 0)
     search_retry = state.get("search_retry_count", 0)
 
+    if QUOTE_GEN_MODE == "solver":
+        return "retry_search" if no_valid and search_retry < 2 else "continue"
     if not no_valid:
+        missing = len(_QUOTE_TYPES) - len(state["valid_quotes"])
+        if QUOTE_GEN_MODE == "per_type" and missing > 0 and retry_count < 2:
+            return "retry_generate"
         return "continue"
     if retry_count < 2:
         return "retry_generate"  # 1차: Node3 재시도 (실패 힌트 포함)
@@ -742,23 +1853,50 @@ def should_retry(state: GraphState) -> str:
 # Node 5: filter_and_format
 # ══════════════════════════════════════════════════════════════════
 
-def _parse_price_int(price_val) -> int:
-    """가격 문자열/숫자를 정수로 변환. "850,000원" → 850000"""
-    if isinstance(price_val, (int, float)):
-        return int(price_val)
-    digits = "".join(c for c in str(price_val) if c.isdigit())
-    return int(digits) if digits else 0
-
-
 def _calc_total_price(quote: dict) -> int:
     """LLM total_price를 신뢰하지 않고 부품 가격을 직접 합산"""
     return sum(
-        _parse_price_int(quote.get(cat, {}).get("price", 0))
+        _parse_price(quote.get(cat, {}).get("price", 0))
         for cat in ["CPU", "GPU", "RAM", "SSD", "메인보드", "파워", "케이스", "쿨러"]
         if isinstance(quote.get(cat), dict)
     )
 
 
+# id별 예산 상한 비율 (가성비 70%, 밸런스 85%, 최고스펙 100%)
+_BUDGET_LIMITS = {1: 0.70, 2: 0.85, 3: 1.00}
+
+
+def _image_map(candidates: Dict[str, List[Dict]]) -> Dict[str, str]:
+    """candidates에서 제품명 → image_url 역매핑 (CandidatePool이 생성 시 만들어 둔 색인)"""
+    return CandidatePool.of(candidates).image_map
+
+
+def _format_quote(quote: dict, image_map: Dict[str, str], budget: int) -> dict:
+    """견적 하나를 최종 출력 형식으로 정리 (제자리 수정 후 반환) — SSE 중간 결과도 같은 형식"""
+    # image_url 주입
+    for cat in _PART_CATS:
+        part = quote.get(cat, {})
+        if isinstance(part, dict):
+            part["image_url"] = image_map.get(part.get("name", ""), "")
+    # total_price 직접 계산으로 덮어쓰기 (LLM 오류 방지)
+    total = _calc_total_price(quote)
+    quote["total_price"] = total
+    # reason이 없거나 list가 아닌 경우 빈 리스트로 보정
+    if not isinstance(quote.get("reason"), list):
+        quote["reason"] = []
+    # 빠진 카테고리 경고 (조합 탐색에서 가격 있는 후보가 없었거나 LLM이 빠뜨린 경우)
+    missing = [cat for cat in _PART_CATS if not isinstance(quote.get(cat), dict)]
+    if missing:
+        quote.setdefault("compat_warnings", []).append(f"⚠️ 부품 누락: {', '.join(missing)} (직접 추가 필요)")
+    # 예산 초과 경고 주입
+    limit = int(budget * _BUDGET_LIMITS.get(quote.get("id", 99), 1.0))
+    if total > limit:
+        quote.setdefault("compat_warnings", []).append(
+            f"⚠️ {quote.get('type', '')} 예산 상한 초과: {total:,}원 > {limit:,}원"
+        )
+    return quote
+
+
 def filter_and_format(state: GraphState) -> dict:
     """
     [Node 5] 검증된 견적 중 최대 3개를 선별하고 최종 출력 형식으로 정리한다.
@@ -774,34 +1912,9 @@ def filter_and_format(state: GraphState) -> dict:
     quotes_sorted = sorted(quotes, key=lambda q: q.get("id", 99))
     final = quotes_sorted[:3]
 
-    # candidates에서 제품명 → image_url 역매핑
-    image_map: Dict[str, str] = {}
-    for cat_items in state.get("candidates", {}).values():
-        for item in cat_items:
-            image_map[item["product_name"]] = item.get("image_url", "")
-
-    budget = state["budget"]
-    # id별 예산 상한 비율 (가성비 70%, 밸런스 85%, 최고스펙 100%)
-    _budget_limits = {1: 0.70, 2: 0.85, 3: 1.00}
-
+    image_map = _image_map(state.get("candidates", {}))
     for quote in final:
-        # image_url 주입
-        for cat in _PART_CATS:
-            part = quote.get(cat, {})
-            if isinstance(part, dict):
-                part["image_url"] = image_map.get(part.get("name", ""), "")
-        # total_price 직접 계산으로 덮어쓰기 (LLM 오류 방지)
-        total = _calc_total_price(quote)
-        quote["total_price"] = total
-        # reason이 없거나 list가 아닌 경우 빈 리스트로 보정
-        if not isinstance(quote.get("reason"), list):
-            quote["reason"] = []
-        # 예산 초과 경고 주입
-        limit = int(budget * _budget_limits.get(quote.get("id", 99), 1.0))
-        if total > limit:
-            quote.setdefault("compat_warnings", []).append(
-                f"⚠️ {quote.get('type', '')} 예산 상한 초과: {total:,}원 > {limit:,}원"
-            )
+        _format_quote(quote, image_map, state["budget"])
 
     summary_lines = [
         f"  견적{q.get('id', i+1)}: {q.get('description', '')} | {q.get('total_price', 0):,}원"
@@ -819,27 +1932,76 @@ def filter_and_format(state: GraphState) -> dict:
 # 그래프 조립
 # ══════════════════════════════════════════════════════════════════
 
-def build_graph() -> StateGraph:
+def _timed(name: str, fn):
+    """
+    노드 실행 시간을 timings에 기록하는 래퍼.
+        timings[name]          : 소요 시간 (ms) — 노드가 직접 기록한 값이 있으면 그 값 우선
+        timings[name.start]    : 파이프라인 시작 기준 노드 시작 시각 (ms)
+    """
+    def node(state: GraphState) -> dict:
+        t0  = time.perf_counter()
+        out = fn(state)
+        own = out.get("timings", {})
+        out["timings"] = {
+            name:            round((time.perf_counter() - t0) * 1000, 1),
+            f"{name}.start": round((t0 - state.get("started_at", t0)) * 1000, 1),
+            **own,
+        }
+        return out
+    node.__name__ = name
+    return node
+
+
+def _atimed(name: str, fn):
+    """_timed의 비동기 버전 — fn이 코루틴 함수면 await, 아니면 그대로 호출 (짧은 CPU 작업)"""
+    async def node(state: GraphState) -> dict:
+        t0  = time.perf_counter()
+        out = await fn(state) if asyncio.iscoroutinefunction(fn) else fn(state)
+        own = out.get("timings", {})
+        out["timings"] = {
+            name:            round((time.perf_counter() - t0) * 1000, 1),
+            f"{name}.start": round((t0 - state.get("started_at", t0)) * 1000, 1),
+            **own,
+        }
+        return out
+    node.__name__ = name
+    return node
+
+
+# 노드 이름 → (동기 구현, 비동기 구현)
+_NODES = {
+    "analyze_request":     (analyze_request,          aanalyze_request),
+    "tune_allocation":     (tune_allocation,          atune_allocation),   # 예산 배분 조정 노드
+    "search_parts":        (search_parts,             asearch_parts),
+    "generate_quotes":     (generate_quotes,          agenerate_quotes),
+    "check_compatibility": (check_compatibility_node, acheck_compatibility_node),
+    "filter_and_format":   (filter_and_format,        filter_and_format),
+}
+
+
+def build_graph(async_nodes: bool = False) -> StateGraph:
     """
     노드와 엣지를 연결해 컴파일된 LangGraph 실행 객체를 반환한다.
 
     add_edge(A, B)        : A가 끝나면 항상 B 실행
+    add_edge([A, B], C)   : A와 B가 모두 끝나야 C 실행 (병렬 합류)
     add_conditional_edges : 함수 반환값에 따라 다음 노드 선택
+
+    async_nodes=True면 LLM 호출을 await하는 노드로 구성 → ainvoke/astream 전용 (agraph)
     """
     g = StateGraph(GraphState)
 
     # ── 노드 등록 ─────────────────────────────────────────────────
-    g.add_node("analyze_request",     analyze_request)
-    g.add_node("tune_allocation",     tune_allocation)   # 예산 배분 조정 노드
-    g.add_node("search_parts",        search_parts)
-    g.add_node("generate_quotes",     generate_quotes)
-    g.add_node("check_compatibility", check_compatibility_node)
-    g.add_node("filter_and_format",   filter_and_format)
-
-    # ── 엣지 연결 (순차) ──────────────────────────────────────────
+    for name, (sync_fn, async_fn) in _NODES.items():
+        g.add_node(name, _atimed(name, async_fn) if async_nodes else _timed(name, sync_fn))
+
+    # ── 엣지 연결 ─────────────────────────────────────────────────
+    # tune_allocation은 notes/purpose만 읽고 keywords를 쓰지 않으므로 analyze_request와 독립
+    # → 두 LLM 노드를 START에서 동시에 실행하고 search_parts 앞에서 합류 (LLM 지연 1회분 단축)
+    # 두 노드의 출력 키는 겹치지 않고(messages/timings는 reducer로 병합) 상태 병합이 안전하다.
     g.add_edge(START,                  "analyze_request")
-    g.add_edge("analyze_request",      "tune_allocation")  # 키워드 생성 → 배분 조정
-    g.add_edge("tune_allocation",      "search_parts")     # 배분 확정 → 검색
+    g.add_edge(START,                  "tune_allocation")
+    g.add_edge(["analyze_request", "tune_allocation"], "search_parts")
     g.add_edge("search_parts",         "generate_quotes")
     g.add_edge("generate_quotes",      "check_compatibility")
 
@@ -863,41 +2025,115 @@ def build_graph() -> StateGraph:
 
 
 # 모듈 레벨에서 그래프 인스턴스 생성 (import하면 바로 사용 가능)
-graph = build_graph()
+graph  = build_graph()
+agraph = build_graph(async_nodes=True)   # arun_quote_pipeline (async 뷰) 전용
 
 
 # ══════════════════════════════════════════════════════════════════
-# 공개 실행 함수
+# 워밍업 — lazy 리소스를 첫 요청 전에 미리 로드
 # ══════════════════════════════════════════════════════════════════
+# 공유 리소스는 첫 요청 때 초기화되므로 새로 뜬 워커의 첫 사용자가 모델 로드·Chroma 오픈 비용을
+# 떠안는다. WARMUP_ON_START=1이면 MainConfig.ready()가 백그라운드 스레드에서 warmup()을 실행하고,
+# /healthz/는 완료 전까지 503을 반환해 로드밸런서가 준비된 워커에만 트래픽을 보내게 한다.
 
-def run_quote_pipeline(
-    budget: int,
-    purpose: str,
-    notes: str = "",
-    on_status=None,
-) -> dict:
+_warmup_status: Dict[str, Any] = {"state": "idle", "error": None, "timings": {}}
+
+
+def warmup() -> Dict[str, Any]:
     """
-    LangGraph 파이프라인의 공개 진입점.
+    검색 인덱스·임베딩 모델·LLM 클라이언트를 로드하고
+    더미 encode + 필터 검색 1회로 캐시(토크나이저, 연산 커널, SQLite 페이지)를 데운다.
+    단계별 소요 시간(ms)을 담은 상태 dict를 반환한다. 실패해도 예외를 던지지 않는다.
+    """
+    _warmup_status.update(state="warming", error=None, timings={})
+    timings: Dict[str, float] = _warmup_status["timings"]
 
-    매개변수:
-        budget   : 총 예산 (원 단위, 예: 1_500_000)
-        purpose  : 사용 목적 (예: "고사양 게이밍")
-        notes    : 추가 요구사항 (예: "조용한 쿨러, 화이트 케이스")
-        on_status: 진행 상태를 실시간으로 받을 콜백 함수 (Django SSE 연동용)
+    def step(name: str, fn) -> None:
+        t = time.perf_counter()
+        fn()
+        timings[name] = round((time.perf_counter() - t) * 1000, 1)
 
-    반환:
-        {
-            "quotes": [...],   # 최대 3개 최종 견적
-            "messages": [...], # 전체 진행 로그
-        }
+    try:
+        step("index", _get_search_index)
+        step("embed_model", _get_embed_model)
+        step("llm", _get_llm)
+        # 카테고리명은 analyze_request 폴백 키워드이기도 하므로 쿼리 캐시에 그대로 남겨둔다
+        step("encode", lambda: _encode_queries(list(_SEARCH_CATS)))
+        step("query", lambda: _search_category(
+            "GPU", _encode_queries(["GPU"]).tolist(), 500_000,
+            False, "", set(), n_results=15, keep_top=20,
+        ))
+        _warmup_status["state"] = "ready"
+    except Exception as e:
+        _warmup_status.update(state="failed", error=f"{type(e).__name__}: {e}")
+    return dict(_warmup_status)
+
+
+def warmup_status() -> Dict[str, Any]:
+    """현재 워밍업 상태 — state: idle | warming | ready | failed"""
+    return dict(_warmup_status)
+
+
+def metrics() -> Dict[str, Any]:
     """
-    initial_state: GraphState = {
+    GET /api/metrics/ — 이 워커 프로세스의 누적 지표 (워커마다 따로 집계됨).
+    아직 한 번도 쓰지 않은(또는 꺼진) 캐시는 None — 지표 조회가 캐시·모델 로드를 일으키지 않는다.
+    """
+    def stats(obj) -> Optional[Dict[str, float]]:
+        return obj.stats() if obj is not None else None
+
+    return {
+        "compat":               compat_metrics(),
+        "compat_verdict_cache": stats(_verdict_cache),
+        "llm_cache":            stats(_llm_cache),
+        "semantic_cache":       stats(_semantic_cache),
+        "query_cache":          stats(_query_cache),
+    }
+
+
+_embed_preloaded = False
+
+
+def preload_for_fork() -> bool:
+    """
+    fork 전(gunicorn preload_app) 마스터 프로세스에서 임베딩 모델 가중치만 로드한다.
+    워커는 fork로 가중치 페이지를 copy-on-write 공유하므로 워커 수만큼 모델 사본이 생기지 않는다.
+
+    - gc.freeze(): 로드된 객체를 GC 추적에서 제외 → 워커의 GC가 객체 헤더를 건드려
+      공유 페이지가 복사되는 것을 막는다
+    - 마스터에서는 추론을 돌리지 않는다 (OpenMP 스레드 풀이 fork 이후 멈출 수 있음)
+    - Chroma 연결도 열지 않는다 (SQLite 연결은 fork 간 공유 불가)
+    - torch 백엔드만 지원 — onnxruntime 세션은 생성 시 스레드 풀을 만들어 fork에 안전하지 않음
+
+    반환: 실제로 preload했으면 True (fork된 워커는 embed_preloaded()로 확인)
+    """
+    global _embed_preloaded
+    if EMBEDDING_BACKEND != "torch":
+        return False
+    _get_embed_model()
+    gc.collect()
+    gc.freeze()
+    _embed_preloaded = True
+    return True
+
+
+def embed_preloaded() -> bool:
+    """이 프로세스(또는 fork 전 마스터)에서 preload_for_fork()가 torch 모델을 실제로 올렸는지"""
+    return _embed_preloaded
+
+
+# ══════════════════════════════════════════════════════════════════
+# 공개 실행 함수
+# ══════════════════════════════════════════════════════════════════
+
+def _initial_state(budget: int, purpose: str, notes: str) -> GraphState:
+    return {
         "messages":           [HumanMessage(content=f"예산 {budget:,}원, {purpose}, {notes}")],
         "budget":             budget,
         "purpose":            purpose,
         "notes":              notes,
         "keywords":           {},
-        "candidates":         {},
+        "candidates":         CandidatePool(),
         "raw_quotes":         [],
         "valid_quotes":       [],
         "require_rgb":        False,
@@ -908,33 +2144,150 @@ def run_quote_pipeline(
         "failed_parts":         [],
         "compat_failure_hints": [],
         "error":                None,
+        "started_at":           time.perf_counter(),
+        "timings":              {},
+        "token_usage":          {},
     }
 
-    # 스트리밍 모드: stream → invoke 이중 실행 버그 수정
-    # (이전 코드는 stream과 invoke를 모두 실행해 파이프라인이 2번 돌았음)
-    if on_status:
-        final = None
-        for step in graph.stream(initial_state):
-            node_name      = list(step.keys())[0]
-            state_snapshot = list(step.values())[0]
-            msgs = state_snapshot.get("messages", [])
-            if msgs:
-                on_status(msgs[-1].content)
-            final = state_snapshot
-    else:
-        final = graph.invoke(initial_state)
 
-    result = {
+def _pipeline_result(final: dict) -> dict:
+    return {
         "quotes":   final.get("valid_quotes", []),
         "messages": [m.content for m in final.get("messages", [])],
+        "timings":  final.get("timings", {}),
+        "token_usage": final.get("token_usage", {}),
     }
 
+
+def run_quote_pipeline(
+    budget: int,
+    purpose: str,
+    notes: str = "",
+    on_status=None,
+) -> dict:
+    """
+    LangGraph 파이프라인의 공개 진입점.
+
+    매개변수:
+        budget   : 총 예산 (원 단위, 예: 1_500_000)
+        purpose  : 사용 목적 (예: "고사양 게이밍")
+        notes    : 추가 요구사항 (예: "조용한 쿨러, 화이트 케이스")
+        on_status: 진행 상태를 실시간으로 받을 콜백 함수 (노드 메시지마다 호출)
+
+    반환:
+        {
+            "quotes": [...],   # 최대 3개 최종 견적
+            "messages": [...], # 전체 진행 로그
+            "timings": {...},  # 노드·구간별 소요 시간 (ms)
+        }
+    """
+    if on_status:
+        for event, data in stream_quote_events(budget, purpose, notes):
+            if event == "status":
+                on_status(data["message"])
+        return data   # 마지막 이벤트는 done (최종 결과)
+
+    result = _pipeline_result(graph.invoke(_initial_state(budget, purpose, notes)))
+
     # 실행마다 랭그래프.md 자동 업데이트
     _update_langgraph_md(result, budget, purpose)
 
     return result
 
 
+async def arun_quote_pipeline(
+    budget: int,
+    purpose: str,
+    notes: str = "",
+    on_status=None,
+) -> dict:
+    """
+    run_quote_pipeline의 비동기 버전 (async 뷰용). 매개변수·반환 형식은 같다.
+
+    LLM 호출(analyze/tune/generate/호환성 폴백)은 이벤트 루프에서 await하고,
+    임베딩·벡터 검색·파일 기록은 스레드로 넘긴다 → ASGI 워커 하나가 OpenAI 응답을 기다리는
+    여러 요청을 동시에 처리한다 (요청당 스레드를 붙잡지 않음).
+    """
+    if on_status:
+        async for event, data in astream_quote_events(budget, purpose, notes):
+            if event == "status":
+                on_status(data["message"])
+        return data
+
+    result = _pipeline_result(await agraph.ainvoke(_initial_state(budget, purpose, notes)))
+    await asyncio.to_thread(_update_langgraph_md, result, budget, purpose)
+    return result
+
+
+# ══════════════════════════════════════════════════════════════════
+# 스트리밍 (SSE) — 진행 메시지와 호환성 통과 견적을 즉시 전달
+# ══════════════════════════════════════════════════════════════════
+# stream_mode=["updates", "values"]:
+#   updates → 노드별 출력 (병렬 노드가 같은 스텝에 끝나면 한 청크에 여러 노드)
+#   values  → 스텝마다 reducer가 적용된 전체 상태 → 마지막 값이 최종 상태
+# (updates만 쓰면 마지막 노드의 출력만 남아 messages·timings가 잘린다)
+
+def _step_events(step: Dict[str, dict], state: dict, sent: set) -> List[tuple]:
+    """
+    updates 청크 하나 → [(이벤트, 데이터), ...]
+        status: 노드 진행 메시지
+        quote : check_compatibility를 통과한 견적 (sent에 id를 기록해 한 번만)
+    호환 견적이 1개 이상이면 재시도 없이 filter_and_format으로 가므로 여기서 보낸 견적이 곧 최종 견적이다.
+    """
+    events = []
+    for node, update in step.items():
+        for msg in (update or {}).get("messages", []):
+            events.append(("status", {"node": node, "message": msg.content}))
+        if node != "check_compatibility":
+            continue
+        image_map = _image_map(state.get("candidates", {}))
+        for quote in sorted(update.get("valid_quotes", []), key=lambda q: q.get("id", 99))[:3]:
+            key = quote.get("id", id(quote))
+            if key in sent:
+                continue
+            sent.add(key)
+            # 그래프 상태의 견적은 filter_and_format이 다시 정리하므로 사본을 포맷
+            formatted = _format_quote(json.loads(json.dumps(quote)), image_map, state["budget"])
+            events.append(("quote", {"quote": formatted}))
+    return events
+
+
+def stream_quote_events(budget: int, purpose: str, notes: str = ""):
+    """
+    파이프라인을 실행하며 (이벤트, 데이터)를 순서대로 낸다 (SSE 뷰·on_status용 제너레이터).
+        status : 노드가 끝날 때마다 {node, message}
+        quote  : 호환성 검증을 통과한 견적 — filter_and_format을 기다리지 않고 즉시 (최종과 같은 형식)
+        done   : run_quote_pipeline과 같은 최종 결과 {quotes, messages, timings}
+    """
+    final = _initial_state(budget, purpose, notes)
+    sent: set = set()
+    for mode, chunk in graph.stream(final, stream_mode=["updates", "values"]):
+        if mode == "values":
+            final = chunk
+        else:
+            yield from _step_events(chunk, final, sent)
+
+    result = _pipeline_result(final)
+    _update_langgraph_md(result, budget, purpose)
+    yield "done", result
+
+
+async def astream_quote_events(budget: int, purpose: str, notes: str = ""):
+    """stream_quote_events의 비동기 버전 (agraph.astream)"""
+    final = _initial_state(budget, purpose, notes)
+    sent: set = set()
+    async for mode, chunk in agraph.astream(final, stream_mode=["updates", "values"]):
+        if mode == "values":
+            final = chunk
+        else:
+            for event in _step_events(chunk, final, sent):
+                yield event
+
+    result = _pipeline_result(final)
+    await asyncio.to_thread(_update_langgraph_md, result, budget, purpose)
+    yield "done", result
+
+
 # ══════════════════════════════════════════════════════════════════
 # 랭그래프.md 자동 업데이트
 # ══════════════════════════════════════════════════════════════════
@@ -0,0 +1,63 @@
+"""
+keyword_planner.py — 참고사항 없는 요청의 검색 키워드를 LLM 없이 생성
+
+vectordb.py가 빌드 때 남기는 <컬렉션>_keyword_plan.json(카테고리별 제품군의 가격 중앙값·제품 수)을 읽어,
+카테고리 예산(총 예산 × 용도별 배분 비율)에 가장 가까운 가격대의 제품군을 키워드로 고른다.
+
+    예산 150만원 게이밍 → GPU 예산 57만원 → "RTX 4060 Ti", "RTX 4060" ...
+
+입력이 (용도, 예산)뿐인 요청은 LLM이 할 일이 사실상 가격대 → 제품군 매핑이므로
+카탈로그에서 계산한 표로 대체하면 OpenAI 왕복 1회가 사라지고 결과도 결정적이다.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# search_parts의 가격 구간과 같은 범위 (카테고리 예산의 0.4 ~ 1.8배)
+_BAND_LOW, _BAND_HIGH = 0.4, 1.8
+
+
+class KeywordPlanner:
+    """카테고리별 제품군 표 → 예산 구간 키워드"""
+
+    def __init__(self, plan: dict):
+        self.categories: Dict[str, List[dict]] = plan.get("categories", {})
+
+    @classmethod
+    def load(cls, path: str) -> Optional["KeywordPlanner"]:
+        """플랜 파일이 없거나 깨졌으면 None (호출부는 LLM 경로로 폴백)"""
+        p = Path(path)
+        if not p.exists():
+            return None
+        try:
+            plan = json.loads(p.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            return None
+        return cls(plan) if isinstance(plan, dict) and plan.get("categories") else None
+
+    def keywords_for(self, category: str, cat_budget: float, per_cat: int = 2) -> List[str]:
+        """
+        가격 중앙값이 카테고리 예산 구간 안에 있는 제품군 중 예산에 가까운 순(로그 거리)으로 per_cat개.
+        같은 거리면 제품이 많은 제품군 우선. 구간 안에 없으면 구간 밖에서 가장 가까운 것.
+        """
+        families = self.categories.get(category, [])
+        if not families or cat_budget <= 0:
+            return [category]
+
+        def distance(f: dict) -> tuple:
+            return abs(math.log(f["median_price"] / cat_budget)), -f["count"]
+
+        in_band = [f for f in families
+                   if _BAND_LOW * cat_budget <= f["median_price"] <= _BAND_HIGH * cat_budget]
+        ranked = sorted(in_band or families, key=distance)
+        return [f["family"] for f in ranked[:per_cat]]
+
+    def plan(self, budget: int, alloc: Dict[str, float], categories: List[str],
+             per_cat: int = 2, default_ratio: float = 0.10) -> Dict[str, List[str]]:
+        """analyze_request와 같은 형식의 {카테고리: [키워드, ...]} (배분에 없는 카테고리는 default_ratio)"""
+        return {
+            cat: self.keywords_for(cat, budget * alloc.get(cat, default_ratio), per_cat)
+            for cat in categories
+        }
@@ -0,0 +1,325 @@
+"""
+llm_cache.py — LLM 응답 영구 캐시 (SQLite)
+
+같은 예산·용도·참고사항 요청은 analyze_request / tune_allocation 프롬프트가 글자 그대로 같으므로
+OpenAI 왕복 없이 이전 응답을 재사용한다.
+
+키   : sha256(정규화된 프롬프트 + 모델명 + temperature)
+        정규화 = 연속 공백·줄바꿈·들여쓰기를 공백 하나로 (f-string 들여쓰기 차이 무시)
+저장 : SQLite 파일 하나 (WAL 모드 — 여러 워커 프로세스가 같은 파일을 공유해도 안전)
+만료 : ttl_s가 지난 항목은 미스로 처리 후 삭제
+용량 : max_entries 초과 시 마지막 사용 시각이 오래된 항목부터 삭제 (LRU)
+통계 : 적중/미스 수, 적중으로 아낀 LLM 지연시간 합계 (원래 호출에 걸린 시간 기준)
+
+SemanticCache — 표현만 다른 참고사항("화이트 케이스에 RGB 예쁘게" ↔ "하얀 케이스, LED 빛나게")을
+임베딩 코사인 유사도로 묶어 tune_allocation 결과를 재사용한다. 같은 SQLite 파일의 별도 테이블을 쓴다.
+
+CompatVerdictCache — 메타데이터가 부족해 LLM으로 판정한 호환성 결과를 부품 조합
+(CPU, 메인보드, RAM, 파워, GPU 제품명) 단위로 저장한다. 같은 조합은 사용자가 달라도 LLM에 다시 묻지 않는다.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    content    TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    created_at REAL NOT NULL,
+    used_at    REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS llm_cache_used_at ON llm_cache (used_at);
+"""
+
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    normalized = " ".join(prompt.split())
+    raw = f"{model}\x00{temperature:.3f}\x00{normalized}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """프롬프트 → 응답 텍스트 캐시. 모든 메서드는 스레드 안전."""
+
+    def __init__(self, path: str, ttl_s: float = 7 * 24 * 3600, max_entries: int = 5000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path        = path
+        self.ttl_s       = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.hits = self.misses = 0
+        self.saved_ms = 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, latency_ms, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl_s:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET used_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            self.saved_ms += row[1]
+            return row[0]
+
+    def put(self, key: str, model: str, content: str, latency_ms: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, content, latency_ms, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, latency_ms, now, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_s,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY used_at LIMIT ?)", (overflow,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries":  entries,
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "saved_s":  round(self.saved_ms / 1000, 2),
+            }
+
+
+# ══════════════════════════════════════════════════════════════════
+# 시맨틱 캐시 (참고사항 임베딩 → 이전 결과 재사용)
+# ══════════════════════════════════════════════════════════════════
+
+_SEMANTIC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS semantic_cache (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope      TEXT NOT NULL,
+    notes      TEXT NOT NULL,
+    vec        BLOB NOT NULL,
+    result     TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at    REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS semantic_cache_scope ON semantic_cache (scope);
+CREATE TABLE IF NOT EXISTS semantic_audit (
+    notes         TEXT NOT NULL,
+    matched_notes TEXT NOT NULL,
+    similarity    REAL NOT NULL,
+    agreed        INTEGER NOT NULL,
+    created_at    REAL NOT NULL
+);
+"""
+
+
+class SemanticCache:
+    """
+    scope(용도·예산 구간·임베딩 모델) 안에서 참고사항 벡터가 threshold 이상으로 가까운
+    이전 결과를 찾는다. scope당 max_per_scope개까지 보관 (오래 안 쓴 것부터 삭제).
+
+    오재사용(false reuse) 측정: 호출부가 적중 중 일부를 실제 LLM으로 다시 판단해
+    record_audit()으로 일치 여부를 남긴다 → false_reuse_rate로 threshold를 조정한다.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.92, max_per_scope: int = 500):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.threshold     = threshold
+        self.max_per_scope = max_per_scope
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SEMANTIC_SCHEMA)
+        self._conn.commit()
+        self.hits = self.misses = self.audits = self.false_reuse = 0
+
+    def lookup(self, scope: str, vec: np.ndarray) -> Optional[Dict[str, Any]]:
+        """가장 가까운 이전 항목이 threshold 이상이면 {result, notes, similarity}, 아니면 None"""
+        with self._lock:
+            q = np.asarray(vec, dtype=np.float32)
+            rows = [r for r in self._conn.execute(
+                "SELECT id, notes, vec, result FROM semantic_cache WHERE scope = ?", (scope,)
+            ).fetchall() if len(r[2]) == q.nbytes]
+            best = None
+            if rows:
+                mat  = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                sims = mat @ q / np.clip(np.linalg.norm(mat, axis=1) * np.linalg.norm(q), 1e-12, None)
+                i = int(np.argmax(sims))
+                if sims[i] >= self.threshold:
+                    best = rows[i], float(sims[i])
+            if best is None:
+                self.misses += 1
+                return None
+            row, sim = best
+            self._conn.execute(
+                "UPDATE semantic_cache SET used_at = ?, hits = hits + 1 WHERE id = ?",
+                (time.time(), row[0]),
+            )
+            self._conn.commit()
+            self.hits += 1
+            return {"result": json.loads(row[3]), "notes": row[1], "similarity": round(sim, 4)}
+
+    def store(self, scope: str, notes: str, vec: np.ndarray, result: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO semantic_cache (scope, notes, vec, result, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, notes, np.asarray(vec, dtype=np.float32).tobytes(),
+                 json.dumps(result, ensure_ascii=False), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM semantic_cache WHERE scope = ? AND id NOT IN "
+                "(SELECT id FROM semantic_cache WHERE scope = ? ORDER BY used_at DESC LIMIT ?)",
+                (scope, scope, self.max_per_scope),
+            )
+            self._conn.commit()
+
+    def record_audit(self, notes: str, matched_notes: str, similarity: float, agreed: bool) -> None:
+        with self._lock:
+            self.audits += 1
+            self.false_reuse += 0 if agreed else 1
+            self._conn.execute(
+                "INSERT INTO semantic_audit VALUES (?, ?, ?, ?, ?)",
+                (notes, matched_notes, similarity, int(agreed), time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits":             self.hits,
+                "misses":           self.misses,
+                "hit_rate":         round(self.hits / total, 4) if total else 0.0,
+                "audits":           self.audits,
+                "false_reuse":      self.false_reuse,
+                "false_reuse_rate": round(self.false_reuse / self.audits, 4) if self.audits else 0.0,
+            }
+
+
+# ══════════════════════════════════════════════════════════════════
+# 호환성 판정 캐시 (부품 조합 → LLM 폴백 판정)
+# ══════════════════════════════════════════════════════════════════
+
+_VERDICT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compat_verdicts (
+    key        TEXT PRIMARY KEY,
+    parts      TEXT NOT NULL,
+    verdict    TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at    REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS compat_verdicts_used_at ON compat_verdicts (used_at);
+"""
+
+
+def verdict_key(parts: tuple, model: str, version: str = "") -> str:
+    """조합 + 모델 + 판정 프롬프트 버전 → 키 (프롬프트를 바꾸면 이전 판정은 적중하지 않는다)"""
+    raw = "\x00".join((model, version, *parts))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompatVerdictCache:
+    """
+    부품 조합 → 판정 dict ({"호환됨", "문제점", "경고사항", ...}).
+    판정은 LLM 응답이므로 한 번의 오판이 모든 사용자에게 계속 재사용되지 않게 TTL로 만료시키고,
+    max_entries 초과분은 LRU로 삭제한다. 키에 판정 프롬프트 버전을 넣어 프롬프트 변경 시 자동 무효화.
+    """
+
+    def __init__(self, path: str, model: str, version: str = "",
+                 ttl_s: float = 30 * 24 * 3600, max_entries: int = 20000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.model       = model
+        self.version     = version
+        self.ttl_s       = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_VERDICT_SCHEMA)
+        self._conn.commit()
+        self.hits = self.misses = 0
+
+    def _key(self, combo: tuple) -> str:
+        return verdict_key(combo, self.model, self.version)
+
+    def get_many(self, combos: list) -> Dict[tuple, dict]:
+        """적중한 조합만 {조합: 판정}"""
+        if not combos:
+            return {}
+        keys = {self._key(c): c for c in combos}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, verdict FROM compat_verdicts "
+                f"WHERE key IN ({','.join('?' * len(keys))}) AND created_at >= ?",
+                [*keys, time.time() - self.ttl_s],
+            ).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE compat_verdicts SET used_at = ?, hits = hits + 1 WHERE key = ?",
+                    [(time.time(), row[0]) for row in rows],
+                )
+                self._conn.commit()
+            self.hits   += len(rows)
+            self.misses += len(keys) - len(rows)
+        return {keys[key]: json.loads(verdict) for key, verdict in rows}
+
+    def put_many(self, verdicts: Dict[tuple, dict]) -> None:
+        if not verdicts:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO compat_verdicts (key, parts, verdict, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self._key(c), json.dumps(c, ensure_ascii=False),
+                  json.dumps(v, ensure_ascii=False), now, now) for c, v in verdicts.items()],
+            )
+            self._conn.execute("DELETE FROM compat_verdicts WHERE created_at < ?", (now - self.ttl_s,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM compat_verdicts").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM compat_verdicts WHERE key IN "
+                    "(SELECT key FROM compat_verdicts ORDER BY used_at LIMIT ?)", (overflow,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM compat_verdicts").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries":  entries,
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
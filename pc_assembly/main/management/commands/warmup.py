@@ -0,0 +1,24 @@
+"""
+python manage.py warmup
+
+임베딩 모델·검색 인덱스·LLM 클라이언트를 로드하고 더미 검색을 1회 실행한다.
+배포 시 서버 기동 전에 실행하면 모델 다운로드/디스크 캐시가 미리 채워지고,
+단계별 소요 시간으로 콜드 스타트 비용을 확인할 수 있다.
+(서버 프로세스 자체의 워밍업은 WARMUP_ON_START=1 → MainConfig.ready()가 담당)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "임베딩 모델·검색 인덱스·LLM 클라이언트 워밍업"
+
+    def handle(self, *args, **options):
+        from main.graph import warmup
+
+        status = warmup()
+        for name, ms in status["timings"].items():
+            self.stdout.write(f"  {name:<12} {ms:>9.1f}ms")
+        if status["state"] != "ready":
+            raise CommandError(f"워밍업 실패: {status['error']}")
+        self.stdout.write(self.style.SUCCESS("워밍업 완료"))
@@ -0,0 +1,135 @@
+"""
+quote_solver.py — 후보 부품에서 견적 조합을 결정적으로 고르는 분기 한정(branch-and-bound) 탐색
+
+QUOTE_GEN_MODE=solver면 generate_quotes가 LLM 대신 이 모듈로 부품을 고르고,
+LLM에는 확정된 조합의 description / reason 작성만 맡긴다.
+
+목적 함수 (용도별 점수):
+    Σ 카테고리 가중치 × (log(가격) + 검색 유사도)
+    가중치 = budget_allocation (용도 기본값 + tune_allocation 조정) → 같은 예산이면 비중이 큰 카테고리에
+    돈을 더 쓰는 조합이 높은 점수. log라 한 카테고리에 몰아주기보다 배분 비율대로 나눠 쓰는 쪽이 유리하다.
+    검색 유사도 0.1 차이 ≈ 가격 10% 차이 (키워드·참고사항에 더 맞는 제품 우선)
+
+제약:
+    - 부품 가격 합계 ≤ 예산 × 유형별 상한 (가성비 70% / 밸런스 85% / 최고스펙 100%)
+    - compatibility.py의 소켓·DDR·파워 판정 (socket/ddr/psu_conflict)을 하드 제약으로 적용
+      → 해가 있으면 check_compat_meta의 🚨 항목을 절대 위반하지 않으므로 호환성 재시도가 필요 없다.
+
+탐색: 제약이 걸린 카테고리(CPU → 메인보드 → RAM → GPU → 파워)부터 깊이 우선으로 고르고,
+    남은 카테고리마다 "남은 예산으로 살 수 있는 최고 점수"의 합을 상한으로 써서 가지를 친다.
+    카테고리당 후보 10개 × 8개 카테고리라도 보통 수천 노드 안에 끝난다 (max_nodes로 상한 보장).
+"""
+
+import bisect
+import math
+from typing import Dict, List, Optional, Tuple
+
+from .candidate_pool import _parse_price
+from .compatibility import ddr_conflict, psu_conflict, socket_conflict
+
+# 제약이 걸린 카테고리를 먼저 고정해야 가지치기가 일찍 일어난다
+_SOLVE_ORDER = ["CPU", "메인보드", "RAM", "GPU", "파워", "쿨러", "SSD", "케이스"]
+_RELEVANCE_WEIGHT = 1.0
+
+
+def _price(item: dict) -> int:
+    """price_krw(빌드 시 저장한 정수) 우선, 없으면 가격 문자열 파싱"""
+    val = item.get("price_krw")
+    if isinstance(val, int) and val > 0:
+        return val
+    return _parse_price(item.get("price", ""))
+
+
+def _conflicts(cat: str, item: dict, chosen: Dict[str, dict]) -> bool:
+    """이미 고른 부품과 item 사이에 호환 불가 판정이 있으면 True"""
+    cpu = chosen.get("CPU", {})
+    if cat == "메인보드":
+        return socket_conflict(cpu, item)
+    if cat == "RAM":
+        return ddr_conflict(cpu, item) or ddr_conflict(chosen.get("메인보드", {}), item)
+    if cat == "파워":
+        return psu_conflict(cpu, chosen.get("GPU", {}), item)
+    return False
+
+
+class QuoteSolver:
+    """candidates + 카테고리 가중치 → 예산 상한별 최고 점수 조합"""
+
+    def __init__(self, candidates: Dict[str, List[dict]], weights: Dict[str, float],
+                 top: int = 10, default_weight: float = 0.10):
+        self.cats: List[str] = []
+        self.options: List[List[Tuple[int, float, dict]]] = []   # 카테고리별 (가격, 점수, 후보) — 점수 내림차순
+        for cat in _SOLVE_ORDER:
+            w = weights.get(cat, default_weight)
+            opts = [
+                (p, w * (math.log(p) + _RELEVANCE_WEIGHT * float(item.get("score", 0) or 0)), item)
+                for item in candidates.get(cat, [])[:top]
+                if (p := _price(item)) > 0
+            ]
+            if opts:
+                self.cats.append(cat)
+                self.options.append(sorted(opts, key=lambda o: -o[1]))
+        # 가격이 있는 후보가 하나도 없어 조합에서 빠지는 카테고리 — 호출부가 견적에 경고로 표시
+        self.missing: List[str] = [cat for cat in _SOLVE_ORDER if cat not in self.cats]
+
+        # 상한 계산용: 카테고리별 가격 오름차순 배열과 그 누적 최대 점수
+        self._prices: List[List[int]] = []
+        self._best_upto: List[List[float]] = []
+        for opts in self.options:
+            by_price = sorted(opts, key=lambda o: o[0])
+            self._prices.append([o[0] for o in by_price])
+            best, acc = [], -math.inf
+            for o in by_price:
+                acc = max(acc, o[1])
+                best.append(acc)
+            self._best_upto.append(best)
+        # suffix_min[i] = i번째 이후 카테고리를 가장 싸게 채우는 비용
+        self._suffix_min = [0] * (len(self.cats) + 1)
+        for i in range(len(self.cats) - 1, -1, -1):
+            self._suffix_min[i] = self._suffix_min[i + 1] + self._prices[i][0]
+
+    def _bound(self, i: int, money: int) -> float:
+        """i번째 이후 카테고리에서 얻을 수 있는 점수 상한 (호환성 무시, 각 카테고리 최저가 몫은 남김)"""
+        total = 0.0
+        for j in range(i, len(self.cats)):
+            room = money - (self._suffix_min[i] - self._prices[j][0])
+            k = bisect.bisect_right(self._prices[j], room)
+            if k == 0:
+                return -math.inf
+            total += self._best_upto[j][k - 1]
+        return total
+
+    def solve(self, cap: int, max_nodes: int = 200_000) -> Tuple[Optional[Dict[str, dict]], int]:
+        """
+        가격 합계 ≤ cap이고 호환 불가 판정이 없는 조합 중 점수 최대 → ({카테고리: 후보}, 탐색 노드 수).
+        해가 없으면 (None, 노드 수). max_nodes에 닿으면 그때까지의 최선해를 반환한다.
+        """
+        n = len(self.cats)
+        if n == 0 or self._suffix_min[0] > cap:
+            return None, 0
+
+        best_score = -math.inf
+        best: Optional[Dict[str, dict]] = None
+        chosen: Dict[str, dict] = {}
+        nodes = 0
+
+        def dfs(i: int, cost: int, score: float) -> None:
+            nonlocal best_score, best, nodes
+            if i == n:
+                if score > best_score:
+                    best_score, best = score, dict(chosen)
+                return
+            if nodes >= max_nodes or score + self._bound(i, cap - cost) <= best_score:
+                return
+            cat = self.cats[i]
+            rest_min = self._suffix_min[i + 1]
+            for price, item_score, item in self.options[i]:
+                if cost + price + rest_min > cap or _conflicts(cat, item, chosen):
+                    continue
+                nodes += 1
+                chosen[cat] = item
+                dfs(i + 1, cost + price, score + item_score)
+                del chosen[cat]
+
+        dfs(0, 0, 0.0)
+        return best, nodes
@@ -0,0 +1,278 @@
+"""
+spec_inference.py — 제품명·칩셋 표로 호환성 메타데이터의 빈칸을 채우는 빌드 단계 (vectordb.py가 사용)
+
+vectordb.py의 _extract_rich_metadata는 "CPU 소켓:", "TDP:" 같은 필드 라벨에 의존하므로 크롤링 라벨이
+조금만 달라도 socket / ddr_type / tdp가 비고, 그러면 compatibility._calc_confidence가 0.6 미만이 되어
+check_compatibility가 LLM 폴백으로 넘어간다. 여기서는 제품명만으로 확실히 알 수 있는 값을 채운다.
+
+    메인보드 "ASUS TUF GAMING B650M-PLUS"   → 칩셋 B650 → AM5 / DDR5
+    메인보드 "MSI PRO Z790-P DDR4"          → 칩셋 Z790 → LGA1700 / DDR4 (이름의 DDR4 표기 우선)
+    CPU      "AMD 라이젠 7 7800X3D"         → AM5 / DDR5 / TDP 120W
+    CPU      "인텔 코어 i5-14400F"          → LGA1700 / TDP 65W (12~14세대는 DDR4·DDR5 겸용 → DDR 비움)
+    GPU      "MSI 지포스 RTX 4060 VENTUS"   → TDP 115W / 권장 파워 550W
+    RAM      "삼성전자 PC5-44800"           → DDR5
+    파워     "마이크로닉스 Classic II 700W" → 700W
+
+원칙: 추출된 값은 절대 덮어쓰지 않고 빈 필드만 채운다. 채운 필드 이름은 meta["inferred"]에 남긴다 (없으면 "").
+스레드리퍼처럼 모델 번호가 데스크톱 제품과 겹치는 라인은 추론하지 않는다 (틀린 소켓은 하드 제약이 된다).
+이 모듈은 vectordb.py가 sys.path로 직접 import하므로 패키지 상대 import를 쓰지 않는다.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+# ══════════════════════════════════════════════════════════════════
+# 칩셋 → (소켓, DDR)
+# ══════════════════════════════════════════════════════════════════
+# 인텔 600/700 시리즈는 같은 칩셋에 DDR4·DDR5 보드가 모두 있다. 제조사는 DDR4 모델에만 "DDR4"/"D4"를
+# 붙이므로(예: "B760M DS3H DDR4") 표기가 없으면 DDR5로 본다.
+_CHIPSETS: Dict[str, Tuple[str, str]] = {
+    **{c: ("AM5", "DDR5") for c in ("A620", "B650", "B650E", "X670", "X670E",
+                                    "B840", "B850", "X870", "X870E")},
+    **{c: ("AM4", "DDR4") for c in ("A320", "B350", "X370", "B450", "X470",
+                                    "A520", "B550", "X570")},
+    **{c: ("LGA1851", "DDR5") for c in ("H810", "B860", "Z890")},
+    **{c: ("LGA1700", "DDR5") for c in ("H610", "B660", "H670", "Z690",
+                                        "B760", "H770", "Z790")},
+    **{c: ("LGA1200", "DDR4") for c in ("H410", "B460", "H470", "Z490",
+                                        "H510", "B560", "H570", "Z590")},
+}
+_CHIPSET_RE = re.compile(r"(?<![A-Z0-9])([ABHXZ]\d{3}E?)")
+_DDR_RE     = re.compile(r"DDR([45])|\bD([45])\b|\bPC([45])-")
+
+# ══════════════════════════════════════════════════════════════════
+# CPU — 세대 → (소켓, DDR), 모델별 TDP
+# ══════════════════════════════════════════════════════════════════
+# 다나와 표기가 제각각이라("라이젠 7 7800X3D", "라이젠5-5세대 5600X", "코어i9-14세대 14900K",
+# "울트라5 시리즈2 245K") 등급과 모델 번호를 따로 찾는다. 입력은 대문자로 바꾼 제품명.
+_RYZEN_RE = re.compile(r"(?:라이젠|RYZEN).*?(?<!\d)(\d{4})(?!\d)([A-Z0-9]*)")
+_CORE_RE  = re.compile(r"(?<![A-Z])I([3579])(?![0-9A-Z]).*?(?<!\d)(1[0-4])(\d{3})(?!\d)([A-Z]*)")
+_ULTRA_RE = re.compile(r"(?:울트라|ULTRA)\s*([3579]).*?(?<!\d)(2\d{2})(?!\d)([A-Z]*)")
+
+# 라이젠 모델 번호 앞자리 → 소켓/DDR (8000G는 AM5 APU, 8000F도 AM5)
+_RYZEN_GEN = {"9": ("AM5", "DDR5"), "8": ("AM5", "DDR5"), "7": ("AM5", "DDR5"),
+              "5": ("AM4", "DDR4"), "4": ("AM4", "DDR4"), "3": ("AM4", "DDR4"), "2": ("AM4", "DDR4")}
+
+# 공식 기본 TDP (W). 표에 없으면 접미사 규칙(_ryzen_tdp / _intel_tdp)
+_RYZEN_TDP = {
+    "9950X3D": 170, "9950X": 170, "9900X3D": 120, "9900X": 120, "9800X3D": 120, "9700X": 65, "9600X": 65,
+    "9600": 65,
+    "8700G": 65, "8600G": 65, "8500G": 65, "8400F": 65, "8700F": 65,
+    "7950X3D": 120, "7950X": 170, "7900X3D": 120, "7900X": 170, "7900": 65, "7800X3D": 120,
+    "7700X": 105, "7700": 65, "7600X": 105, "7600": 65, "7500F": 65,
+    "5950X": 105, "5900X": 105, "5800X3D": 105, "5800X": 105, "5700X3D": 105, "5700X": 65,
+    "5700G": 65, "5600X": 65, "5600G": 65, "5600": 65, "5500": 65, "5600GT": 65,
+}
+
+
+def _ryzen_tdp(model: str) -> int:
+    if model in _RYZEN_TDP:
+        return _RYZEN_TDP[model]
+    if model.endswith("X3D"):
+        return 120
+    return 105 if model.endswith("X") else 65
+
+
+def _intel_tdp(tier: str, suffix: str) -> int:
+    """인텔 기본 전력(PBP): K/KF 125W, T 35W, i3 일반 60W, 나머지 65W"""
+    if "K" in suffix:
+        return 125
+    if suffix.startswith("T"):
+        return 35
+    return 60 if tier == "3" else 65
+
+
+# 스레드리퍼(sTR5/sWRX 등)는 모델 번호가 데스크톱 라이젠과 겹치므로(7960X, 5975WX) 추론하지 않는다
+_HEDT_RE = re.compile(r"스레드리퍼|THREADRIPPER|EPYC|에픽")
+
+
+def _infer_cpu(name: str) -> dict:
+    up = name.upper()
+    if _HEDT_RE.search(up):
+        return {}
+    if m := _RYZEN_RE.search(up):
+        number, suffix = m.group(1), m.group(2)
+        socket, ddr = _RYZEN_GEN.get(number[0], ("", ""))
+        if not socket:
+            return {}
+        return {"socket": socket, "ddr_type": ddr, "tdp_w": _ryzen_tdp(number + suffix)}
+    if m := _ULTRA_RE.search(up):
+        # 코어 울트라 200S (애로우레이크) — LGA1851, DDR5 전용
+        return {"socket": "LGA1851", "ddr_type": "DDR5", "tdp_w": _intel_tdp(m.group(1), m.group(3))}
+    if m := _CORE_RE.search(up):
+        tier, gen, suffix = m.group(1), int(m.group(2)), m.group(4)
+        if gen >= 12:
+            # 12~14세대는 DDR4·DDR5 겸용 → DDR은 메인보드가 결정하므로 비워 둔다
+            return {"socket": "LGA1700", "tdp_w": _intel_tdp(tier, suffix)}
+        return {"socket": "LGA1200", "ddr_type": "DDR4", "tdp_w": _intel_tdp(tier, suffix)}
+    return {}
+
+
+# ══════════════════════════════════════════════════════════════════
+# GPU — 칩 → (TDP, 권장 파워)  (레퍼런스 기준, 제조사 OC 모델은 빌드 데이터가 있으면 그 값 우선)
+# ══════════════════════════════════════════════════════════════════
+_GPU_RE = re.compile(r"(RTX|GTX|RX|ARC)\s*([AB]?\d{3,4})\s*(TI\s*SUPER|TI|SUPER|XTX|XT|GRE)?")
+_GPU_POWER: Dict[str, Tuple[int, int]] = {
+    "RTX 5090": (575, 1000), "RTX 5080": (360, 850), "RTX 5070 TI": (300, 750), "RTX 5070": (250, 650),
+    "RTX 5060 TI": (180, 600), "RTX 5060": (145, 550),
+    "RTX 4090": (450, 850), "RTX 4080 SUPER": (320, 750), "RTX 4080": (320, 750),
+    "RTX 4070 TI SUPER": (285, 700), "RTX 4070 TI": (285, 700), "RTX 4070 SUPER": (220, 650),
+    "RTX 4070": (200, 650), "RTX 4060 TI": (160, 550), "RTX 4060": (115, 550),
+    "RTX 3090 TI": (450, 850), "RTX 3090": (350, 750), "RTX 3080 TI": (350, 750), "RTX 3080": (320, 750),
+    "RTX 3070 TI": (290, 750), "RTX 3070": (220, 650), "RTX 3060 TI": (200, 600), "RTX 3060": (170, 550),
+    "RTX 3050": (130, 550), "GTX 1660 SUPER": (125, 450), "GTX 1650": (75, 300),
+    "RX 9070 XT": (304, 750), "RX 9070": (220, 650), "RX 9060 XT": (160, 550),
+    "RX 7900 XTX": (355, 800), "RX 7900 XT": (315, 750), "RX 7900 GRE": (260, 700),
+    "RX 7800 XT": (263, 700), "RX 7700 XT": (245, 700), "RX 7600 XT": (190, 600), "RX 7600": (165, 550),
+    "RX 6750 XT": (250, 650), "RX 6700 XT": (230, 650), "RX 6650 XT": (180, 500), "RX 6600": (132, 450),
+    "ARC B580": (190, 600), "ARC B570": (150, 500), "ARC A770": (225, 650), "ARC A750": (225, 600),
+}
+
+
+def _infer_gpu(name: str) -> dict:
+    m = _GPU_RE.search(name.upper())
+    if not m:
+        return {}
+    suffix = " ".join((m.group(3) or "").split())
+    key = f"{m.group(1)} {m.group(2)} {suffix}".rstrip()
+    power = _GPU_POWER.get(key)
+    if power is None:
+        return {}
+    return {"tdp_w": power[0], "required_psu_w": power[1]}
+
+
+# ══════════════════════════════════════════════════════════════════
+# 메인보드 / RAM / 파워
+# ══════════════════════════════════════════════════════════════════
+
+def _name_ddr(up: str) -> str:
+    m = _DDR_RE.search(up)
+    return f"DDR{next(g for g in m.groups() if g)}" if m else ""
+
+
+def _infer_mainboard(name: str) -> dict:
+    up = name.upper()
+    m = _CHIPSET_RE.search(up)
+    if not m:
+        return {}
+    chipset = m.group(1)
+    socket, ddr = _CHIPSETS.get(chipset) or _CHIPSETS.get(chipset.rstrip("E"), ("", ""))
+    if not socket:
+        return {}
+    return {"socket": socket, "ddr_type": _name_ddr(up) or ddr}
+
+
+# "700W브론즈"처럼 한글이 바로 붙어도 잡히게 \b 대신 영숫자만 경계로 본다
+_WATT_RE = re.compile(r"(\d{3,4})\s*W(?![A-Z0-9])")
+
+
+def _infer_power(name: str) -> dict:
+    m = _WATT_RE.search(name.upper())
+    return {"wattage_w": int(m.group(1))} if m else {}
+
+
+def infer_specs(cat_key: str, product_name: str) -> dict:
+    """제품명에서 추론한 호환성 필드 (정수 전력은 *_w 키). 추론할 수 없으면 빈 dict"""
+    if cat_key == "CPU":
+        return _infer_cpu(product_name)
+    if cat_key == "메인보드":
+        return _infer_mainboard(product_name)
+    if cat_key == "GPU":
+        return _infer_gpu(product_name)
+    if cat_key == "RAM":
+        ddr = _name_ddr(product_name.upper())
+        return {"ddr_type": ddr} if ddr else {}
+    if cat_key == "파워":
+        return _infer_power(product_name)
+    return {}
+
+
+def _has(meta: dict, key: str) -> bool:
+    val = meta.get(key, "")
+    return bool(val) and val != "0"
+
+
+def enrich_metadata(meta: dict) -> List[str]:
+    """
+    meta(vectordb.py 형식)의 빈 호환성 필드를 제품명 추론값으로 채운다 (제자리 수정).
+    전력 값은 문자열 필드(tdp 등)와 정수 필드(tdp_w 등)를 함께 채운다. 채운 필드 이름 목록을 반환하고
+    meta["inferred"]는 항상 이번 추론 결과로 덮어쓴다 (없으면 "").
+    """
+    # 이전 빌드의 추론 표시가 섞이지 않게 먼저 비운다
+    meta.pop("inferred", None)
+    inferred = infer_specs(meta.get("category", ""), meta.get("product_name", ""))
+    filled: List[str] = []
+    for key, val in inferred.items():
+        if key.endswith("_w"):
+            base = key[:-2]
+            if _has(meta, base) or meta.get(key):
+                continue
+            meta[base], meta[key] = str(val), val
+            filled.append(base)
+        elif not _has(meta, key):
+            meta[key] = val
+            filled.append(key)
+    # 추론한 것이 없어도 빈 문자열로 남긴다 — 증분 빌드의 coll.update()는 메타데이터를 병합하므로
+    # 키를 빼면 이전 빌드에서 저장된 "inferred"가 그대로 남는다
+    meta["inferred"] = ",".join(filled)
+    return filled
+
+
+# ══════════════════════════════════════════════════════════════════
+# 필드 커버리지 리포트
+# ══════════════════════════════════════════════════════════════════
+# compatibility._calc_confidence가 보는 필드 (쿨러 지원 소켓은 호환성 인덱스가 사용)
+COVERAGE_FIELDS: Dict[str, List[str]] = {
+    "CPU":     ["socket", "ddr_type", "tdp"],
+    "메인보드": ["socket", "ddr_type"],
+    "RAM":     ["ddr_type"],
+    "GPU":     ["tdp", "required_psu"],
+    "파워":    ["wattage"],
+    "쿨러":    ["supported_sockets"],
+}
+
+
+class SpecCoverage:
+    """빌드 중 행마다 add(meta) → 카테고리·필드별 채움 비율 (추출만 / 추론 포함)"""
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.extracted: Dict[str, Dict[str, int]] = {}
+        self.total: Dict[str, Dict[str, int]] = {}
+
+    def add(self, meta: dict) -> None:
+        cat = meta.get("category", "")
+        fields = COVERAGE_FIELDS.get(cat)
+        if not fields:
+            return
+        self.rows[cat] = self.rows.get(cat, 0) + 1
+        inferred = set(filter(None, meta.get("inferred", "").split(",")))
+        ext, tot = self.extracted.setdefault(cat, {}), self.total.setdefault(cat, {})
+        for f in fields:
+            if _has(meta, f):
+                tot[f] = tot.get(f, 0) + 1
+                if f not in inferred:
+                    ext[f] = ext.get(f, 0) + 1
+
+    def report(self) -> Dict[str, dict]:
+        """{카테고리: {"rows": n, 필드: {"extracted": 비율, "total": 비율}}}"""
+        out: Dict[str, dict] = {}
+        for cat, n in self.rows.items():
+            out[cat] = {"rows": n}
+            for f in COVERAGE_FIELDS[cat]:
+                out[cat][f] = {
+                    "extracted": round(self.extracted[cat].get(f, 0) / n, 4),
+                    "total":     round(self.total[cat].get(f, 0) / n, 4),
+                }
+        return out
+
+    def lines(self) -> List[str]:
+        """콘솔 출력용 — "CPU (120행)  socket 82% → 100% | ..." """
+        out = []
+        for cat, rep in self.report().items():
+            cols = " | ".join(
+                f"{f} {rep[f]['extracted']:.0%} → {rep[f]['total']:.0%}"
+                for f in COVERAGE_FIELDS[cat]
+            )
+            out.append(f"{cat:5} ({rep['rows']:,}행)  {cols}")
+        return out
@@ -1,3 +1,1200 @@
-from django.test import TestCase
+"""
+main 앱 단위 테스트 — 외부 서비스(OpenAI, 임베딩 모델, 빌드된 Chroma 컬렉션) 없이 도는 순수 모듈만.
 
-# Create your tests here.
+    cd pc_assembly && python manage.py test main
+"""
+
+import importlib.util
+import itertools
+import json
+import pickle
+import random
+import re
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .candidate_pool import CandidatePool, _parse_price
+from .compat_index import CompatIndex
+from .compatibility import BASE_LOAD_W, _find_meta, psu_conflict
+from .embedding import QueryEmbeddingCache, _create_zeroed
+from .keyword_planner import KeywordPlanner
+from . import llm_cache
+from .llm_cache import CompatVerdictCache, LLMCache, SemanticCache, cache_key
+from .quote_solver import QuoteSolver
+from .spec_inference import SpecCoverage, enrich_metadata, infer_specs
+from .vector_index import InMemoryIndex
+
+
+def _part(name: str, price: int, score: float = 0.5, **meta) -> dict:
+    return {"product_name": name, "price": f"{price:,}원", "price_krw": price, "score": score, **meta}
+
+
+# ══════════════════════════════════════════════════════════════════
+# quote_solver.py
+# ══════════════════════════════════════════════════════════════════
+
+class QuoteSolverTests(SimpleTestCase):
+    def setUp(self):
+        self.candidates = {
+            "CPU": [
+                _part("AM5 CPU", 400_000, socket="AM5", ddr_type="DDR5", tdp_w=120),
+                _part("LGA1700 CPU", 300_000, socket="LGA1700", tdp_w=65),
+            ],
+            "메인보드": [
+                _part("B650 보드", 200_000, socket="AM5", ddr_type="DDR5"),
+                _part("B760 보드", 150_000, socket="LGA1700", ddr_type="DDR4"),
+            ],
+            "RAM": [
+                _part("DDR5 램", 120_000, ddr_type="DDR5"),
+                _part("DDR4 램", 60_000, ddr_type="DDR4"),
+            ],
+            "GPU": [_part("RTX 4070", 800_000, tdp_w=200, required_psu_w=650)],
+            "파워": [
+                _part("500W 파워", 50_000, wattage_w=500),
+                _part("750W 파워", 110_000, wattage_w=750),
+            ],
+        }
+        self.weights = {"CPU": 0.2, "메인보드": 0.1, "RAM": 0.1, "GPU": 0.4, "파워": 0.05}
+
+    def _total(self, picks: dict) -> int:
+        return sum(p["price_krw"] for p in picks.values())
+
+    def test_picks_respect_cap(self):
+        solver = QuoteSolver(self.candidates, self.weights)
+        for cap in (1_450_000, 1_600_000, 2_000_000):
+            picks, _ = solver.solve(cap)
+            self.assertIsNotNone(picks)
+            self.assertLessEqual(self._total(picks), cap)
+
+    def test_socket_ddr_and_psu_constraints_are_hard(self):
+        picks, _ = QuoteSolver(self.candidates, self.weights).solve(5_000_000)
+        self.assertEqual(picks["CPU"]["socket"], picks["메인보드"]["socket"])
+        self.assertEqual(picks["메인보드"]["ddr_type"], picks["RAM"]["ddr_type"])
+        # RTX 4070 권장 650W → 500W 파워는 고를 수 없다
+        self.assertEqual(picks["파워"]["product_name"], "750W 파워")
+
+    def test_no_solution_when_cheapest_build_exceeds_cap(self):
+        picks, nodes = QuoteSolver(self.candidates, self.weights).solve(500_000)
+        self.assertIsNone(picks)
+        self.assertEqual(nodes, 0)
+
+    def test_no_solution_when_constraints_exclude_every_combo(self):
+        self.candidates["메인보드"] = [_part("X870 보드", 300_000, socket="AM5", ddr_type="DDR5")]
+        self.candidates["RAM"] = [_part("DDR4 램", 60_000, ddr_type="DDR4")]
+        picks, _ = QuoteSolver(self.candidates, self.weights).solve(5_000_000)
+        self.assertIsNone(picks)
+
+    def test_unpriced_category_is_reported_missing(self):
+        self.candidates["케이스"] = [{"product_name": "가격 없는 케이스", "price": ""}]
+        solver = QuoteSolver(self.candidates, self.weights)
+        self.assertIn("케이스", solver.missing)
+        picks, _ = solver.solve(5_000_000)
+        self.assertNotIn("케이스", picks)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        sockets, ddrs = ["AM5", "LGA1700"], ["DDR4", "DDR5"]
+        for _ in range(20):
+            cands = {
+                "CPU":     [_part(f"cpu{i}", rng.randrange(100, 600) * 1000, rng.random(),
+                                  socket=rng.choice(sockets), tdp_w=rng.choice([65, 125]))
+                            for i in range(4)],
+                "메인보드": [_part(f"mb{i}", rng.randrange(80, 400) * 1000, rng.random(),
+                                  socket=rng.choice(sockets), ddr_type=rng.choice(ddrs))
+                            for i in range(4)],
+                "RAM":     [_part(f"ram{i}", rng.randrange(40, 200) * 1000, rng.random(),
+                                  ddr_type=rng.choice(ddrs)) for i in range(3)],
+                "GPU":     [_part(f"gpu{i}", rng.randrange(300, 1500) * 1000, rng.random(),
+                                  tdp_w=rng.choice([115, 200, 320])) for i in range(4)],
+                "파워":    [_part(f"psu{i}", rng.randrange(50, 200) * 1000, rng.random(),
+                                  wattage_w=rng.choice([500, 650, 850])) for i in range(3)],
+            }
+            cap = rng.randrange(1200, 2800) * 1000
+            solver = QuoteSolver(cands, self.weights)
+            picks, _ = solver.solve(cap)
+
+            best = None
+            for combo in itertools.product(*(range(len(o)) for o in solver.options)):
+                chosen = {cat: solver.options[i][j] for i, (cat, j) in enumerate(zip(solver.cats, combo))}
+                cpu, mb, ram = chosen["CPU"][2], chosen["메인보드"][2], chosen["RAM"][2]
+                gpu, psu = chosen["GPU"][2], chosen["파워"][2]
+                if (sum(o[0] for o in chosen.values()) > cap
+                        or cpu.get("socket") != mb["socket"] or mb["ddr_type"] != ram["ddr_type"]
+                        or psu["wattage_w"] < cpu["tdp_w"] + gpu["tdp_w"] + BASE_LOAD_W):
+                    continue
+                score = sum(o[1] for o in chosen.values())
+                if best is None or score > best:
+                    best = score
+
+            if best is None:
+                self.assertIsNone(picks)
+            else:
+                got = sum(o[1] for i, cat in enumerate(solver.cats)
+                          for o in solver.options[i] if o[2] is picks[cat])
+                self.assertAlmostEqual(got, best, places=9)
+
+    def test_solve_quotes_gives_distinct_ascending_tiers_with_roomy_budget(self):
+        from . import graph
+
+        self.candidates["CPU"].append(_part("AM5 CPU 2", 350_000, socket="AM5", ddr_type="DDR5", tdp_w=65))
+        state = {"budget": 50_000_000, "purpose": "gaming", "candidates": self.candidates,
+                 "budget_allocation": self.weights}
+        quotes, _ = graph._solve_quotes(state)
+        totals = [graph._calc_total_price(q) for q in quotes]
+        self.assertEqual([q["id"] for q in quotes], [1, 2, 3])
+        self.assertEqual(totals, sorted(set(totals)))
+
+
+# ══════════════════════════════════════════════════════════════════
+# compat_index.py
+# ══════════════════════════════════════════════════════════════════
+
+class CompatIndexPruneTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CompatIndex({
+            "mainboard_by_socket": {"AM5": ["mb-am5"], "LGA1700": ["mb-1700"]},
+            "ram_by_ddr":          {"DDR5": ["ram-d5"], "DDR4": ["ram-d4"]},
+            "cooler_by_socket":    {"AM5": ["cool-am5"], "LGA1700": ["cool-1700", "cool-am5"]},
+            "gpu_psu":             {"gpu-big": {"tdp_w": 450, "required_psu_w": 850}},
+        })
+
+    @staticmethod
+    def _ids(pools: dict, cat: str) -> list:
+        return [item["doc_id"] for item in pools[cat]]
+
+    def test_removes_parts_without_a_compatible_partner(self):
+        candidates = {
+            "CPU":     [{"doc_id": "cpu-am5", "socket": "AM5", "ddr_type": "DDR5"}],
+            "메인보드": [{"doc_id": "mb-am5"}, {"doc_id": "mb-1700"}],
+            "RAM":     [{"doc_id": "ram-d5"}, {"doc_id": "ram-d4"}],
+        }
+        pools, removed = self.index.prune(candidates)
+        self.assertEqual(self._ids(pools, "메인보드"), ["mb-am5"])
+        self.assertEqual(self._ids(pools, "RAM"), ["ram-d5"])
+        self.assertEqual(removed, {"메인보드": 1, "RAM": 1})
+
+    def test_keeps_unknown_ids(self):
+        candidates = {
+            "CPU":     [{"doc_id": "cpu-am5", "socket": "AM5"}],
+            "메인보드": [{"doc_id": "mb-am5"}, {"doc_id": "mb-1700"}, {"doc_id": "mb-unindexed"}],
+            "쿨러":    [{"doc_id": "cool-1700"}, {"doc_id": "cool-unindexed"}],
+        }
+        pools, _ = self.index.prune(candidates)
+        self.assertEqual(self._ids(pools, "메인보드"), ["mb-am5", "mb-unindexed"])
+        self.assertEqual(self._ids(pools, "쿨러"), ["cool-unindexed"])
+
+    def test_never_empties_a_category(self):
+        candidates = {
+            "CPU":     [{"doc_id": "cpu-am5", "socket": "AM5"}],
+            "메인보드": [{"doc_id": "mb-1700"}],
+            "쿨러":    [{"doc_id": "cool-1700"}],
+        }
+        pools, removed = self.index.prune(candidates)
+        self.assertEqual(self._ids(pools, "메인보드"), ["mb-1700"])
+        self.assertEqual(self._ids(pools, "쿨러"), ["cool-1700"])
+        self.assertEqual(removed, {})
+
+    def test_prunes_psu_below_gpu_requirement_and_keeps_order(self):
+        candidates = {
+            "CPU":  [{"doc_id": "cpu", "tdp_w": 120}],
+            "GPU":  [{"doc_id": "gpu-big"}],
+            "파워": [{"doc_id": "p1000", "wattage_w": 1000}, {"doc_id": "p650", "wattage_w": 650},
+                     {"doc_id": "p850", "wattage_w": 850}, {"doc_id": "p-unknown"}],
+        }
+        pools, _ = self.index.prune(candidates)
+        # 450 + 120 + 80 = 650 < 850(권장 파워) → 850W 이상만, 정격 미상은 유지
+        self.assertEqual(self._ids(pools, "파워"), ["p1000", "p850", "p-unknown"])
+
+    def test_unindexed_gpu_still_counts_cpu_load(self):
+        candidates = {
+            "CPU":  [{"doc_id": "cpu", "tdp_w": 125}],
+            "GPU":  [{"doc_id": "gpu-unindexed"}],
+            "파워": [{"doc_id": "p500", "wattage_w": 500}, {"doc_id": "p180", "wattage_w": 180}],
+        }
+        pools, _ = self.index.prune(candidates)
+        # check_compat_meta와 같이 125 + 80 = 205W 미만은 🚨 → 제거
+        self.assertEqual(self._ids(pools, "파워"), ["p500"])
+
+    def test_min_psu_matches_psu_conflict(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            gpu = {"doc_id": "g", "tdp_w": rng.choice([0, 115, 200, 450]),
+                   "required_psu_w": rng.choice([0, 550, 850])}
+            cpu = {"tdp_w": rng.choice([0, 65, 125])}
+            psu = {"wattage_w": rng.choice([300, 550, 650, 750, 850, 1000])}
+            index = CompatIndex({"gpu_psu": {"g": {k: gpu[k] for k in ("tdp_w", "required_psu_w")}}})
+            with self.subTest(gpu=gpu, cpu=cpu, psu=psu):
+                self.assertEqual(psu["wattage_w"] < index.min_psu_w({"doc_id": "g"}, cpu["tdp_w"]),
+                                 psu_conflict(cpu, gpu, psu))
+
+    def test_builder_entry_round_trips_through_power_rule(self):
+        builder = _import_vectordb().CompatIndexBuilder()
+        builder.add("g", {"category": "GPU", "tdp_w": 285, "required_psu_w": 700})
+        index = CompatIndex(builder.to_index())
+        self.assertEqual(index.min_psu_w({"doc_id": "g"}, 0), max(285 + BASE_LOAD_W, 700))
+        self.assertEqual(index.min_psu_w({"doc_id": "g"}, 400), 285 + 400 + BASE_LOAD_W)
+
+    def test_reads_v1_gpu_entries(self):
+        index = CompatIndex({"gpu_psu": {"g": {"min_psu_w": 850, "tdp_w": 450}}})
+        self.assertEqual(index.min_psu_w({"doc_id": "g"}, 0), 850)
+        self.assertEqual(index.min_psu_w({"doc_id": "g"}, 400), 450 + 400 + BASE_LOAD_W)
+
+    def test_load_returns_none_for_missing_or_broken_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(CompatIndex.load(str(Path(tmp) / "none.json")))
+            broken = Path(tmp) / "broken.json"
+            broken.write_text("{not json", encoding="utf-8")
+            self.assertIsNone(CompatIndex.load(str(broken)))
+
+
+# ══════════════════════════════════════════════════════════════════
+# spec_inference.py
+# ══════════════════════════════════════════════════════════════════
+
+class SpecInferenceTests(SimpleTestCase):
+    CASES = [
+        ("메인보드", "ASUS TUF GAMING B650M-PLUS",        {"socket": "AM5", "ddr_type": "DDR5"}),
+        ("메인보드", "MSI PRO Z790-P DDR4",               {"socket": "LGA1700", "ddr_type": "DDR4"}),
+        ("메인보드", "GIGABYTE B760M DS3H D4",            {"socket": "LGA1700", "ddr_type": "DDR4"}),
+        ("메인보드", "MSI MAG 박격포B650M",                {"socket": "AM5", "ddr_type": "DDR5"}),
+        ("메인보드", "ASRock X870E Taichi",               {"socket": "AM5", "ddr_type": "DDR5"}),
+        ("메인보드", "ASRock B550M Pro4",                 {"socket": "AM4", "ddr_type": "DDR4"}),
+        ("CPU", "AMD 라이젠 7 7800X3D",                   {"socket": "AM5", "ddr_type": "DDR5", "tdp_w": 120}),
+        ("CPU", "AMD 라이젠5-5세대 5600X",                {"socket": "AM4", "ddr_type": "DDR4", "tdp_w": 65}),
+        ("CPU", "인텔 코어 i5-14400F",                    {"socket": "LGA1700", "tdp_w": 65}),
+        ("CPU", "인텔 코어i9-14세대 14900K",              {"socket": "LGA1700", "tdp_w": 125}),
+        ("CPU", "인텔 코어i3-10세대 10100F",              {"socket": "LGA1200", "ddr_type": "DDR4", "tdp_w": 60}),
+        ("CPU", "인텔 코어 울트라5 시리즈2 245K",          {"socket": "LGA1851", "ddr_type": "DDR5", "tdp_w": 125}),
+        ("CPU", "AMD 라이젠 스레드리퍼 7960X",             {}),
+        ("CPU", "AMD RYZEN THREADRIPPER PRO 5975WX",      {}),
+        ("GPU", "MSI 지포스 RTX 4060 VENTUS 2X 8GB",      {"tdp_w": 115, "required_psu_w": 550}),
+        ("GPU", "PALIT RTX 4070 Ti SUPER",                {"tdp_w": 285, "required_psu_w": 700}),
+        ("GPU", "SAPPHIRE 라데온 RX 7900 XTX",            {"tdp_w": 355, "required_psu_w": 800}),
+        ("RAM", "삼성전자 PC5-44800",                      {"ddr_type": "DDR5"}),
+        ("RAM", "G.SKILL DDR4-3200",                      {"ddr_type": "DDR4"}),
+        ("파워", "마이크로닉스 Classic II 700W 80PLUS",    {"wattage_w": 700}),
+        ("파워", "마이크로닉스 Classic II 700W브론즈",      {"wattage_w": 700}),
+        ("파워", "시소닉 FOCUS GX-850 GOLD",               {}),
+        ("쿨러", "DEEPCOOL AK400",                         {}),
+    ]
+
+    def test_name_table(self):
+        for cat, name, expected in self.CASES:
+            with self.subTest(name=name):
+                self.assertEqual(infer_specs(cat, name), expected)
+
+    def test_fills_only_empty_fields(self):
+        meta = {"category": "CPU", "product_name": "AMD 라이젠 7 7800X3D",
+                "socket": "", "ddr_type": "DDR5", "tdp": "105", "tdp_w": 105}
+        self.assertEqual(enrich_metadata(meta), ["socket"])
+        self.assertEqual(meta["socket"], "AM5")
+        self.assertEqual((meta["tdp"], meta["tdp_w"]), ("105", 105))   # 추출값 유지
+        self.assertEqual(meta["inferred"], "socket")
+
+    def test_fills_string_and_int_power_fields_together(self):
+        meta = {"category": "GPU", "product_name": "ASUS RTX 4070 SUPER DUAL 12GB",
+                "tdp": "0", "tdp_w": 0, "required_psu": "0", "required_psu_w": 0}
+        enrich_metadata(meta)
+        self.assertEqual((meta["tdp"], meta["tdp_w"]), ("220", 220))
+        self.assertEqual((meta["required_psu"], meta["required_psu_w"]), ("650", 650))
+
+    def test_resets_stale_inferred_marker(self):
+        meta = {"category": "메인보드", "product_name": "ASRock B550M Pro4",
+                "socket": "AM4", "ddr_type": "DDR4", "inferred": "socket"}
+        self.assertEqual(enrich_metadata(meta), [])
+        self.assertEqual(meta["inferred"], "")
+
+    def test_coverage_separates_extracted_and_inferred(self):
+        coverage = SpecCoverage()
+        for name, socket in (("ASUS TUF GAMING B650M-PLUS", ""), ("ASRock B550M Pro4", "AM4"),
+                             ("알 수 없는 보드", "")):
+            meta = {"category": "메인보드", "product_name": name, "socket": socket, "ddr_type": ""}
+            enrich_metadata(meta)
+            coverage.add(meta)
+        report = coverage.report()["메인보드"]
+        self.assertEqual(report["rows"], 3)
+        self.assertEqual(report["socket"], {"extracted": round(1 / 3, 4), "total": round(2 / 3, 4)})
+        self.assertEqual(report["ddr_type"], {"extracted": 0.0, "total": round(2 / 3, 4)})
+
+
+# ══════════════════════════════════════════════════════════════════
+# graph.py — LLM 호환성 폴백 (응답 파싱 · 판정 캐시)
+# ══════════════════════════════════════════════════════════════════
+
+class CompatFallbackTests(SimpleTestCase):
+    COMBO_A = ("AMD 라이젠 7 7800X3D", "ASUS TUF GAMING B650M-PLUS")
+    COMBO_B = ("인텔 코어 i5-14400F", "ASRock B550M Pro4")
+
+    def setUp(self):
+        from . import graph
+        self.graph = graph
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = str(Path(tmp.name) / "verdicts.db")
+        self.cache = CompatVerdictCache(self.db, "gpt-test", version="v1", ttl_s=3600)
+        patcher = mock.patch.object(graph, "_verdict_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _answer(*items) -> str:
+        return json.dumps({"results": list(items)}, ensure_ascii=False)
+
+    # ── 응답 파싱 ─────────────────────────────────────────────────
+    def test_parse_batch_in_numbered_order(self):
+        content = self._answer({"no": 2, "호환됨": False, "문제점": ["소켓 불일치"]},
+                               {"no": 1, "compatible": True})
+        first, second = self.graph._parse_compat_batch(content, 2)
+        self.assertTrue(first["호환됨"])
+        self.assertEqual(second["문제점"], ["소켓 불일치"])
+
+    def test_parse_strips_code_fence(self):
+        content = "```json\n" + self._answer({"no": 1, "호환됨": True}) + "\n```"
+        self.assertTrue(self.graph._parse_compat_batch(content, 1)[0]["호환됨"])
+
+    def test_missing_or_non_bool_verdict_is_none(self):
+        content = self._answer({"no": 1, "문제점": []}, {"no": 2, "호환됨": "true"},
+                               {"no": 3, "호환됨": 1})
+        self.assertEqual(self.graph._parse_compat_batch(content, 3), [None, None, None])
+
+    def test_single_object_accepted_only_for_single_combo(self):
+        content = json.dumps({"호환됨": True})
+        self.assertTrue(self.graph._parse_compat_batch(content, 1)[0]["호환됨"])
+        self.assertEqual(self.graph._parse_compat_batch(content, 2), [None, None])
+
+    def test_garbage_or_failed_call_is_all_none(self):
+        for content in (None, "", "호환됩니다", "[1, 2"):
+            with self.subTest(content=content):
+                self.assertEqual(self.graph._parse_compat_batch(content, 2), [None, None])
+
+    # ── 판정 캐시 ─────────────────────────────────────────────────
+    def _apply(self, content, groups):
+        checked = [(False, None)] * sum(len(v) for v in groups.values())
+        stats = self.graph._apply_fallback(checked, {}, list(groups), groups, content)
+        return checked, stats
+
+    def test_only_valid_verdicts_are_cached(self):
+        groups  = {self.COMBO_A: [0, 1], self.COMBO_B: [2]}
+        content = self._answer({"no": 1, "호환됨": True}, {"no": 2, "호환됨": None})
+        checked, stats = self._apply(content, groups)
+
+        self.assertTrue(checked[0][1]["호환됨"] and checked[1][1]["호환됨"])
+        self.assertEqual(checked[2][1]["결과_텍스트"], self.graph._VERDICT_UNAVAILABLE["결과_텍스트"])
+        self.assertEqual((stats["fallback"], stats["llm_combos"], stats["llm_failed"]), (3, 2, 1))
+        self.assertEqual(list(self.cache.get_many([self.COMBO_A, self.COMBO_B])), [self.COMBO_A])
+
+    def test_cached_verdicts_are_copied_per_quote(self):
+        self._apply(self._answer({"no": 1, "호환됨": False, "문제점": ["DDR 불일치"]}),
+                    {self.COMBO_A: [0]})
+        cached = self.cache.get_many([self.COMBO_A])
+        checked = [(False, None)] * 2
+        stats = self.graph._apply_fallback(checked, cached, [], {self.COMBO_A: [0, 1]}, None)
+
+        self.assertEqual((stats["cache_hits"], stats["llm_calls"]), (1, 0))
+        checked[0][1]["문제점"].append("수정")
+        self.assertEqual(checked[1][1]["문제점"], ["DDR 불일치"])
+
+    def test_expired_verdict_misses(self):
+        self._apply(self._answer({"no": 1, "호환됨": True}), {self.COMBO_A: [0]})
+        self.cache._conn.execute("UPDATE compat_verdicts SET created_at = created_at - 7200")
+        self.cache._conn.commit()
+        self.assertEqual(self.cache.get_many([self.COMBO_A]), {})
+
+    def test_prompt_version_change_misses(self):
+        self._apply(self._answer({"no": 1, "호환됨": True}), {self.COMBO_A: [0]})
+        same  = CompatVerdictCache(self.db, "gpt-test", version="v1")
+        other = CompatVerdictCache(self.db, "gpt-test", version="v2")
+        self.assertIn(self.COMBO_A, same.get_many([self.COMBO_A]))
+        self.assertEqual(other.get_many([self.COMBO_A]), {})
+
+
+# ══════════════════════════════════════════════════════════════════
+# vector_index.py — where 절 (Chroma 문법과 동일해야 함)
+# ══════════════════════════════════════════════════════════════════
+
+class InMemoryWhereTests(SimpleTestCase):
+    WHERES = [
+        {"category": "CPU"},
+        {"category": {"$eq": "GPU"}},
+        {"category": {"$ne": "CPU"}},
+        {"price_krw": {"$gt": 50000}},
+        {"price_krw": {"$gte": 50000}},
+        {"price_krw": {"$lt": 30000}},
+        {"price_krw": {"$lte": 30000}},
+        {"category": {"$in": ["CPU", "RAM"]}},
+        {"category": {"$nin": ["CPU", "RAM"]}},
+        {"has_rgb": "Y"},
+        {"has_rgb": {"$ne": "Y"}},                       # 필드 없는 행도 통과
+        {"has_rgb": {"$nin": ["Y"]}},
+        {"socket": {"$in": ["AM5", "LGA1700"]}},
+        {"no_such_field": "x"},
+        {"no_such_field": {"$ne": "x"}},
+        {"$and": [{"category": "CPU"}, {"price_krw": {"$lte": 60000}}]},
+        {"$or": [{"category": "GPU"}, {"has_rgb": "Y"}]},
+        {"$and": [{"$or": [{"category": "CPU"}, {"category": "RAM"}]},
+                  {"socket": {"$ne": "AM4"}}, {"price_krw": {"$gte": 20000}}]},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import chromadb
+
+        rng = random.Random(0)
+        cls.ids, cls.metas = [], []
+        for i in range(60):
+            meta = {"category": rng.choice(["CPU", "GPU", "RAM"]),
+                    "price_krw": rng.randrange(10, 100) * 1000}
+            if i % 3:
+                meta["has_rgb"] = rng.choice(["Y", "N"])
+            if i % 4 == 0:
+                meta["socket"] = rng.choice(["AM4", "AM5", "LGA1700"])
+            cls.ids.append(f"p{i}")
+            cls.metas.append(meta)
+        cls.embeddings = np.random.default_rng(0).normal(size=(60, 16)).astype(np.float32)
+
+        cls.collection = chromadb.EphemeralClient().get_or_create_collection(
+            "where_parity", embedding_function=None, metadata={"hnsw:space": "cosine"})
+        cls.collection.add(ids=cls.ids, embeddings=cls.embeddings.tolist(), metadatas=cls.metas)
+        cls.index = InMemoryIndex(cls.ids, cls.embeddings, cls.metas)
+
+    def test_mask_matches_chroma_get(self):
+        for where in self.WHERES:
+            with self.subTest(where=where):
+                expected = set(self.collection.get(where=where)["ids"])
+                actual   = set(self.index.ids[self.index._mask(where)].tolist())
+                self.assertEqual(actual, expected)
+
+    def test_query_matches_chroma_query(self):
+        queries = np.random.default_rng(1).normal(size=(3, 16)).astype(np.float32)
+        where   = {"$or": [{"category": "GPU"}, {"has_rgb": "Y"}]}
+        expected = self.collection.query(query_embeddings=queries.tolist(), n_results=5, where=where)
+        actual   = self.index.query(queries, n_results=5, where=where)
+        self.assertEqual(actual["ids"], expected["ids"])
+        np.testing.assert_allclose(actual["distances"], expected["distances"], atol=1e-4)
+
+    def test_empty_filter_returns_empty_lists_per_query(self):
+        res = self.index.query(np.ones((2, 16)), n_results=5, where={"category": "케이스"})
+        self.assertEqual(res, {"ids": [[], []], "metadatas": [[], []], "distances": [[], []]})
+
+    def test_unknown_operator_raises(self):
+        with self.assertRaises(ValueError):
+            self.index._mask({"price_krw": {"$between": [1, 2]}})
+
+
+# ══════════════════════════════════════════════════════════════════
+# vector_index.py — 양자화(float16 / int8) recall
+# ══════════════════════════════════════════════════════════════════
+
+class QuantizedRecallTests(SimpleTestCase):
+    DIM, ROWS, QUERIES, K = 384, 2000, 50, 10
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # 카테고리별로 뭉쳐 있는 실제 임베딩과 비슷하게: 군집 중심 + 잡음
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, cls.DIM))
+        cls.embeddings = centers[rng.integers(0, 20, cls.ROWS)] + 0.6 * rng.normal(size=(cls.ROWS, cls.DIM))
+        cls.queries    = centers[rng.integers(0, 20, cls.QUERIES)] + 0.6 * rng.normal(size=(cls.QUERIES, cls.DIM))
+        cls.ids   = [f"p{i}" for i in range(cls.ROWS)]
+        cls.metas = [{"category": "CPU" if i % 2 else "GPU"} for i in range(cls.ROWS)]
+        cls.exact = InMemoryIndex(cls.ids, cls.embeddings, cls.metas)
+
+    def _recall(self, dtype: str, where=None) -> float:
+        expected = self.exact.query(self.queries, self.K, where=where)["ids"]
+        actual   = InMemoryIndex(self.ids, self.embeddings, self.metas, dtype=dtype) \
+            .query(self.queries, self.K, where=where)["ids"]
+        return float(np.mean([len(set(a) & set(e)) / self.K for a, e in zip(actual, expected)]))
+
+    def test_float16_recall(self):
+        self.assertGreaterEqual(self._recall("float16"), 0.99)
+
+    def test_int8_recall(self):
+        self.assertGreaterEqual(self._recall("int8"), 0.9)
+        self.assertGreaterEqual(self._recall("int8", where={"category": "GPU"}), 0.9)
+
+    def test_int8_distances_close_to_float32(self):
+        index = InMemoryIndex(self.ids, self.embeddings, self.metas, dtype="int8")
+        expected = self.exact.query(self.queries, self.K)
+        actual   = index.query(self.queries, self.K)
+        for ids, dists, ref_ids, ref_dists in zip(actual["ids"], actual["distances"],
+                                                  expected["ids"], expected["distances"]):
+            ref = dict(zip(ref_ids, ref_dists))
+            for i, d in zip(ids, dists):
+                if i in ref:
+                    self.assertAlmostEqual(d, ref[i], delta=0.01)
+
+    def test_memory_footprint(self):
+        full = self.exact.nbytes
+        self.assertEqual(InMemoryIndex(self.ids, self.embeddings, self.metas, dtype="float16").nbytes,
+                         full // 2)
+        self.assertLess(InMemoryIndex(self.ids, self.embeddings, self.metas, dtype="int8").nbytes,
+                        full // 3)
+
+
+# ══════════════════════════════════════════════════════════════════
+# embedding.py — 쿼리 임베딩 캐시 (LRU + mmap 스필)
+# ══════════════════════════════════════════════════════════════════
+
+class FakeEncoder:
+    """텍스트마다 결정적인 벡터를 돌려주고 호출 내역을 기록한다"""
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([np.random.default_rng(sum(t.encode("utf-8"))).normal(size=self.dim)
+                         for t in texts]).astype(np.float32)
+
+
+class QueryEmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spill_dir = tmp.name
+        self.encoder = FakeEncoder()
+
+    def test_encodes_only_missing_normalized_texts_once(self):
+        cache = QueryEmbeddingCache("m", max_entries=10)
+        vecs = cache.encode(["RTX  4060 ", "RTX 4060", "B650"], self.encoder)
+        self.assertEqual(self.encoder.calls, [["RTX 4060", "B650"]])
+        np.testing.assert_array_equal(vecs[0], vecs[1])
+
+        cache.encode(["B650", "DDR5"], self.encoder)
+        self.assertEqual(self.encoder.calls[-1], ["DDR5"])
+        self.assertEqual({k: cache.stats()[k] for k in ("hits", "misses", "entries")},
+                         {"hits": 1, "misses": 3, "entries": 3})
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = QueryEmbeddingCache("m", max_entries=2)
+        cache.encode(["a", "b"], self.encoder)
+        cache.encode(["a"], self.encoder)            # a를 최근으로
+        cache.encode(["c"], self.encoder)            # b 밀려남
+        self.encoder.calls.clear()
+        cache.encode(["a", "b"], self.encoder)
+        self.assertEqual(self.encoder.calls, [["b"]])
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_empty_input(self):
+        self.assertEqual(QueryEmbeddingCache("m").encode([], self.encoder).shape, (0, 0))
+        self.assertEqual(self.encoder.calls, [])
+
+    def test_spill_serves_evicted_keys(self):
+        cache = QueryEmbeddingCache("m", max_entries=1, spill_dir=self.spill_dir,
+                                    spill_slots=64, dim=8)
+        first = cache.encode(["a"], self.encoder)
+        cache.encode(["b"], self.encoder)            # a는 메모리에서 밀려남
+        again = cache.encode(["a"], self.encoder)
+        self.assertEqual(len(self.encoder.calls), 2)
+        self.assertEqual(cache.stats()["spill_hits"], 1)
+        np.testing.assert_array_equal(first, again)
+
+    def test_spill_shared_across_instances(self):
+        for dim in (8, 0):                           # 차원을 알 때 / 기존 스필 파일에서 찾을 때
+            with self.subTest(dim=dim), tempfile.TemporaryDirectory() as spill_dir:
+                encoder = FakeEncoder()
+                QueryEmbeddingCache("m", spill_dir=spill_dir, spill_slots=64, dim=8) \
+                    .encode(["RTX 4060", "B650"], encoder)
+                other = QueryEmbeddingCache("m", spill_dir=spill_dir, spill_slots=64, dim=dim)
+                other.encode(["RTX 4060", "B650"], encoder)
+                self.assertEqual(len(encoder.calls), 1)
+                self.assertEqual(other.stats()["spill_hits"], 2)
+
+    def test_spill_is_per_model_key(self):
+        QueryEmbeddingCache("m1", spill_dir=self.spill_dir, spill_slots=64, dim=8) \
+            .encode(["a"], self.encoder)
+        other = QueryEmbeddingCache("m2", spill_dir=self.spill_dir, spill_slots=64, dim=8)
+        other.encode(["a"], self.encoder)
+        self.assertEqual(len(self.encoder.calls), 2)
+        self.assertEqual(other.stats()["spill_hits"], 0)
+
+    def test_create_zeroed_never_truncates_existing_file(self):
+        path = Path(self.spill_dir) / "spill.f32"
+        _create_zeroed(path, 16)
+        self.assertEqual(path.read_bytes(), bytes(16))
+        path.write_bytes(b"\x01" * 16)
+        _create_zeroed(path, 16)
+        self.assertEqual(path.read_bytes(), b"\x01" * 16)
+        self.assertEqual([p.name for p in Path(self.spill_dir).iterdir()], ["spill.f32"])
+
+
+# ══════════════════════════════════════════════════════════════════
+# llm_cache.py — LLM 응답 캐시 (TTL · LRU)
+# ══════════════════════════════════════════════════════════════════
+
+class FakeClock:
+    """llm_cache.time 대용 — used_at 순서가 같은 초에 겹치지 않게 직접 넘긴다"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        self.now += 0.001
+        return self.now
+
+
+class _CacheTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = str(Path(tmp.name) / "cache.db")
+        self.clock = FakeClock()
+        patcher = mock.patch.object(llm_cache, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class LLMCacheTests(_CacheTestCase):
+    def test_key_ignores_whitespace_but_not_model_or_temperature(self):
+        base = cache_key("예산 150만원\n 게임용", "gpt-4o-mini", 0.0)
+        self.assertEqual(base, cache_key("예산 150만원 게임용", "gpt-4o-mini", 0.0))
+        self.assertNotEqual(base, cache_key("예산 150만원 게임용", "gpt-4o", 0.0))
+        self.assertNotEqual(base, cache_key("예산 150만원 게임용", "gpt-4o-mini", 0.7))
+
+    def test_hit_and_miss(self):
+        cache = LLMCache(self.db)
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "gpt-test", "응답", latency_ms=1500)
+        self.assertEqual(cache.get("k"), "응답")
+        self.assertEqual({k: cache.stats()[k] for k in ("entries", "hits", "misses", "saved_s")},
+                         {"entries": 1, "hits": 1, "misses": 1, "saved_s": 1.5})
+
+    def test_ttl_expiry_deletes_entry(self):
+        cache = LLMCache(self.db, ttl_s=60)
+        cache.put("k", "gpt-test", "응답", latency_ms=10)
+        self.clock.now += 61
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_put_evicts_least_recently_used(self):
+        cache = LLMCache(self.db, max_entries=2)
+        cache.put("a", "gpt-test", "A", latency_ms=10)
+        cache.put("b", "gpt-test", "B", latency_ms=10)
+        cache.get("a")                               # a를 최근으로
+        cache.put("c", "gpt-test", "C", latency_ms=10)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), ("A", None, "C"))
+
+    def test_persists_across_instances(self):
+        LLMCache(self.db).put("k", "gpt-test", "응답", latency_ms=10)
+        self.assertEqual(LLMCache(self.db).get("k"), "응답")
+
+
+# ══════════════════════════════════════════════════════════════════
+# llm_cache.py — 시맨틱 캐시 (threshold · scope)
+# ══════════════════════════════════════════════════════════════════
+
+def _unit(*xs: float) -> np.ndarray:
+    v = np.asarray(xs, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+class SemanticCacheTests(_CacheTestCase):
+    def test_threshold_boundary(self):
+        cache = SemanticCache(self.db, threshold=0.9)
+        cache.store("게임용|150", "조용한 PC", _unit(1, 0, 0), {"cpu": 0.3})
+        near = _unit(1, 0.4, 0)                      # cos ≈ 0.928
+        far  = _unit(1, 0.6, 0)                      # cos ≈ 0.857
+        hit = cache.lookup("게임용|150", near)
+        self.assertEqual((hit["result"], hit["notes"]), ({"cpu": 0.3}, "조용한 PC"))
+        self.assertGreaterEqual(hit["similarity"], 0.9)
+        self.assertIsNone(cache.lookup("게임용|150", far))
+        self.assertEqual({k: cache.stats()[k] for k in ("hits", "misses")}, {"hits": 1, "misses": 1})
+
+    def test_returns_closest_entry(self):
+        cache = SemanticCache(self.db, threshold=0.5)
+        cache.store("s", "RGB 많이", _unit(1, 0, 0), {"pick": "rgb"})
+        cache.store("s", "화이트 감성", _unit(0, 1, 0), {"pick": "white"})
+        self.assertEqual(cache.lookup("s", _unit(0.2, 1, 0))["result"], {"pick": "white"})
+
+    def test_scope_isolation(self):
+        cache = SemanticCache(self.db, threshold=0.9)
+        cache.store("게임용|150", "조용한 PC", _unit(1, 0, 0), {"cpu": 0.3})
+        self.assertIsNone(cache.lookup("사무용|150", _unit(1, 0, 0)))
+
+    def test_dimension_mismatch_is_miss(self):
+        cache = SemanticCache(self.db, threshold=0.5)
+        cache.store("s", "조용한 PC", _unit(1, 0, 0), {"cpu": 0.3})
+        self.assertIsNone(cache.lookup("s", _unit(1, 0, 0, 0)))
+
+    def test_store_keeps_most_recently_used_per_scope(self):
+        cache = SemanticCache(self.db, threshold=0.99, max_per_scope=2)
+        cache.store("s", "a", _unit(1, 0, 0), {"n": "a"})
+        cache.store("s", "b", _unit(0, 1, 0), {"n": "b"})
+        cache.lookup("s", _unit(1, 0, 0))            # a를 최근으로
+        cache.store("s", "c", _unit(0, 0, 1), {"n": "c"})
+        cache.store("t", "d", _unit(0, 1, 0), {"n": "d"})   # 다른 scope는 영향 없음
+        self.assertIsNotNone(cache.lookup("s", _unit(1, 0, 0)))
+        self.assertIsNone(cache.lookup("s", _unit(0, 1, 0)))
+        self.assertIsNotNone(cache.lookup("s", _unit(0, 0, 1)))
+
+    def test_audit_false_reuse_rate(self):
+        cache = SemanticCache(self.db)
+        cache.record_audit("조용한 PC", "저소음 PC", 0.95, agreed=True)
+        cache.record_audit("RGB 많이", "RGB 없이", 0.93, agreed=False)
+        self.assertEqual({k: cache.stats()[k] for k in ("audits", "false_reuse", "false_reuse_rate")},
+                         {"audits": 2, "false_reuse": 1, "false_reuse_rate": 0.5})
+
+
+# ══════════════════════════════════════════════════════════════════
+# gunicorn.conf.py — preload 훅 (onnx 백엔드는 torch 없이 동작해야 함)
+# ══════════════════════════════════════════════════════════════════
+
+class GunicornPreloadHookTests(SimpleTestCase):
+    def setUp(self):
+        from . import graph
+        self.graph = graph
+        spec = importlib.util.spec_from_file_location(
+            "gunicorn_conf", Path(__file__).resolve().parents[1] / "gunicorn.conf.py")
+        self.conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.conf)
+        self.server = mock.Mock()
+        for target, name, value in ((self.conf, "preload_app", True),
+                                    (self.conf, "WARMUP_ON_START", "0"),
+                                    (graph, "EMBEDDING_BACKEND", "onnx"),
+                                    (graph, "_embed_preloaded", False)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_onnx_backend_is_not_preloaded(self):
+        self.assertFalse(self.graph.preload_for_fork())
+        self.assertFalse(self.graph.embed_preloaded())
+
+    def test_post_fork_skips_torch_when_not_preloaded(self):
+        with mock.patch.dict(sys.modules, {"torch": None}):   # torch import 시 ImportError
+            self.conf.post_fork(self.server, mock.Mock())
+
+    def test_when_ready_warns_when_preload_had_no_effect(self):
+        self.conf.when_ready(self.server)
+        self.server.log.warning.assert_called_once()
+
+    def test_post_fork_sets_torch_threads_after_preload(self):
+        fake_torch = mock.Mock()
+        with mock.patch.object(self.graph, "_embed_preloaded", True), \
+                mock.patch.dict(sys.modules, {"torch": fake_torch}):
+            self.conf.post_fork(self.server, mock.Mock())
+            self.conf.when_ready(self.server)
+        fake_torch.set_num_threads.assert_called_once()
+        self.server.log.warning.assert_not_called()
+
+
+# ══════════════════════════════════════════════════════════════════
+# vectordb.py (루트 빌더) — 안정 id · 행 해시 · 매니페스트 증분 비교
+# ══════════════════════════════════════════════════════════════════
+
+class FakeCollection:
+    def __init__(self):
+        self.upserted, self.updated = [], []
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.upserted.extend(ids)
+
+    def update(self, ids, metadatas):
+        self.updated.extend(ids)
+
+
+class FakeEngine:
+    dim = 4
+
+    def encode(self, texts):
+        return np.ones((len(texts), self.dim), dtype=np.float32)
+
+
+def _import_vectordb():
+    """루트의 vectordb.py (Django 밖 빌더 스크립트)"""
+    root = str(Path(__file__).resolve().parents[2])
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import vectordb
+    return vectordb
+
+
+class VectorDBIncrementalTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vectordb = _import_vectordb()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(self.vectordb, "MANIFEST_PATH", Path(tmp.name) / "manifest.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stable_id_independent_of_row_position(self):
+        stable_id = self.vectordb._stable_id
+        first  = [stable_id("CPU", name, set()) for name in ("A", "B")]
+        second = [stable_id("CPU", name, set()) for name in ("새 제품", "A", "B")][1:]
+        self.assertEqual(first, second)
+        self.assertNotEqual(stable_id("CPU", "A", set()), stable_id("GPU", "A", set()))
+
+    def test_stable_id_suffixes_duplicates(self):
+        used = set()
+        ids  = [self.vectordb._stable_id("CPU", "A", used) for _ in range(3)]
+        self.assertEqual(ids[1:], [f"{ids[0]}_2", f"{ids[0]}_3"])
+
+    def test_row_hash_separates_text_and_metadata(self):
+        row_hash, text_changed = self.vectordb._row_hash, self.vectordb._text_changed
+        base = row_hash("텍스트", {"a": 1, "b": "x"})
+        self.assertEqual(base, row_hash("텍스트", {"b": "x", "a": 1}))
+        meta_only = row_hash("텍스트", {"a": 2, "b": "x"})
+        self.assertNotEqual(base, meta_only)
+        self.assertFalse(text_changed(base, meta_only))
+        self.assertTrue(text_changed(base, row_hash("다른 텍스트", {"a": 1, "b": "x"})))
+
+    def test_manifest_round_trip_and_mismatch(self):
+        vectordb = self.vectordb
+        vectordb.save_manifest({"CPU_1": "h"}, "onnx", dim=256)
+        self.assertEqual(vectordb.load_manifest("onnx", dim=256)["rows"], {"CPU_1": "h"})
+        self.assertEqual(vectordb.load_manifest("torch", dim=256), {})
+        self.assertEqual(vectordb.load_manifest("onnx", dim=0), {})
+        self.assertEqual([p.name for p in vectordb.MANIFEST_PATH.parent.iterdir()], ["manifest.json"])
+
+        vectordb.MANIFEST_PATH.write_text("{깨진", encoding="utf-8")
+        self.assertEqual(vectordb.load_manifest("onnx", dim=256), {})
+
+    def _build(self, rows, old_rows):
+        coll, loads = FakeCollection(), []
+
+        def load_engine():
+            loads.append(1)
+            return FakeEngine()
+
+        with mock.patch.object(self.vectordb, "iter_rows", lambda: iter(rows)), \
+                mock.patch("builtins.print"):
+            stats = self.vectordb.stream_build(coll, old_rows, load_engine, chunk_size=2)
+        return stats, coll, len(loads)
+
+    def test_stream_build_embeds_only_changed_text(self):
+        rows = [("A", "a", {"price_krw": 1}), ("B", "b", {"price_krw": 2}),
+                ("C", "c", {"price_krw": 3})]
+        stats, coll, loads = self._build(rows, {})
+        self.assertEqual((stats["embedded"], sorted(coll.upserted), loads), (3, ["A", "B", "C"], 1))
+
+        changed = [("A", "a", {"price_krw": 1}),          # 그대로
+                   ("B", "b", {"price_krw": 20}),         # 메타데이터만
+                   ("C", "c 수정", {"price_krw": 3}),      # 텍스트
+                   ("D", "d", {"price_krw": 4})]          # 신규
+        stats, coll, _ = self._build(changed, stats["new_rows"])
+        self.assertEqual(sorted(coll.upserted), ["C", "D"])
+        self.assertEqual(coll.updated, ["B"])
+        self.assertEqual((stats["rows"], stats["embedded"], stats["meta_updated"]), (4, 2, 1))
+        self.assertEqual(set(stats["new_rows"]), {"A", "B", "C", "D"})
+
+    def test_stream_build_without_changes_skips_model_load(self):
+        rows = [("A", "a", {"price_krw": 1})]
+        first, _, _ = self._build(rows, {})
+        stats, coll, loads = self._build(rows, first["new_rows"])
+        self.assertEqual((stats["written"], coll.upserted, coll.updated, loads), (0, [], [], 0))
+
+
+# ══════════════════════════════════════════════════════════════════
+# vectordb.py — 토큰 예산 배치 계획
+# ══════════════════════════════════════════════════════════════════
+
+class PlanBatchesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vectordb = _import_vectordb()
+
+    def _check(self, lengths, token_budget, max_batch):
+        batches = self.vectordb.plan_batches(lengths, token_budget, max_batch)
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(len(lengths))))
+        for batch in batches:
+            self.assertTrue(batch)
+            self.assertLessEqual(len(batch), max_batch)
+            longest = max(max(lengths[i] for i in batch), 1)
+            if len(batch) > 1:                    # 예산보다 긴 줄 하나는 단독 배치로만 허용
+                self.assertLessEqual(len(batch) * longest, token_budget)
+        return batches
+
+    def test_invariants_on_random_lengths(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            lengths = [rng.choice([0, rng.randint(1, 40), rng.randint(40, 512)])
+                       for _ in range(rng.randint(0, 400))]
+            budget  = rng.choice([512, 2048, 8192])
+            with self.subTest(rows=len(lengths), budget=budget):
+                self._check(lengths, budget, self.vectordb.MAX_BATCH)
+
+    def test_max_batch_caps_short_rows(self):
+        batches = self._check([1] * 300, token_budget=10_000, max_batch=128)
+        self.assertEqual([len(b) for b in batches], [128, 128, 44])
+
+    def test_row_longer_than_budget_gets_own_batch(self):
+        batches = self._check([600, 10, 10], token_budget=512, max_batch=128)
+        self.assertEqual(batches, [[0], [1, 2]])
+
+    def test_similar_lengths_grouped_longest_first(self):
+        batches = self._check([10, 500, 12, 480], token_budget=1000, max_batch=128)
+        self.assertEqual(batches, [[1, 3], [2, 0]])
+
+    def test_empty(self):
+        self.assertEqual(self.vectordb.plan_batches([], 8192, 128), [])
+
+
+# ══════════════════════════════════════════════════════════════════
+# candidate_pool.py — 제품명·문서 id 색인, 가격 파싱
+# ══════════════════════════════════════════════════════════════════
+
+class CandidatePoolTests(SimpleTestCase):
+    def setUp(self):
+        self.raw = {
+            "CPU": [{"product_name": "7800X3D", "doc_id": "CPU_a", "price": "520,000원", "socket": "AM5"},
+                    {"product_name": "14400F", "doc_id": "CPU_b", "price": 230000, "price_krw": 230000}],
+            "GPU": [{"product_name": "RTX 4070", "doc_id": "GPU_a", "price": "899,000원",
+                     "image_url": "https://img/4070.jpg"},
+                    {"product_name": "7800X3D", "doc_id": "GPU_dup", "price": "1원"},
+                    {"product_name": "id 없음", "price": ""}],
+        }
+        self.pool = CandidatePool(self.raw)
+
+    def test_parse_price(self):
+        for val, expected in (("850,000원", 850_000), (850_000, 850_000), (1500.0, 1500),
+                              ("", 0), (None, 0), ("가격문의", 0)):
+            with self.subTest(val=val):
+                self.assertEqual(_parse_price(val), expected)
+
+    def test_lookup_by_name_and_doc_id(self):
+        self.assertIs(self.pool.meta("RTX 4070"), self.pool.by_id["GPU_a"])
+        self.assertEqual(self.pool.meta("7800X3D")["socket"], "AM5")      # 중복 제품명은 먼저 나온 후보
+        self.assertEqual(self.pool.by_id["GPU_dup"]["price_krw"], 1)
+        self.assertEqual(self.pool.meta("없는 제품"), {})
+        self.assertNotIn("", self.pool.by_id)
+
+    def test_prices_and_images_indexed_once(self):
+        self.assertEqual(self.pool.price("7800X3D"), 520_000)
+        self.assertEqual(self.pool.price("14400F"), 230_000)
+        self.assertEqual(self.pool.price("id 없음"), 0)
+        self.assertEqual(self.pool.image_map["RTX 4070"], "https://img/4070.jpg")
+
+    def test_of_wraps_plain_dict_and_keeps_pool(self):
+        self.assertIs(CandidatePool.of(self.pool), self.pool)
+        self.assertEqual(CandidatePool.of(None), {})
+        self.assertEqual(CandidatePool.of(self.raw).meta("14400F")["doc_id"], "CPU_b")
+
+    def test_find_meta_uses_pool_for_pool_and_plain_dict(self):
+        for candidates in (self.pool, self.raw):
+            with self.subTest(kind=type(candidates).__name__):
+                self.assertEqual(_find_meta("RTX 4070", candidates)["doc_id"], "GPU_a")
+                self.assertEqual(_find_meta("없는 제품", candidates), {})
+
+    def test_pickle_rebuilds_indexes(self):
+        restored = pickle.loads(pickle.dumps(self.pool))
+        self.assertIsInstance(restored, CandidatePool)
+        self.assertEqual(restored.by_id["GPU_a"]["product_name"], "RTX 4070")
+        self.assertEqual(restored.price("7800X3D"), 520_000)
+
+
+# ══════════════════════════════════════════════════════════════════
+# graph.py — 후보 ID 인코딩 (QUOTE_PROMPT_IDS=1)
+# ══════════════════════════════════════════════════════════════════
+
+class PartIdTests(SimpleTestCase):
+    def setUp(self):
+        from . import graph
+        self.graph = graph
+        self.candidates = CandidatePool({
+            "CPU":  [_part("AMD 라이젠 7 7800X3D (라파엘)", 520_000, category="CPU"),
+                     _part("인텔 i5-14400F", 230_000)],                      # category 없는 후보
+            "GPU":  [_part("RTX 4070", 899_000, category="GPU")],
+            "메인보드": [_part(f"보드{i}", 100_000 + i, category="메인보드") for i in range(1, 13)],
+        })
+
+    def _expand(self, **refs):
+        return self.graph._expand_part_ids(dict(refs), self.candidates)
+
+    def test_ids_are_case_and_whitespace_insensitive(self):
+        for ref in ("C1", "c1", " C1 ", "c 1", "C\t1"):
+            with self.subTest(ref=ref):
+                self.assertEqual(self._expand(CPU=ref)["CPU"],
+                                 {"name": "AMD 라이젠 7 7800X3D (라파엘)", "price": "520,000원"})
+
+    def test_id_from_other_category_is_rejected(self):
+        quote = self._expand(CPU="G1", GPU="C2")
+        self.assertEqual(quote["CPU"], {"name": "G1", "price": ""})
+        self.assertEqual(quote["GPU"], {"name": "C2", "price": ""})
+        self.assertEqual(self.graph._validate_parts(quote, self.candidates), ["CPU: G1", "GPU: C2"])
+
+    def test_unknown_ids_are_left_for_validate_parts(self):
+        quote = self._expand(CPU="C9", GPU="RTX 4070", 메인보드="M11")
+        self.assertEqual(quote["CPU"]["name"], "C9")
+        self.assertEqual(quote["GPU"]["name"], "RTX 4070")   # 제품명으로 답해도 이름이 맞으면 통과
+        self.assertEqual(self.graph._validate_parts(quote, self.candidates), ["CPU: C9", "메인보드: M11"])
+
+    def test_non_string_refs_untouched(self):
+        quote = self._expand(CPU={"name": "인텔 i5-14400F", "price": "230,000원"})
+        self.assertEqual(quote["CPU"]["name"], "인텔 i5-14400F")
+        self.assertNotIn("GPU", quote)
+
+    def test_prompt_ids_round_trip(self):
+        text = self.graph._candidates_text({"candidates": self.candidates}, ids=True)
+        shown = re.findall(r"^  ([A-Z]\d+) ", text, flags=re.M)
+        self.assertEqual(len(shown), 2 + 1 + self.graph._PROMPT_TOP)   # 카테고리당 상위 _PROMPT_TOP개
+        self.assertEqual(set(shown), set(self.graph._candidate_ids(self.candidates)))
+        for cat, items in self.candidates.items():
+            prefix = self.graph._CAT_ID_PREFIX[cat]
+            for i, item in enumerate(items[:self.graph._PROMPT_TOP], 1):
+                with self.subTest(id=f"{prefix}{i}"):
+                    self.assertEqual(self._expand(**{cat: f"{prefix}{i}"})[cat],
+                                     {"name": item["product_name"], "price": item["price"]})
+                    self.assertIn(f"  {prefix}{i} {self.graph._short_name(item['product_name'])}", text)
+
+
+# ══════════════════════════════════════════════════════════════════
+# graph.py — 유형별 생성 재시도 (QUOTE_GEN_MODE=per_type)
+# ══════════════════════════════════════════════════════════════════
+
+class StubQuoteLLM:
+    """유형별 프롬프트의 견적 id를 읽어 시도 순서대로 준비한 부품 ID 조합을 답한다"""
+
+    def __init__(self, answers: dict):
+        self.answers   = {qid: list(attempts) for qid, attempts in answers.items()}
+        self.requested = []
+
+    def invoke(self, messages):
+        qid = int(re.search(r'\{"quote": \{"id": (\d)', messages[-1].content).group(1))
+        self.requested.append(qid)
+        parts = self.answers[qid].pop(0)
+        return SimpleNamespace(content=json.dumps({"quote": {"id": qid, **parts, "reason": []}}),
+                               usage_metadata={})
+
+
+class PerTypeRetryTests(SimpleTestCase):
+    GOOD = {"CPU": "C1", "메인보드": "M1", "RAM": "R1", "GPU": "G1", "파워": "P1",
+            "SSD": "S1", "케이스": "K1", "쿨러": "F1"}
+    BAD  = dict(GOOD, 메인보드="M2")          # LGA1700/DDR4 보드 → 소켓·DDR 불일치
+
+    def setUp(self):
+        from . import graph
+        self.graph = graph
+        for name, value in (("QUOTE_GEN_MODE", "per_type"), ("QUOTE_PROMPT_IDS", "1")):
+            patcher = mock.patch.object(graph, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        metrics = mock.patch.dict(graph._compat_metrics)
+        metrics.start()
+        self.addCleanup(metrics.stop)
+
+        self.state = graph._initial_state(2_000_000, "게임용", "")
+        self.state["candidates"] = CandidatePool({
+            "CPU":      [_part("7800X3D", 500_000, socket="AM5", ddr_type="DDR5", tdp_w=120)],
+            "메인보드": [_part("B650", 200_000, socket="AM5", ddr_type="DDR5"),
+                         _part("B760 D4", 150_000, socket="LGA1700", ddr_type="DDR4")],
+            "RAM":      [_part("DDR5 32GB", 120_000, ddr_type="DDR5")],
+            "GPU":      [_part("RTX 4070", 800_000, tdp_w=200, required_psu_w=650)],
+            "파워":     [_part("850W", 110_000, wattage_w=850)],
+            "SSD":      [_part("1TB", 90_000)],
+            "케이스":   [_part("미들타워", 70_000)],
+            "쿨러":     [_part("AK400", 30_000)],
+        })
+
+    def _round(self, llm: StubQuoteLLM) -> str:
+        """generate_quotes → check_compatibility → should_retry 한 바퀴"""
+        with mock.patch.object(self.graph, "_get_llm", lambda: llm):
+            self.state.update(self.graph.generate_quotes(self.state))
+            self.state.update(self.graph.check_compatibility_node(self.state))
+        return self.graph.should_retry(self.state)
+
+    def test_retry_requests_only_missing_types_and_keeps_passed(self):
+        llm = StubQuoteLLM({1: [self.GOOD], 2: [self.BAD, self.GOOD], 3: [self.BAD, self.BAD]})
+
+        self.assertEqual(self._round(llm), "retry_generate")
+        self.assertEqual(sorted(llm.requested), [1, 2, 3])
+        budget_quote = self.state["valid_quotes"][0]
+        self.assertEqual(budget_quote["type"], "가성비형")
+
+        llm.requested.clear()
+        self.assertEqual(self._round(llm), "continue")          # retry_count == 2 → 더 재시도 안 함
+        self.assertEqual(sorted(llm.requested), [2, 3])         # 통과한 가성비형은 다시 만들지 않음
+        self.assertEqual([q["id"] for q in self.state["valid_quotes"]], [1, 2])
+        self.assertIs(self.state["valid_quotes"][0], budget_quote)
+        self.assertEqual(self.state["retry_count"], 2)
+
+    def test_all_types_passing_needs_no_retry(self):
+        llm = StubQuoteLLM({qid: [self.GOOD] for qid in (1, 2, 3)})
+        self.assertEqual(self._round(llm), "continue")
+        self.assertEqual(len(self.state["valid_quotes"]), 3)
+
+    def test_should_retry_per_type_branch(self):
+        one_valid = [{"id": 1, "type": "가성비형"}]
+        for valid, retry, expected in ((one_valid, 1, "retry_generate"),
+                                       (one_valid, 2, "continue"),
+                                       ([{"id": i} for i in (1, 2, 3)], 1, "continue"),
+                                       ([], 1, "retry_generate"),
+                                       ([], 2, "retry_search")):
+            with self.subTest(valid=len(valid), retry=retry):
+                state = {"valid_quotes": valid, "retry_count": retry, "search_retry_count": 0}
+                self.assertEqual(self.graph.should_retry(state), expected)
+
+
+# ══════════════════════════════════════════════════════════════════
+# keyword_planner.py — 참고사항 없는 요청의 키워드 표
+# ══════════════════════════════════════════════════════════════════
+
+class KeywordPlannerTests(SimpleTestCase):
+    PLAN = {"categories": {
+        "GPU": [
+            {"family": "RTX 4060",    "median_price": 400_000,   "count": 30},
+            {"family": "RX 7600",     "median_price": 400_000,   "count": 12},
+            {"family": "RTX 4060 Ti", "median_price": 550_000,   "count": 25},
+            {"family": "RTX 4070",    "median_price": 850_000,   "count": 20},
+            {"family": "RTX 4090",    "median_price": 3_000_000, "count": 5},
+        ],
+        "CPU": [{"family": "라이젠5 7600", "median_price": 250_000, "count": 8}],
+    }}
+
+    def setUp(self):
+        self.planner = KeywordPlanner(self.PLAN)
+
+    def test_picks_budget_nearest_family(self):
+        self.assertEqual(self.planner.keywords_for("GPU", 570_000, per_cat=1), ["RTX 4060 Ti"])
+        self.assertEqual(self.planner.keywords_for("GPU", 800_000, per_cat=1), ["RTX 4070"])
+
+    def test_equal_distance_prefers_larger_family(self):
+        self.assertEqual(self.planner.keywords_for("GPU", 400_000, per_cat=2), ["RTX 4060", "RX 7600"])
+
+    def test_per_cat_limit(self):
+        for per_cat in (1, 2, 3):
+            with self.subTest(per_cat=per_cat):
+                self.assertEqual(len(self.planner.keywords_for("GPU", 600_000, per_cat)), per_cat)
+        # 구간(0.4 ~ 1.8배) 안 제품군이 per_cat보다 적으면 있는 만큼만
+        self.assertEqual(self.planner.keywords_for("GPU", 2_500_000, per_cat=3), ["RTX 4090"])
+
+    def test_out_of_band_falls_back_to_nearest(self):
+        self.assertEqual(self.planner.keywords_for("GPU", 50_000, per_cat=1), ["RTX 4060"])
+        self.assertEqual(self.planner.keywords_for("CPU", 5_000_000), ["라이젠5 7600"])
+
+    def test_category_without_entries_uses_category_name(self):
+        self.assertEqual(self.planner.keywords_for("케이스", 100_000), ["케이스"])
+        self.assertEqual(self.planner.keywords_for("GPU", 0), ["GPU"])
+
+    def test_plan_uses_allocation_and_default_ratio(self):
+        plan = self.planner.plan(1_500_000, {"GPU": 0.38}, ["GPU", "CPU", "쿨러"], per_cat=1)
+        self.assertEqual(plan, {"GPU": ["RTX 4060 Ti"],      # 57만원
+                                "CPU": ["라이젠5 7600"],      # 배분 없음 → 10% = 15만원
+                                "쿨러": ["쿨러"]})
+
+    def test_load_returns_none_for_missing_or_broken_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(KeywordPlanner.load(str(Path(tmp) / "none.json")))
+            for name, text in (("broken.json", "{not json"), ("empty.json", '{"categories": {}}'),
+                               ("list.json", "[1, 2]")):
+                with self.subTest(name=name):
+                    path = Path(tmp) / name
+                    path.write_text(text, encoding="utf-8")
+                    self.assertIsNone(KeywordPlanner.load(str(path)))
+            ok = Path(tmp) / "plan.json"
+            ok.write_text(json.dumps(self.PLAN, ensure_ascii=False), encoding="utf-8")
+            self.assertEqual(KeywordPlanner.load(str(ok)).keywords_for("CPU", 250_000), ["라이젠5 7600"])
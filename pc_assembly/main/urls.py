@@ -4,4 +4,7 @@ from . import views
 urlpatterns = [
     path("",            views.index,          name="index"),
     path("api/quote/",  views.generate_quote, name="generate_quote"),
+    path("api/quote/stream/", views.generate_quote_stream, name="generate_quote_stream"),
+    path("api/metrics/", views.metrics,       name="metrics"),
+    path("healthz/",    views.healthz,        name="healthz"),
 ]
@@ -0,0 +1,177 @@
+"""
+vector_index.py — 인메모리 정확(exact) 벡터 검색 엔진
+
+카탈로그가 수천 개 규모라 HNSW 근사 검색 + SQLite 메타데이터 조회를 거치는 것보다
+전체 벡터를 연속된 NumPy 행렬 하나에 올려 두고 행렬곱으로 바로 계산하는 편이
+빠르고 recall 손실도 없다.
+
+구성:
+    _matrix  : (N, dim) float32 / float16 / int8 정규화 벡터
+               int8은 행별 스케일(최대 절댓값/127) 대칭 양자화 — 유사도에 _scales를 곱해 복원
+    _columns : 메타데이터 키별 열(column) 배열 — category, has_rgb, color, price_krw …
+               정수 필드는 int64 배열 + 존재 여부 마스크, 나머지는 object 배열
+
+query()는 chromadb Collection.query()와 같은 인자·반환 형식을 쓰므로
+graph.py는 백엔드(VECTOR_BACKEND=chroma | memory)를 몰라도 된다.
+컬렉션을 다시 빌드하면 프로세스를 재시작해야 새 벡터가 반영된다.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_INT_MISSING = np.iinfo(np.int64).min
+_NEGATIVE_OPS = ("$ne", "$nin")
+
+
+class InMemoryIndex:
+    """마스크 + 행렬곱 기반 필터 top-k 검색. 코사인 거리(1 - 내적)를 반환한다."""
+
+    def __init__(self, ids: List[str], embeddings, metadatas: List[dict],
+                 dtype: str = "float32"):
+        self.ids       = np.asarray(ids, dtype=object)
+        self.metadatas = list(metadatas)
+        self.dtype     = np.dtype(dtype)
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms  = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.clip(norms, 1e-12, None)
+        if self.dtype == np.int8:
+            self._scales = np.clip(np.abs(matrix).max(axis=1), 1e-12, None) / 127.0
+            self._matrix = np.round(matrix / self._scales[:, None]).astype(np.int8)
+            self._scales = self._scales.astype(np.float32)
+        else:
+            self._scales = None
+            self._matrix = matrix.astype(self.dtype)
+
+        self._columns: Dict[str, np.ndarray] = {}
+        self._present: Dict[str, np.ndarray] = {}
+        keys = {k for m in self.metadatas for k in m}
+        for key in keys:
+            values = [m.get(key) for m in self.metadatas]
+            present = np.array([v is not None for v in values], dtype=bool)
+            if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool)
+                   for v in values if v is not None):
+                col = np.array([_INT_MISSING if v is None else int(v) for v in values],
+                               dtype=np.int64)
+            else:
+                col = np.array(values, dtype=object)
+            self._columns[key] = col
+            self._present[key] = present
+
+    # ── 생성 ─────────────────────────────────────────────────────
+    @classmethod
+    def from_collection(cls, collection, dtype: str = "float32",
+                        page: int = 5000) -> "InMemoryIndex":
+        """Chroma 컬렉션 전체(벡터 + 메타데이터)를 페이지 단위로 읽어 인덱스를 만든다"""
+        ids: List[str] = []
+        embs: List[Any] = []
+        metas: List[dict] = []
+        total = collection.count()
+        for offset in range(0, total, page):
+            res = collection.get(include=["embeddings", "metadatas"],
+                                 limit=page, offset=offset)
+            ids.extend(res["ids"])
+            embs.extend(res["embeddings"])
+            metas.extend(res["metadatas"])
+        return cls(ids, embs, metas, dtype=dtype)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self._matrix.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        extra = self._scales.nbytes if self._scales is not None else 0
+        return int(self._matrix.nbytes + extra)
+
+    # ── where 절 평가 (Chroma 문법의 부분집합) ────────────────────
+    def _mask(self, where: Optional[dict]) -> np.ndarray:
+        n = len(self.ids)
+        if not where:
+            return np.ones(n, dtype=bool)
+        mask = np.ones(n, dtype=bool)
+        for key, cond in where.items():
+            if key == "$and":
+                for sub in cond:
+                    mask &= self._mask(sub)
+            elif key == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for sub in cond:
+                    any_mask |= self._mask(sub)
+                mask &= any_mask
+            else:
+                mask &= self._field_mask(key, cond)
+        return mask
+
+    def _field_mask(self, key: str, cond) -> np.ndarray:
+        """
+        필드 조건 하나 → 행 마스크. Chroma와 같이 긍정 연산자($eq·$gt·$in …)는 필드가 없는 행을
+        제외하고, 부정 연산자($ne·$nin)는 필드가 없는 행도 통과시킨다.
+        """
+        n = len(self.ids)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        col = self._columns.get(key)
+        if col is None:
+            return np.full(n, all(op in _NEGATIVE_OPS for op in cond), dtype=bool)
+        present = self._present[key]
+
+        mask = np.ones(n, dtype=bool)
+        for op, val in cond.items():
+            if op == "$eq":
+                mask &= present & (col == val)
+            elif op == "$ne":
+                mask &= ~present | (col != val)
+            elif op == "$gt":
+                mask &= present & (col > val)
+            elif op == "$gte":
+                mask &= present & (col >= val)
+            elif op == "$lt":
+                mask &= present & (col < val)
+            elif op == "$lte":
+                mask &= present & (col <= val)
+            elif op == "$in":
+                mask &= present & np.isin(col, list(val))
+            elif op == "$nin":
+                mask &= ~present | ~np.isin(col, list(val))
+            else:
+                raise ValueError(f"지원하지 않는 where 연산자: {op}")
+        return mask
+
+    # ── 검색 ─────────────────────────────────────────────────────
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[dict] = None,
+              include=("metadatas", "distances")) -> Dict[str, list]:
+        """
+        query_embeddings (k, dim)에 대해 where 조건을 만족하는 행만 대상으로 top-n을 구한다.
+        k개의 쿼리를 한 번의 행렬곱으로 처리한다 (요청의 키워드 전체를 한꺼번에 넘기면 됨).
+        """
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        q = q / np.clip(np.linalg.norm(q, axis=1, keepdims=True), 1e-12, None)
+
+        rows = np.flatnonzero(self._mask(where))
+        out: Dict[str, list] = {"ids": [], "metadatas": [], "distances": []}
+        if rows.size == 0:
+            for _ in range(len(q)):
+                out["ids"].append([])
+                out["metadatas"].append([])
+                out["distances"].append([])
+            return out
+
+        sims = q @ self._matrix[rows].astype(np.float32, copy=False).T   # (k, |rows|)
+        if self._scales is not None:
+            sims *= self._scales[rows]
+        top  = min(n_results, rows.size)
+        for s in sims:
+            part  = np.argpartition(-s, top - 1)[:top]
+            order = part[np.argsort(-s[part], kind="stable")]
+            hit   = rows[order]
+            out["ids"].append(self.ids[hit].tolist())
+            out["metadatas"].append([self.metadatas[i] for i in hit])
+            out["distances"].append((1.0 - s[order]).astype(float).tolist())
+        return out
@@ -2,13 +2,17 @@
 views.py — Django 뷰
 
 GET  /          → index.html
-POST /api/quote/ → LangGraph 파이프라인 실행, JSON 반환
+POST /api/quote/ → LangGraph 파이프라인 실행, JSON 반환 (async 뷰 — ASGI로 띄우면 요청당 스레드를 붙잡지 않음)
+POST /api/quote/stream/ → 같은 파이프라인, SSE로 진행 메시지·견적을 나오는 대로 전송
+GET  /healthz/   → 워밍업 상태 (로드밸런서 헬스체크용)
+GET  /api/metrics/ → 캐시 적중률·호환성 LLM 폴백 비율 (워커 프로세스별 누적)
 """
 
 import json
 import traceback
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
@@ -17,56 +21,143 @@ def index(request):
     return render(request, "main/index.html")
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def generate_quote(request):
+def healthz(request):
     """
-    POST /api/quote/
-    body: { "budget": 1500000, "purpose": "gaming", "notes": "..." }
+    GET /healthz/
+    WARMUP_ON_START=1이면 워밍업이 끝날 때까지 503 → 로드밸런서가 준비된 워커에만 라우팅.
+    이 프로세스에서 워밍업을 시작한 적이 없으면(WARMUP_ON_START=0, 또는 워밍업을 띄우지 않는
+    실행 방식) lazy 초기화로 보고 항상 200 — 영원히 503(idle)으로 남지 않는다.
+    """
+    from .apps import warmup_scheduled
+    from .graph import warmup_status
 
-    LangGraph 파이프라인 실행 후 3종 견적 반환.
-    에러 시 500 대신 명확한 JSON 오류 메시지 반환.
+    status = warmup_status()
+    if status["state"] == "idle" and not warmup_scheduled():
+        status["state"] = "lazy"
+    code = 200 if status["state"] in ("ready", "lazy") else 503
+    return JsonResponse(status, status=code, json_dumps_params={"ensure_ascii": False})
+
+
+@require_http_methods(["GET"])
+def metrics(request):
     """
+    GET /api/metrics/
+    compat.fallback_rate(LLM 판정이 필요했던 견적 비율)·compat.cache_hit_rate(판정 캐시 적중률)와
+    LLM/시맨틱/쿼리 임베딩 캐시 통계. 값은 요청을 처리한 워커 프로세스 기준.
+    """
+    from .graph import metrics as pipeline_metrics
+
+    return JsonResponse(pipeline_metrics(), json_dumps_params={"ensure_ascii": False})
+
+
+def _parse_quote_request(request):
+    """요청 body → ((budget, purpose, notes), None) 또는 (None, 400 응답)"""
     try:
         body = json.loads(request.body)
     except (json.JSONDecodeError, ValueError):
-        return JsonResponse({"error": "JSON 파싱 실패"}, status=400)
+        return None, JsonResponse({"error": "JSON 파싱 실패"}, status=400)
 
     budget  = int(body.get("budget", 0))
     purpose = body.get("purpose", "general")
     notes   = body.get("notes",   "")
 
     if budget < 300_000:
-        return JsonResponse({"error": "예산이 너무 낮습니다 (최소 30만원)"}, status=400)
+        return None, JsonResponse({"error": "예산이 너무 낮습니다 (최소 30만원)"}, status=400)
+    return (budget, purpose, notes), None
+
+
+def _pipeline_error(e: Exception):
+    """파이프라인 예외 → (사용자에게 보여줄 오류 dict, HTTP 상태 코드)"""
+    err_str = str(e)
+
+    # OpenAI 인증 오류
+    if "AuthenticationError" in err_str or "Incorrect API key" in err_str or "401" in err_str:
+        return {"error": "OpenAI API 키가 올바르지 않습니다. .env 파일의 OPENAI_API_KEY를 확인해 주세요."}, 503
+    # OpenAI 네트워크/연결 오류
+    if "APIConnectionError" in err_str or "Connection error" in err_str:
+        return {"error": "OpenAI 서버에 연결할 수 없습니다. 네트워크 상태를 확인해 주세요."}, 503
+    # OpenAI 요청 한도 초과
+    if "RateLimitError" in err_str or "429" in err_str:
+        return {"error": "OpenAI API 요청 한도를 초과했습니다. 잠시 후 다시 시도해 주세요."}, 429
+    return {"error": f"파이프라인 오류: {err_str}", "quotes": [], "messages": []}, 500
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def generate_quote(request):
+    """
+    POST /api/quote/
+    body: { "budget": 1500000, "purpose": "gaming", "notes": "..." }
+
+    LangGraph 파이프라인 실행 후 3종 견적 반환.
+    에러 시 500 대신 명확한 JSON 오류 메시지 반환.
+
+    파이프라인 대부분은 OpenAI 응답 대기이므로 arun_quote_pipeline을 await한다.
+    ASGI(uvicorn)에서는 워커 하나가 대기 중인 여러 요청을 동시에 처리하고,
+    WSGI(runserver/gunicorn sync)에서도 Django가 요청마다 이벤트 루프를 만들어 그대로 동작한다.
+    """
+    params, error = _parse_quote_request(request)
+    if error:
+        return error
+    budget, purpose, notes = params
 
     try:
-        from .graph import run_quote_pipeline
-        result = run_quote_pipeline(budget=budget, purpose=purpose, notes=notes)
+        from .graph import arun_quote_pipeline
+        result = await arun_quote_pipeline(budget=budget, purpose=purpose, notes=notes)
         return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
 
     except Exception as e:
         traceback.print_exc()
-        err_str = str(e)
-
-        # OpenAI 인증 오류
-        if "AuthenticationError" in err_str or "Incorrect API key" in err_str or "401" in err_str:
-            return JsonResponse(
-                {"error": "OpenAI API 키가 올바르지 않습니다. .env 파일의 OPENAI_API_KEY를 확인해 주세요."},
-                status=503,
-            )
-        # OpenAI 네트워크/연결 오류
-        if "APIConnectionError" in err_str or "Connection error" in err_str:
-            return JsonResponse(
-                {"error": "OpenAI 서버에 연결할 수 없습니다. 네트워크 상태를 확인해 주세요."},
-                status=503,
-            )
-        # OpenAI 요청 한도 초과
-        if "RateLimitError" in err_str or "429" in err_str:
-            return JsonResponse(
-                {"error": "OpenAI API 요청 한도를 초과했습니다. 잠시 후 다시 시도해 주세요."},
-                status=429,
-            )
-        return JsonResponse(
-            {"error": f"파이프라인 오류: {err_str}", "quotes": [], "messages": []},
-            status=500,
-        )
+        payload, status = _pipeline_error(e)
+        return JsonResponse(payload, status=status)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def generate_quote_stream(request):
+    """
+    POST /api/quote/stream/  (body는 /api/quote/와 같음)
+    text/event-stream으로 진행 상황과 결과를 순서대로 보낸다.
+
+        event: status → {"node": ..., "message": ...}   노드가 끝날 때마다
+        event: quote  → {"quote": {...}}                  호환성 검증 통과 즉시 (최종 정리 전)
+        event: done   → /api/quote/ 응답과 같은 최종 결과
+        event: error  → {"error": ...}
+
+    Django는 서버와 종류가 다른 이터레이터(WSGI에 async, ASGI에 sync)를 끝까지 모아서 보내므로
+    요청 종류에 맞춰 동기(graph.stream) / 비동기(agraph.astream) 제너레이터를 고른다.
+    """
+    params, error = _parse_quote_request(request)
+    if error:
+        return error
+    budget, purpose, notes = params
+
+    from .graph import astream_quote_events, stream_quote_events
+
+    def events():
+        try:
+            for event, data in stream_quote_events(budget, purpose, notes):
+                yield _sse(event, data)
+        except Exception as e:
+            traceback.print_exc()
+            yield _sse("error", _pipeline_error(e)[0])
+
+    async def aevents():
+        try:
+            async for event, data in astream_quote_events(budget, purpose, notes):
+                yield _sse(event, data)
+        except Exception as e:
+            traceback.print_exc()
+            yield _sse("error", _pipeline_error(e)[0])
+
+    response = StreamingHttpResponse(
+        aevents() if isinstance(request, ASGIRequest) else events(),
+        content_type="text/event-stream; charset=utf-8",
+    )
+    response["Cache-Control"]     = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # nginx 프록시 버퍼링 끄기
+    return response
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pc_assembly.settings')
 
 application = get_wsgi_application()
+
+# EMBED_PRELOAD=1 + gunicorn preload_app: fork 전에 임베딩 모델을 로드해 워커끼리 공유
+from main.config import EMBED_PRELOAD  # noqa: E402
+
+if EMBED_PRELOAD == '1':
+    from main.graph import preload_for_fork
+    preload_for_fork()
@@ -3,12 +3,25 @@ PC 부품 RAG - 벡터 DB 빌더
 
 사전 조건: convert_to_text.py를 먼저 실행하여 가공데이터/임베딩/*.txt 생성
 이 스크립트는 .txt 파일을 읽어 임베딩 → ChromaDB(chroma_db/) 저장
+
+빌드 모드:
+  python vectordb.py          # 증분 빌드 (기본) — 변경된 행만 임베딩/업서트, 사라진 행 삭제
+  python vectordb.py --full   # 전체 재구축 — 컬렉션 삭제 후 모든 행 재임베딩
 """
 
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import re
+import statistics
 import sys
+import threading
 import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Dict, Iterator, List, Tuple
 
 import pandas as pd
 import numpy as np
@@ -19,11 +32,8 @@ except ImportError:
     print("chromadb 설치 필요: pip install chromadb")
     sys.exit(1)
 
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    print("sentence-transformers 설치 필요: pip install sentence-transformers")
-    sys.exit(1)
+# sentence-transformers(torch 백엔드)는 embedding.load_embedder가 필요할 때만 import한다
+# → --backend onnx 빌드 호스트에는 torch·sentence-transformers가 없어도 된다
 
 try:
     import torch
@@ -33,17 +43,41 @@ except ImportError:
 
 BATCH_SIZE = 128 if DEVICE == "cuda" else 16
 
+# 토큰 예산 배치: 한 배치의 (행 수 × 배치 내 최장 토큰 길이) 상한
+# CPU 기본값 8192 ≈ 기존 16행 × 512토큰과 같은 패딩 포함 연산량
+TOKEN_BUDGET = 65536 if DEVICE == "cuda" else 8192
+MAX_BATCH    = 256   if DEVICE == "cuda" else 128
+
+# CPU 인코딩 워커 프로세스 수 (GPU는 1 고정)
+DEFAULT_WORKERS = 1 if DEVICE == "cuda" else max(1, (os.cpu_count() or 1) // 4)
+
 # ─── 경로 ───
 BASE_DIR   = Path(__file__).parent
 DATA_DIR   = BASE_DIR / "가공데이터"
 EMBED_DIR  = DATA_DIR / "임베딩"
 CHROMA_DIR = BASE_DIR / "chroma_db"
 CHROMA_DIR.mkdir(exist_ok=True)
+ONNX_DIR   = BASE_DIR / "onnx_model"   # embed_onnx.py export 결과 (--backend onnx)
+
+# 임베딩 백엔드는 Django 앱과 같은 모듈을 공유 (pc_assembly/main/embedding.py)
+sys.path.insert(0, str(BASE_DIR / "pc_assembly" / "main"))
+from embedding import load_embedder, truncate_embeddings  # noqa: E402
+from spec_inference import SpecCoverage, enrich_metadata  # noqa: E402
 
 # ─── 모델 설정 (Snowflake Arctic Embed L v2.0 KO 고정) ───
 MODEL_ID        = "dragonkue/snowflake-arctic-embed-l-v2.0-ko"
 COLLECTION_NAME = "snowflake_arctic_ko"
 
+# 증분 빌드용 매니페스트 — 컬렉션 옆에 {문서 id: 행 해시} 저장
+MANIFEST_PATH    = CHROMA_DIR / f"{COLLECTION_NAME}_manifest.json"
+MANIFEST_VERSION = 2   # v2: 행 해시를 "텍스트해시:메타해시"로 분리
+# 빈 참고사항 요청용 로컬 키워드 플랜 (graph.py keyword_planner가 읽음)
+KEYWORD_PLAN_PATH = CHROMA_DIR / f"{COLLECTION_NAME}_keyword_plan.json"
+# 소켓/DDR/파워 호환성 인덱스 (graph.py search_parts가 후보 풀을 서로 호환되는 집합으로 가지치기)
+COMPAT_INDEX_PATH = CHROMA_DIR / f"{COLLECTION_NAME}_compat_index.json"
+# 카테고리별 호환성 필드 채움 비율 (추출만 / 제품명 추론 포함) — 크롤링 라벨 변경 감지용
+SPEC_COVERAGE_PATH = CHROMA_DIR / f"{COLLECTION_NAME}_spec_coverage.json"
+
 # txt 파일명 → (메타데이터 category, 세부 표시명)
 # category는 RAG 검색 시 필터로 사용하는 간단한 분류
 TXT_CATEGORY_MAP = {
@@ -62,6 +96,14 @@ TXT_CATEGORY_MAP = {
 }
 
 
+def parse_price(v) -> int:
+    """ "1,234,000원" / 1234000.0 → 1234000 (파싱 불가면 0)"""
+    try:
+        return int(float(str(v).replace(",", "").replace("원", "").strip()))
+    except Exception:
+        return 0
+
+
 def fmt_price(v) -> str:
     try:
         p = int(float(str(v).replace(",", "").replace("원", "").strip()))
@@ -80,13 +122,17 @@ def _extract_rich_metadata(line: str, stem: str) -> dict:
     ChromaDB 메타데이터로 저장되어 search_parts 필터링과 호환성 검증에 사용된다.
 
     추출 필드:
-        CPU         : socket, ddr_type, tdp
+        CPU         : socket, ddr_type, tdp (+tdp_w)
         메인보드    : socket, ddr_type
         RAM         : ddr_type, capacity_gb, has_rgb
-        GPU         : tdp, required_psu, vram_gb, has_rgb
-        파워        : wattage, has_rgb
+        GPU         : tdp (+tdp_w), required_psu (+required_psu_w), vram_gb, has_rgb
+        파워        : wattage (+wattage_w), has_rgb
         케이스      : color, has_rgb
-        쿨러        : supported_sockets, cooling_tdp, has_rgb
+        쿨러        : supported_sockets, cooling_tdp (+cooling_tdp_w), has_rgb
+
+    *_w, capacity_gb, vram_gb 는 정수로 저장된다 → Chroma where 절의 $gte/$lte 범위 필터와
+    compatibility.py의 전력 계산에 재파싱 없이 바로 쓰인다.
+    tdp/required_psu/wattage/cooling_tdp 문자열 필드는 기존 컬렉션·신뢰도 계산 호환용으로 유지.
     """
     import re as _re
 
@@ -142,7 +188,7 @@ def _extract_rich_metadata(line: str, stem: str) -> dict:
         meta["ddr_type"]    = extract_ddr(pname) or extract_ddr(line)
         cap = field("메모리 용량")
         m   = _re.search(r'(\d+)GB', cap)
-        meta["capacity_gb"] = m.group(1) if m else "0"
+        meta["capacity_gb"] = int(m.group(1)) if m else 0
         meta["has_rgb"]     = detect_rgb(pname)
 
     elif stem in ("gpu_nvidia", "gpu_amd"):
@@ -150,7 +196,7 @@ def _extract_rich_metadata(line: str, stem: str) -> dict:
         meta["tdp"]          = parse_watt(field("사용전력"))
         vram = field("메모리 용량")
         m    = _re.search(r'(\d+)GB', vram)
-        meta["vram_gb"]      = m.group(1) if m else "0"
+        meta["vram_gb"]      = int(m.group(1)) if m else 0
         meta["has_rgb"]      = detect_rgb(pname)
 
     elif stem == "power":
@@ -167,23 +213,237 @@ def _extract_rich_metadata(line: str, stem: str) -> dict:
         meta["cooling_tdp"]       = parse_watt(field("TDP"))
         meta["has_rgb"]           = detect_rgb(pname)
 
+    # 전력 관련 정수 필드 (문자열 필드와 같은 값)
+    for key in ("tdp", "required_psu", "wattage", "cooling_tdp"):
+        if key in meta:
+            meta[f"{key}_w"] = int(meta[key] or 0)
+
     return meta
 
 
-# ─── STEP 1: .txt 파일 로드 ───
+# ─── 증분 빌드: 문서 id · 행 해시 · 매니페스트 ───
 
-def load_texts() -> Tuple[List[str], List[dict], List[str]]:
-    print("\n" + "=" * 60)
-    print("STEP 1 - 텍스트 파일 로드")
-    print("=" * 60)
+def _stable_id(doc_prefix: str, product_name: str, used: set) -> str:
+    """
+    제품명 기반 문서 id. 줄 번호(i) 기반 id는 크롤링 결과에 행이 하나만 끼어들어도
+    뒤쪽 id가 전부 밀려 증분 빌드가 사실상 전체 재임베딩이 되므로 제품명 해시를 쓴다.
+    같은 파일 안에서 제품명이 중복되면 _2, _3 … 접미사로 구분한다.
+    """
+    base   = f"{doc_prefix}_{hashlib.sha1(product_name.encode('utf-8')).hexdigest()[:12]}"
+    doc_id = base
+    n = 2
+    while doc_id in used:
+        doc_id = f"{base}_{n}"
+        n += 1
+    used.add(doc_id)
+    return doc_id
 
+
+def _row_hash(text: str, meta: dict) -> str:
+    """
+    "텍스트해시:메타해시" 형태의 행 해시.
+    텍스트가 바뀌면 재임베딩, 메타데이터만 바뀌면 임베딩 없이 메타데이터만 갱신한다.
+    """
+    text_h = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+    meta_h = hashlib.sha256(
+        json.dumps(meta, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:32]
+    return f"{text_h}:{meta_h}"
+
+
+def _text_changed(old_hash: str, new_hash: str) -> bool:
+    return old_hash.split(":", 1)[0] != new_hash.split(":", 1)[0]
+
+
+def load_manifest(backend: str, dim: int = 0) -> dict:
+    """
+    매니페스트 로드. 파일이 없거나, 버전·모델·백엔드·차원·컬렉션이 현재 설정과 다르면
+    빈 매니페스트를 반환한다 → 전체 재구축으로 처리된다.
+    (torch ↔ onnx int8 벡터는 미세하게 다르므로 백엔드가 바뀌면 섞지 않는다)
+    """
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        data = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
+    if (data.get("version") != MANIFEST_VERSION
+            or data.get("model") != MODEL_ID
+            or data.get("backend", "torch") != backend
+            or data.get("dim", 0) != dim
+            or data.get("collection") != COLLECTION_NAME):
+        return {}
+    return data
+
+
+def save_manifest(rows: Dict[str, str], backend: str, dim: int = 0) -> None:
+    """임시 파일에 쓴 뒤 교체 — 빌드 도중 중단돼도 매니페스트가 깨지지 않음"""
+    data = {
+        "version":    MANIFEST_VERSION,
+        "model":      MODEL_ID,
+        "backend":    backend,
+        "dim":        dim,
+        "collection": COLLECTION_NAME,
+        "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "rows":       rows,
+    }
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    tmp.replace(MANIFEST_PATH)
+
+
+# ─── 키워드 플랜: 카테고리별 가격대 → 제품군 ───
+
+_GPU_FAMILY   = re.compile(r"(RTX|GTX|RX|ARC)\s*(\d{3,4})\s*(TI\s*SUPER|TI|SUPER|XTX|XT|GRE)?")
+_RYZEN_FAMILY = re.compile(r"라이젠\s*(\d)\s*(\d{4,5}[A-Z0-9]*)")
+_CORE_FAMILY  = re.compile(r"\b(I[3579])[- ]?(\d{4,5}[A-Z]*)")
+_ULTRA_FAMILY = re.compile(r"울트라\s*(\d)\s*(\d{3}[A-Z]*)")
+_CHIPSET      = re.compile(r"\b([ABHXZ]\d{3})")
+_CAPACITY     = re.compile(r"(\d+)\s*(TB|GB)")
+_PSU_GRADE    = re.compile(r"(TITANIUM|PLATINUM|GOLD|SILVER|BRONZE|STANDARD)")
+_RADIATOR     = re.compile(r"\b(120|240|280|360|420)\b")
+
+
+def _product_family(cat_key: str, display_name: str, name: str, meta: dict) -> str:
+    """
+    제품명·메타데이터에서 검색 키워드로 쓸 제품군을 뽑는다.
+        GPU "MSI 지포스 RTX 4060 VENTUS 2X 8GB" → "RTX 4060"
+        CPU "AMD 라이젠 7 7800X3D"              → "라이젠 7 7800X3D"
+        메인보드 "ASUS TUF GAMING B650M-PLUS"    → "B650 메인보드"
+    규칙에 맞지 않으면 브랜드 + 모델명 앞 토큰 (케이스·기타)
+    """
+    up = name.upper()
+    if cat_key == "GPU" and (m := _GPU_FAMILY.search(up)):
+        suffix = " ".join((m.group(3) or "").split())
+        suffix = {"TI": "Ti", "TI SUPER": "Ti SUPER"}.get(suffix, suffix)
+        return f"{m.group(1)} {m.group(2)} {suffix}".rstrip()
+    if cat_key == "CPU":
+        if m := _RYZEN_FAMILY.search(name):
+            return f"라이젠 {m.group(1)} {m.group(2)}"
+        if m := _CORE_FAMILY.search(up):
+            return f"{m.group(1).lower()}-{m.group(2)}"
+        if m := _ULTRA_FAMILY.search(name):
+            return f"코어 울트라 {m.group(1)} {m.group(2)}"
+    if cat_key == "메인보드" and (m := _CHIPSET.search(up)):
+        return f"{m.group(1)} 메인보드"
+    if cat_key == "RAM" and meta.get("ddr_type") and meta.get("capacity_gb"):
+        return f"{meta['ddr_type']} {meta['capacity_gb']}GB"
+    if cat_key in ("SSD", "HDD") and (m := _CAPACITY.search(up)):
+        kind = ("NVMe" if "NVME" in up or "M.2" in up else "SATA") if cat_key == "SSD" else "HDD"
+        return f"{kind} {m.group(1)}{m.group(2)}"
+    if cat_key == "파워" and meta.get("wattage_w"):
+        m = _PSU_GRADE.search(up)
+        return f"{meta['wattage_w']}W" + (f" {m.group(1)}" if m else "")
+    if cat_key == "쿨러":
+        m = _RADIATOR.search(up) if "수랭" in display_name else None
+        return f"{display_name} {m.group(1)}" if m else display_name
+    return " ".join(name.split()[:2])
+
+
+class KeywordPlanBuilder:
+    """
+    스트리밍 빌드의 reader 단계에서 행마다 add()로 (카테고리, 제품군, 가격)을 모아
+    카테고리별 제품군의 가격 중앙값·제품 수 표를 만든다.
+    → analyze_request가 참고사항 없는 요청의 키워드를 LLM 없이 예산 구간으로 고른다.
+    """
+
+    def __init__(self):
+        self._prices: Dict[str, Dict[str, List[int]]] = {}
+
+    def add(self, meta: dict) -> None:
+        price = meta.get("price_krw", 0)
+        if price <= 0:
+            return
+        cat = meta["category"]
+        family = _product_family(cat, meta.get("display_name", ""), meta["product_name"], meta)
+        self._prices.setdefault(cat, {}).setdefault(family, []).append(price)
+
+    def to_plan(self) -> dict:
+        categories = {
+            cat: sorted(
+                ({"family": fam, "median_price": int(statistics.median(prices)), "count": len(prices)}
+                 for fam, prices in fams.items()),
+                key=lambda f: f["median_price"],
+            )
+            for cat, fams in self._prices.items()
+        }
+        return {"version": 2, "collection": COLLECTION_NAME,
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"), "categories": categories}
+
+    def save(self, path: Path = KEYWORD_PLAN_PATH) -> dict:
+        plan = self.to_plan()
+        tmp  = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(plan, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(path)
+        return plan
+
+
+# ─── 호환성 인덱스: 속성값 → 호환 문서 id ───
+
+class CompatIndexBuilder:
+    """
+    스트리밍 빌드의 reader 단계에서 행마다 add()로 문서 id와 호환성 메타데이터를 모아
+    속성값별 호환 부품 id 목록을 만든다 (main/compat_index.py가 로드).
+
+        mainboard_by_socket : 소켓 → 그 소켓 메인보드 id
+        ram_by_ddr          : DDR 규격 → 그 규격 RAM id
+        cooler_by_socket    : 소켓 → 그 소켓을 지원하는 쿨러 id
+        gpu_psu             : GPU id → {tdp_w, required_psu_w}
+            전력 규칙(기본 부하·최소 파워)은 저장하지 않는다 — 로드하는 쪽이
+            compatibility.min_psu_w로 계산하므로 check_compat_meta와 어긋나지 않는다.
+    """
+
+    def __init__(self):
+        self.mainboard_by_socket: Dict[str, List[str]] = {}
+        self.ram_by_ddr: Dict[str, List[str]] = {}
+        self.cooler_by_socket: Dict[str, List[str]] = {}
+        self.gpu_psu: Dict[str, dict] = {}
+
+    def add(self, doc_id: str, meta: dict) -> None:
+        cat = meta["category"]
+        if cat == "메인보드" and meta.get("socket"):
+            self.mainboard_by_socket.setdefault(meta["socket"], []).append(doc_id)
+        elif cat == "RAM" and meta.get("ddr_type"):
+            self.ram_by_ddr.setdefault(meta["ddr_type"], []).append(doc_id)
+        elif cat == "쿨러" and meta.get("supported_sockets"):
+            for sock in meta["supported_sockets"].split(","):
+                self.cooler_by_socket.setdefault(sock, []).append(doc_id)
+        elif cat == "GPU" and (meta.get("tdp_w") or meta.get("required_psu_w")):
+            self.gpu_psu[doc_id] = {
+                "tdp_w":          meta.get("tdp_w", 0),
+                "required_psu_w": meta.get("required_psu_w", 0),
+            }
+
+    def to_index(self) -> dict:
+        return {"version": 2, "collection": COLLECTION_NAME,
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "mainboard_by_socket": self.mainboard_by_socket,
+                "ram_by_ddr":          self.ram_by_ddr,
+                "cooler_by_socket":    self.cooler_by_socket,
+                "gpu_psu":             self.gpu_psu}
+
+    def save(self, path: Path = COMPAT_INDEX_PATH) -> dict:
+        index = self.to_index()
+        tmp   = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+        return index
+
+
+# ─── STEP 1: .txt 파일 로드 ───
+
+def iter_rows() -> Iterator[Tuple[str, str, dict]]:
+    """
+    TXT_CATEGORY_MAP 파일을 하나씩 열어 (문서 id, 텍스트, 메타데이터)를 한 줄씩 내보낸다.
+    파일 전체를 리스트로 모으지 않으므로 스트리밍 빌드의 생산자 단계로 쓰인다.
+    라벨 추출(_extract_rich_metadata) 뒤 빈 socket/ddr_type/tdp 등은 제품명으로 추론해 채운다
+    (spec_inference.enrich_metadata — 채운 필드는 meta["inferred"]에 기록).
+    """
     if not EMBED_DIR.exists():
         print(f"  오류: {EMBED_DIR} 폴더가 없습니다.")
         print("  convert_to_text.py를 먼저 실행해주세요.")
         sys.exit(1)
 
-    all_texts, all_metas, all_ids = [], [], []
-
     for stem, (cat_key, display_name) in TXT_CATEGORY_MAP.items():
         txt_path = EMBED_DIR / f"{stem}.txt"
         csv_path = DATA_DIR / f"{stem}.csv"
@@ -195,27 +455,45 @@ def load_texts() -> Tuple[List[str], List[dict], List[str]]:
             print(f"  없음 (csv): {csv_path.name}")
             continue
 
-        lines = txt_path.read_text(encoding="utf-8").splitlines()
-        df    = pd.read_csv(csv_path, encoding="utf-8-sig")
+        df = pd.read_csv(csv_path, encoding="utf-8-sig")
 
         doc_prefix = stem.upper()
-        for i, line in enumerate(lines):
-            if not line.strip():
-                continue
-            row = df.iloc[i] if i < len(df) else pd.Series()
-            all_texts.append(line)
-            base_meta = {
-                "category":     cat_key,
-                "display_name": display_name,
-                "product_name": str(row.get("제품명", "알 수 없음")),
-                "price":        fmt_price(str(row.get("가격", "0"))),
-                "image_url":    str(row.get("이미지URL", "")),
-            }
-            base_meta.update(_extract_rich_metadata(line, stem))
-            all_metas.append(base_meta)
-            all_ids.append(f"{doc_prefix}_{i}")
+        used_ids: set = set()
+        n_rows = 0
+        with txt_path.open(encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                line = line.rstrip("\r\n")
+                if not line.strip():
+                    continue
+                row = df.iloc[i] if i < len(df) else pd.Series()
+                product_name = str(row.get("제품명", "알 수 없음"))
+                base_meta = {
+                    "category":     cat_key,
+                    "display_name": display_name,
+                    "product_name": product_name,
+                    "price":        fmt_price(str(row.get("가격", "0"))),
+                    "price_krw":    parse_price(row.get("가격", "0")),
+                    "image_url":    str(row.get("이미지URL", "")),
+                }
+                base_meta.update(_extract_rich_metadata(line, stem))
+                enrich_metadata(base_meta)
+                n_rows += 1
+                yield _stable_id(doc_prefix, product_name, used_ids), line, base_meta
+
+        print(f"  [{display_name:12}]  {n_rows:5}개")
+
 
-        print(f"  [{display_name:12}]  {len(lines):5}개")
+def load_texts() -> Tuple[List[str], List[dict], List[str]]:
+    """iter_rows()를 리스트로 모은 버전 (전체 데이터가 한 번에 필요할 때)"""
+    print("\n" + "=" * 60)
+    print("STEP 1 - 텍스트 파일 로드")
+    print("=" * 60)
+
+    all_texts, all_metas, all_ids = [], [], []
+    for doc_id, text, meta in iter_rows():
+        all_texts.append(text)
+        all_metas.append(meta)
+        all_ids.append(doc_id)
 
     print(f"\n  합계: {len(all_texts):,}개")
     return all_texts, all_metas, all_ids
@@ -223,90 +501,525 @@ def load_texts() -> Tuple[List[str], List[dict], List[str]]:
 
 # ─── STEP 2: 임베딩 ───
 
-def embed_texts(model: SentenceTransformer, texts: List[str],
-                batch_size: int = 16) -> np.ndarray:
+def embed_texts(model, texts: List[str],
+                batch_size: int = 16, show_progress: bool = True) -> np.ndarray:
+    """
+    고정 배치 크기 인코딩 (단일 프로세스) — EncodeEngine의 배치 실행 및 --bench 기준선.
+    model은 load_embedder()가 만든 SentenceTransformer 또는 OnnxEmbedder.
+    """
     return model.encode(
         texts,
         batch_size=batch_size,
-        show_progress_bar=True,
+        show_progress_bar=show_progress,
         normalize_embeddings=True,
         convert_to_numpy=True,
     )
 
 
+def plan_batches(lengths: List[int], token_budget: int,
+                 max_batch: int) -> List[List[int]]:
+    """
+    토큰 길이 기준 버킷 배치 계획.
+
+    길이 내림차순으로 정렬한 뒤, (배치 행 수 × 배치 내 최장 길이)가 token_budget을
+    넘지 않도록 앞에서부터 채운다. 비슷한 길이끼리 묶이므로 긴 메인보드 스펙 줄과
+    짧은 HDD 줄이 한 배치에서 패딩되는 낭비가 사라지고, 짧은 줄은 큰 배치로 처리된다.
+
+    반환: 원본 인덱스 리스트의 리스트
+    """
+    order   = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    cur_max = 0
+    for i in order:
+        longest = max(cur_max, lengths[i], 1)
+        if cur and ((len(cur) + 1) * longest > token_budget or len(cur) >= max_batch):
+            batches.append(cur)
+            cur, longest = [], max(lengths[i], 1)
+        cur.append(i)
+        cur_max = longest
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+# ── 워커 프로세스 측 (spawn 방식이므로 모듈 최상위 함수여야 pickle 가능) ──
+_worker_model = None
+
+
+def _worker_init(backend: str, model_id: str, onnx_dir: str, n_threads: int) -> None:
+    global _worker_model
+    _worker_model = load_embedder(backend, model_id, onnx_dir=onnx_dir,
+                                  device="cpu", n_threads=n_threads)
+
+
+def _worker_dim() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _worker_encode(job: Tuple[int, List[str]]) -> Tuple[int, np.ndarray]:
+    batch_no, texts = job
+    return batch_no, embed_texts(_worker_model, texts,
+                                 batch_size=len(texts), show_progress=False)
+
+
+class EncodeEngine:
+    """
+    길이 버킷 + 토큰 예산 동적 배치 + CPU 멀티프로세스 인코더.
+
+    workers > 1 이면 spawn 방식 프로세스 풀의 각 워커가 모델을 한 벌씩 로드하고
+    (torch/onnxruntime 스레드는 코어 수 / workers로 분배), 메인 프로세스는 토크나이저만 들고
+    길이 계산·배치 계획·결과 재배열만 한다. workers == 1 (GPU 포함)이면 같은 배치
+    계획을 현재 프로세스에서 순서대로 실행한다.
+
+    encode()는 항상 입력 순서 그대로의 벡터를 반환한다.
+    """
+
+    def __init__(self, model_id: str, device: str = DEVICE, workers: int = 1,
+                 token_budget: int = TOKEN_BUDGET, max_batch: int = MAX_BATCH,
+                 backend: str = "torch", onnx_dir: str = str(ONNX_DIR)):
+        if backend == "onnx":
+            device = "cpu"
+        self.backend      = backend
+        self.device       = device
+        self.onnx_dir     = onnx_dir
+        self.workers      = 1 if device == "cuda" else max(1, workers)
+        self.token_budget = token_budget
+        self.max_batch    = max_batch
+        self._model       = None
+        self._pool        = None
+
+        if self.workers > 1:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(
+                onnx_dir if backend == "onnx" else model_id
+            )
+            self._max_len   = self._tokenizer.model_max_length
+            n_threads       = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = mp.get_context("spawn").Pool(
+                self.workers, initializer=_worker_init,
+                initargs=(backend, model_id, onnx_dir, n_threads),
+            )
+            self.dim = self._pool.apply(_worker_dim)
+        else:
+            self._model     = load_embedder(backend, model_id, onnx_dir=onnx_dir, device=device)
+            self._tokenizer = self._model.tokenizer
+            self._max_len   = self._model.max_seq_length
+            self.dim        = self._model.get_sentence_embedding_dimension()
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        enc = self._tokenizer(texts, add_special_tokens=True, truncation=True,
+                              max_length=self._max_len)
+        return [len(ids) for ids in enc["input_ids"]]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batches = plan_batches(self.token_lengths(texts), self.token_budget, self.max_batch)
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+
+        if self._pool is not None:
+            jobs = [(n, [texts[i] for i in idx]) for n, idx in enumerate(batches)]
+            for n, vecs in self._pool.imap_unordered(_worker_encode, jobs):
+                out[batches[n]] = vecs
+        else:
+            for idx in batches:
+                out[idx] = embed_texts(self._model, [texts[i] for i in idx],
+                                       batch_size=len(idx), show_progress=False)
+        return out
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def bench_encode(engine: EncodeEngine, texts: List[str]) -> dict:
+    """
+    같은 샘플로 기존 방식(파일 순서, 고정 BATCH_SIZE, 단일 프로세스)과
+    EncodeEngine의 처리량(rows/s)을 비교한다. 기준선도 엔진과 같은 백엔드로 로드한다.
+    """
+    baseline = load_embedder(engine.backend, MODEL_ID, onnx_dir=engine.onnx_dir,
+                             device=engine.device)
+    t0 = time.time()
+    embed_texts(baseline, texts, batch_size=BATCH_SIZE, show_progress=False)
+    base_s = time.time() - t0
+    del baseline
+
+    t0 = time.time()
+    engine.encode(texts)
+    eng_s = time.time() - t0
+
+    base_rps = len(texts) / max(base_s, 1e-9)
+    eng_rps  = len(texts) / max(eng_s, 1e-9)
+    return {"rows": len(texts), "baseline_rps": base_rps,
+            "engine_rps": eng_rps, "speedup": eng_rps / max(base_rps, 1e-9)}
+
+
 # ─── STEP 3: ChromaDB 저장 ───
 
-def build_chroma(texts: List[str], metas: List[dict],
-                 ids: List[str], embeddings: np.ndarray,
-                 chroma_batch: int = 500) -> None:
-    print(f"\n  ChromaDB 저장 중 → {CHROMA_DIR}")
-    client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+def open_collection(client, reset: bool, dim: int = 0):
+    """
+    reset=True면 기존 컬렉션을 지우고 새로 만든다 (전체 재구축).
+    dim > 0(Matryoshka 축소)이면 컬렉션 메타데이터 embed_dim에 기록 → graph.py가 읽어
+    쿼리 벡터를 같은 차원으로 자른다.
+    """
+    metadata = {"hnsw:space": "cosine"}
+    if dim > 0:
+        metadata["embed_dim"] = dim
+    if reset:
+        try:
+            client.delete_collection(COLLECTION_NAME)
+            print(f"  기존 컬렉션 삭제: {COLLECTION_NAME}")
+        except Exception:
+            pass
+    return client.get_or_create_collection(name=COLLECTION_NAME, metadata=metadata)
+
+
+def delete_removed(coll, removed: List[str], chroma_batch: int = 500) -> None:
+    """데이터에서 사라진 제품을 컬렉션에서 삭제"""
+    for i in range(0, len(removed), chroma_batch):
+        coll.delete(ids=removed[i:i + chroma_batch])
+    if removed:
+        print(f"  삭제 완료: {len(removed):,}개")
+
+
+# ─── 스트리밍 파이프라인: 읽기 → 임베딩 → 저장 동시 실행 ───
+#
+#   [reader]  iter_rows() → 해시 비교 → chunk_size 단위 묶음 ─┐  embed_q (maxsize=queue_depth)
+#   [embedder] 묶음 임베딩 ──────────────────────────────────┘─┐  write_q (maxsize=queue_depth)
+#   [writer]  Chroma upsert ──────────────────────────────────┘
+#
+# 메타데이터만 바뀐 행은 "meta" 묶음으로 embedder를 그대로 통과해 coll.update()로 갱신된다.
+#
+# 큐 길이가 제한되어 있으므로 메모리에는 최대 (2 × queue_depth + 3)개 묶음만 존재한다.
+# torch 연산과 Chroma 쓰기는 GIL을 놓으므로 스레드만으로 단계가 겹쳐 실행되고,
+# 전체 소요 시간은 가장 느린 단계(보통 임베딩)에 수렴한다.
+
+_DONE = object()
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """stop이 설정되면 포기하는 put — 다른 단계가 죽었을 때 교착 방지"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
 
-    try:
-        client.delete_collection(COLLECTION_NAME)
-        print(f"  기존 컬렉션 삭제: {COLLECTION_NAME}")
-    except Exception:
-        pass
 
-    coll = client.create_collection(name=COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
 
-    for i in range(0, len(texts), chroma_batch):
-        j = min(i + chroma_batch, len(texts))
-        coll.add(
-            ids=ids[i:j],
-            documents=texts[i:j],
-            embeddings=embeddings[i:j].tolist(),
-            metadatas=metas[i:j],
-        )
-        print(f"  저장 진행: {j:,} / {len(texts):,}", end="\r")
 
-    print(f"\n  완료: [{COLLECTION_NAME}] {coll.count():,}개 저장")
+def stream_build(coll, old_rows: Dict[str, str], load_engine: Callable,
+                 chunk_size: int = 256, queue_depth: int = 4, dim: int = 0,
+                 on_row: Callable[[str, dict], None] = None) -> dict:
+    """
+    스트리밍 방식으로 변경된 행만 임베딩해 컬렉션에 업서트한다.
+
+    매개변수:
+        coll       : 대상 Chroma 컬렉션
+        old_rows   : 이전 매니페스트 {문서 id: 행 해시} (전체 재구축이면 {})
+        load_engine: 첫 변경 묶음이 도착했을 때 호출되는 EncodeEngine 로더 (변경이 없으면 로드 안 함)
+        chunk_size : 임베딩·업서트 단위 행 수
+        queue_depth: 단계 사이 큐 최대 길이
+        dim        : > 0이면 임베딩을 앞쪽 dim차원으로 잘라 재정규화 후 저장 (Matryoshka)
+        on_row     : 변경 여부와 무관하게 모든 행의 (문서 id, 메타데이터)로 호출
+                     (키워드 플랜·호환성 인덱스 수집용)
+
+    반환: 행 수 · 단계별 소요 시간 · 새 매니페스트 rows 등을 담은 통계 dict
+    """
+    embed_q: queue.Queue = queue.Queue(maxsize=queue_depth)
+    write_q: queue.Queue = queue.Queue(maxsize=queue_depth)
+    stop   = threading.Event()
+    errors: List[BaseException] = []
+    stats  = {"rows": 0, "embedded": 0, "meta_updated": 0, "written": 0, "dim": 0,
+              "read_s": 0.0, "embed_s": 0.0, "write_s": 0.0, "new_rows": {}}
+
+    def reader():
+        try:
+            t0 = time.time()
+            chunks = {"embed": ([], [], []), "meta": ([], [], [])}
+            for doc_id, text, meta in iter_rows():
+                h   = _row_hash(text, meta)
+                old = old_rows.get(doc_id)
+                stats["rows"] += 1
+                stats["new_rows"][doc_id] = h
+                if on_row is not None:
+                    on_row(doc_id, meta)
+                if old == h:
+                    continue
+                kind  = "embed" if old is None or _text_changed(old, h) else "meta"
+                chunk = chunks[kind]
+                chunk[0].append(doc_id)
+                chunk[1].append(text)
+                chunk[2].append(meta)
+                if len(chunk[0]) >= chunk_size:
+                    stats["read_s"] += time.time() - t0
+                    if not _put(embed_q, (kind, *chunk), stop):
+                        return
+                    t0 = time.time()
+                    chunks[kind] = ([], [], [])
+            stats["read_s"] += time.time() - t0
+            for kind, chunk in chunks.items():
+                if chunk[0] and not _put(embed_q, (kind, *chunk), stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(embed_q, _DONE, stop)
+
+    def embedder():
+        engine = None
+        try:
+            while True:
+                item = _get(embed_q, stop)
+                if item is _DONE:
+                    break
+                kind, ids, texts, metas = item
+                if kind == "meta":
+                    if not _put(write_q, (ids, texts, metas, None), stop):
+                        break
+                    continue
+                if engine is None:
+                    engine = load_engine()
+                    stats["dim"] = min(dim, engine.dim) if dim > 0 else engine.dim
+                t0 = time.time()
+                vecs = truncate_embeddings(engine.encode(texts), dim)
+                stats["embed_s"] += time.time() - t0
+                stats["embedded"] += len(texts)
+                if not _put(write_q, (ids, texts, metas, vecs), stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(write_q, _DONE, stop)
+
+    def writer():
+        try:
+            while True:
+                item = _get(write_q, stop)
+                if item is _DONE:
+                    break
+                ids, texts, metas, vecs = item
+                t0 = time.time()
+                if vecs is None:
+                    coll.update(ids=ids, metadatas=metas)
+                    stats["meta_updated"] += len(ids)
+                else:
+                    coll.upsert(ids=ids, documents=texts,
+                                embeddings=vecs.tolist(), metadatas=metas)
+                stats["write_s"] += time.time() - t0
+                stats["written"] += len(ids)
+                print(f"  진행: 읽기 {stats['rows']:,} | 임베딩 {stats['embedded']:,} | "
+                      f"저장 {stats['written']:,}", end="\r")
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    t_wall  = time.time()
+    threads = [threading.Thread(target=fn, name=f"vectordb-{fn.__name__}", daemon=True)
+               for fn in (reader, embedder, writer)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats["wall_s"] = time.time() - t_wall
+    print()
+
+    if errors:
+        raise errors[0]
+    return stats
 
 
 # ─── 메인 ───
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="PC 부품 벡터 DB 빌더")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="매니페스트를 무시하고 컬렉션을 삭제 후 전체 재구축",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=None,
+        help="스트리밍 파이프라인의 임베딩·업서트 묶음 크기 (기본 max(256, 128×workers))",
+    )
+    parser.add_argument(
+        "--queue-depth", type=int, default=4,
+        help="단계 사이 큐 최대 길이 — 메모리 상한을 결정 (기본 4)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS,
+        help=f"CPU 인코딩 워커 프로세스 수 (기본 {DEFAULT_WORKERS}, GPU는 1 고정)",
+    )
+    parser.add_argument(
+        "--token-budget", type=int, default=TOKEN_BUDGET,
+        help=f"배치당 패딩 포함 토큰 상한 (기본 {TOKEN_BUDGET})",
+    )
+    parser.add_argument(
+        "--backend", choices=["torch", "onnx"], default="torch",
+        help="임베딩 백엔드 — Django의 EMBEDDING_BACKEND와 같은 값을 써야 함 (기본 torch)",
+    )
+    parser.add_argument(
+        "--onnx-dir", default=str(ONNX_DIR),
+        help=f"--backend onnx일 때 ONNX 모델 폴더 (기본 {ONNX_DIR})",
+    )
+    parser.add_argument(
+        "--dim", type=int, choices=[0, 256, 512], default=0,
+        help="Matryoshka 차원 축소 — 앞쪽 N차원만 저장 (0 = 전체 1024차원, 변경 시 전체 재구축)",
+    )
+    parser.add_argument(
+        "--bench", type=int, default=0, metavar="N",
+        help="빌드 전에 변경 행 중 N개로 기존 방식 대비 인코딩 속도 향상을 측정",
+    )
+    parser.add_argument(
+        "--coverage", action="store_true",
+        help="임베딩 없이 카테고리별 호환성 필드 채움 비율(추출 → 추론 포함)만 출력",
+    )
+    return parser.parse_args()
+
+
+def save_coverage(coverage: SpecCoverage, path: Path = SPEC_COVERAGE_PATH) -> dict:
+    report = coverage.report()
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return report
+
+
+def report_coverage() -> None:
+    """--coverage: 행을 읽기만 해서 필드 커버리지를 출력·저장 (모델 로딩/컬렉션 변경 없음)"""
+    coverage = SpecCoverage()
+    for _, _, meta in iter_rows():
+        coverage.add(meta)
+    save_coverage(coverage)
+    print("\n  호환성 필드 커버리지 (추출 → 추론 포함)")
+    for line in coverage.lines():
+        print(f"    {line}")
+    print(f"  저장: {SPEC_COVERAGE_PATH}")
+
+
 def main():
+    args = parse_args()
+    if args.coverage:
+        report_coverage()
+        return
+
     print("=" * 60)
     print("PC 부품 벡터 DB 빌더")
     print(f"  모델   : Snowflake Arctic Embed L v2.0 KO")
     print(f"  HF ID  : {MODEL_ID}")
-    print(f"  디바이스: {DEVICE.upper()}")
+    print(f"  디바이스: {'CPU' if args.backend == 'onnx' else DEVICE.upper()}")
+    print(f"  백엔드 : {args.backend}")
+    print(f"  차원   : {args.dim or '전체'}")
     print(f"  저장   : {CHROMA_DIR}")
+    print(f"  모드   : {'전체 재구축' if args.full else '증분 빌드'}")
     print("=" * 60)
 
-    # STEP 1
-    texts, metas, ids = load_texts()
-
-    # STEP 2
+    # 변경분 기준 — 매니페스트가 없거나 컬렉션과 어긋나면 전체 재구축
+    client   = chromadb.PersistentClient(path=str(CHROMA_DIR))
+    manifest = {} if args.full else load_manifest(args.backend, args.dim)
+    old_rows = manifest.get("rows", {})
+    if old_rows:
+        coll = open_collection(client, reset=False, dim=args.dim)
+        if coll.count() != len(old_rows):
+            print(f"  컬렉션({coll.count():,}) ↔ 매니페스트({len(old_rows):,}) 불일치 → 전체 재구축")
+            old_rows = {}
+    if not old_rows:
+        MANIFEST_PATH.unlink(missing_ok=True)
+        coll = open_collection(client, reset=True, dim=args.dim)
+
+    engines: List[EncodeEngine] = []
+
+    def load_engine() -> EncodeEngine:
+        print(f"\n  모델 로딩: {MODEL_ID} (backend={args.backend}, device={DEVICE}, "
+              f"workers={args.workers})")
+        engine = EncodeEngine(MODEL_ID, device=DEVICE, workers=args.workers,
+                              token_budget=args.token_budget,
+                              backend=args.backend, onnx_dir=args.onnx_dir)
+        print(f"  로드 완료 (차원: {engine.dim})")
+        engines.append(engine)
+        return engine
+
+    bench = None
+    if args.bench > 0:
+        sample = [text for doc_id, text, meta in iter_rows()
+                  if doc_id not in old_rows
+                  or _text_changed(old_rows[doc_id], _row_hash(text, meta))][:args.bench]
+        if sample:
+            print(f"\n  인코딩 벤치마크 ({len(sample):,}개 샘플)")
+            bench = bench_encode(load_engine(), sample)
+            print(f"  기존 {bench['baseline_rps']:.1f} rows/s → 엔진 {bench['engine_rps']:.1f} rows/s "
+                  f"(x{bench['speedup']:.2f})")
+
+    # STEP 1~3 동시 실행
+    chunk_size = args.chunk_size or max(256, 128 * args.workers)
     print(f"\n{'=' * 60}")
-    print(f"STEP 2 - 임베딩 ({len(texts):,}개, device={DEVICE})")
+    print(f"STEP 1~3 - 스트리밍 빌드 (읽기 → 임베딩 → 저장, chunk={chunk_size})")
     print("=" * 60)
-    print(f"  모델 로딩: {MODEL_ID}")
-    model = SentenceTransformer(MODEL_ID, device=DEVICE)
-    dim   = model.get_sentence_embedding_dimension()
-    print(f"  로드 완료 (차원: {dim})")
+    plan_builder   = KeywordPlanBuilder()
+    compat_builder = CompatIndexBuilder()
+    coverage       = SpecCoverage()
 
-    t0 = time.time()
-    embeddings = embed_texts(model, texts, batch_size=BATCH_SIZE)
-    elapsed = round(time.time() - t0, 1)
-    print(f"  임베딩 완료: {elapsed}초")
+    def on_row(doc_id: str, meta: dict) -> None:
+        plan_builder.add(meta)
+        compat_builder.add(doc_id, meta)
+        coverage.add(meta)
+
+    try:
+        stats = stream_build(coll, old_rows,
+                             (lambda: engines[0]) if engines else load_engine,
+                             chunk_size=chunk_size, queue_depth=args.queue_depth,
+                             dim=args.dim, on_row=on_row)
+    finally:
+        for engine in engines:
+            engine.close()
 
-    del model
     if DEVICE == "cuda":
         import torch as _t
         _t.cuda.empty_cache()
 
-    # STEP 3
-    print(f"\n{'=' * 60}")
-    print("STEP 3 - ChromaDB 저장")
-    print("=" * 60)
-    build_chroma(texts, metas, ids, embeddings)
+    new_rows = stats["new_rows"]
+    removed  = [doc_id for doc_id in old_rows if doc_id not in new_rows]
+    delete_removed(coll, removed)
+    save_manifest(new_rows, args.backend, args.dim)
+    plan = plan_builder.save()
+    compat_index = compat_builder.save()
+    save_coverage(coverage)
 
+    total = stats["rows"]
     print("\n" + "=" * 60)
     print("빌드 완료")
-    print(f"  모델    : Snowflake Arctic Embed L v2.0 KO ({dim}차원)")
-    print(f"  총 제품 : {len(texts):,}개")
-    print(f"  임베딩  : {elapsed}초")
+    print(f"  모델    : Snowflake Arctic Embed L v2.0 KO ({stats['dim'] or '-'}차원)")
+    print(f"  총 제품 : {total:,}개 (컬렉션 {coll.count():,}개)")
+    print(f"  재임베딩: {stats['embedded']:,}개 ({stats['embedded'] / max(total, 1):.1%}) | "
+          f"메타만 갱신: {stats['meta_updated']:,}개 | 삭제: {len(removed):,}개")
+    print(f"  단계별  : 읽기 {stats['read_s']:.1f}초 | 임베딩 {stats['embed_s']:.1f}초 | "
+          f"저장 {stats['write_s']:.1f}초")
+    if stats["embedded"]:
+        print(f"  인코딩  : {stats['embedded'] / max(stats['embed_s'], 1e-9):.1f} rows/s "
+              f"(workers={args.workers}, token_budget={args.token_budget})")
+    if bench:
+        print(f"  속도 향상: x{bench['speedup']:.2f} (기존 {bench['baseline_rps']:.1f} rows/s 대비)")
+    print(f"  총 소요 : {stats['wall_s']:.1f}초 (단계 합 "
+          f"{stats['read_s'] + stats['embed_s'] + stats['write_s']:.1f}초)")
+    print(f"  키워드 플랜: 제품군 {sum(len(v) for v in plan['categories'].values()):,}개 → "
+          f"{KEYWORD_PLAN_PATH.name}")
+    print(f"  호환성 인덱스: 메인보드 소켓 {len(compat_index['mainboard_by_socket'])}종 | "
+          f"RAM 규격 {len(compat_index['ram_by_ddr'])}종 | 쿨러 소켓 {len(compat_index['cooler_by_socket'])}종 | "
+          f"GPU {len(compat_index['gpu_psu']):,}개 → {COMPAT_INDEX_PATH.name}")
+    print(f"  필드 커버리지 (추출 → 추론 포함) → {SPEC_COVERAGE_PATH.name}")
+    for line in coverage.lines():
+        print(f"    {line}")
     print(f"  컬렉션  : {COLLECTION_NAME}")
     print(f"  저장 위치: {CHROMA_DIR}")
     print("=" * 60)